@@ -0,0 +1,100 @@
+"""
+Per-client memory and CPU of the campaign client profiles: the full TelegramClient the bot used
+for campaigns so far vs the send-only "sender" profile of borrow_client().
+
+No network. A full client in G groups receives their traffic as updates; that is simulated by
+feeding the same update path Telethon's update loop runs (MessageBox.process_updates and
+_preprocess_updates: entity caches + session). The sender profile invokes everything without
+updates, so it only sees the entities of its own requests (also fed to both, here).
+
+    cd ottlyPro && python -m bench.client_profile [groups] [messages_per_group]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from telethon import TelegramClient, types
+from telethon.sessions import StringSession
+from telethon._updates import SessionState, ChannelState
+from ottly.telethon.client import SenderSession
+
+API_ID, API_HASH = 1, "0" * 32
+NOW = datetime.now(timezone.utc)
+
+
+def _channel(cid: int):
+    return types.Channel(id=cid, title=f"group {cid}", photo=types.ChatPhotoEmpty(), date=NOW,
+                         access_hash=cid * 7, megagroup=True)
+
+
+def _user(uid: int):
+    return types.User(id=uid, access_hash=uid * 3, first_name=f"user{uid}", username=f"user{uid}")
+
+
+def _traffic(groups: int, per_group: int):
+    """One Updates per message: a new message in a group from a (mostly new) member."""
+    out = []
+    for n in range(per_group):
+        for g in range(groups):
+            cid, uid = 1000 + g, 10_000 + g * per_group + n
+            msg = types.Message(id=n + 1, peer_id=types.PeerChannel(cid), date=NOW, message="hello " * 20,
+                                from_id=types.PeerUser(uid))
+            upd = types.UpdateNewChannelMessage(message=msg, pts=n + 2, pts_count=1)
+            out.append(types.Updates(updates=[upd], users=[_user(uid)], chats=[_channel(cid)], date=NOW, seq=0))
+    return out
+
+
+def _responses(groups: int):
+    """What campaign requests return: the target channels (plus some users, e.g. from get_messages)."""
+    return [types.messages.Chats(chats=[_channel(1000 + g) for g in range(groups)]),
+            types.contacts.ResolvedPeer(peer=types.PeerUser(1), users=[_user(i) for i in range(1, 200)], chats=[])]
+
+
+def _full(groups: int):
+    client = TelegramClient(StringSession(), API_ID, API_HASH)
+    client._message_box.load(SessionState(1, 2, False, 1, 1, int(NOW.timestamp()), 0, None),
+                             [ChannelState(1000 + g, 1) for g in range(groups)])
+    return client
+
+
+def _sender():
+    return TelegramClient(SenderSession(), API_ID, API_HASH, receive_updates=False, flood_sleep_threshold=0,
+                          entity_cache_limit=5000)
+
+
+async def _feed_updates(client, updates):
+    for upd in updates:
+        processed = []
+        users, chats = client._message_box.process_updates(upd, client._mb_entity_cache, processed)
+        await client._preprocess_updates(processed, users, chats)
+
+
+async def _measure(name, make, groups, updates):
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    t0 = time.process_time()
+    client = make()
+    for resp in _responses(groups):
+        client.session.process_entities(resp)
+    if updates is not None:
+        await _feed_updates(client, updates)
+    cpu = time.process_time() - t0
+    size = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(base, "filename"))
+    tracemalloc.stop()
+    rows = len(client.session._entities)
+    print(f"{name:8s} cpu {cpu * 1000:8.1f} ms   heap {size / 1024:9.1f} KiB   session entities {rows:6d}")
+    return client
+
+
+async def main(groups: int, per_group: int):
+    updates = _traffic(groups, per_group)
+    print(f"{groups} groups, {len(updates)} incoming messages for the full client")
+    await _measure("full", lambda: _full(groups), groups, updates)
+    await _measure("sender", _sender, groups, None)
+
+
+if __name__ == "__main__":
+    g = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(g, m))
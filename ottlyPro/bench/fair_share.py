@@ -0,0 +1,62 @@
+"""
+Fair share of the campaign scheduler's workers under saturation (no Telegram).
+
+One heavy free user with many campaigns, a few light free users and a few premium users; every
+step takes STEP_S and is due again right away, so the workers are the bottleneck. Compares
+per-job scheduling (each campaign its own flow: what a plain FIFO ready queue gives) with
+per-user flows weighted by tier.
+
+    cd ottlyPro && python -m bench.fair_share [seconds]
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from ottly.features.scheduler import CampaignScheduler
+
+WORKERS = 4
+STEP_S = 0.01
+USERS = {"heavy": ("free", 40)} | {f"free{i}": ("free", 2) for i in range(5)} | {f"prem{i}": ("premium", 2) for i in range(5)}
+
+
+async def run(seconds: float, per_user: bool):
+    sched = CampaignScheduler(workers=WORKERS)
+    steps = Counter()
+
+    def make_step(user):
+        async def step():
+            await asyncio.sleep(STEP_S)
+            steps[user] += 1
+            return time.time()
+        return step
+
+    for user, (tier, jobs) in USERS.items():
+        for j in range(jobs):
+            sched.schedule((user, j), make_step(user), flow=user if per_user else None,
+                           tier=(lambda t=tier: t) if per_user else None)
+    await asyncio.sleep(seconds)
+    stats = sched.tier_stats()
+    await sched.drain(1)
+    return steps, stats
+
+
+def _report(title, steps, stats):
+    total = sum(steps.values())
+    print(f"\n{title}: {total} steps")
+    print(f"  heavy free user : {steps['heavy'] / total:6.1%} of steps")
+    for prefix, label in (("free", "each light free"), ("prem", "each premium   ")):
+        users = [u for u in USERS if u.startswith(prefix)]
+        print(f"  {label} : {sum(steps[u] for u in users) / len(users) / total:6.1%} of steps")
+    for tier, st in sorted(stats.items()):
+        print(f"  tier {tier:<8} lag avg {st['lag_avg_s'] * 1000:7.1f} ms  p95 {st['lag_p95_s'] * 1000:7.1f} ms  "
+              f"{st['steps_per_min']:.0f} steps/min (10-min window)")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    _report("per-campaign flows (FIFO-like)", *asyncio.run(run(seconds, per_user=False)))
+    _report("per-user flows, weighted by tier", *asyncio.run(run(seconds, per_user=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Campaign leases with several processes on one SQLite file (no Telegram).
+
+Each process plays an instance: it claims up to two unowned campaigns per tick, renews what it
+holds through features/leases.lease_loop and reports its held set. Halfway through, the process
+holding the most leases is killed; its campaigns must be taken over once the leases expire, and
+no campaign may be held by two processes at the same time (beyond one renew interval).
+
+    cd ottlyPro && python -m bench.leases [processes] [campaigns] [ttl_sec]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+
+def _instance(name: str, db_path: str, campaigns: int, ttl: int, out):
+    os.environ.update(DB_PATH=db_path, CAMPAIGN_LEASES="1", LEASE_TTL_SEC=str(ttl), INSTANCE_ID=name)
+    import asyncio
+    from ottly.features import leases as L
+
+    keys = [(1, sid) for sid in range(campaigns)]
+
+    async def take_orphans():
+        for key in L.unowned(keys)[:2]:
+            L.claim(*key, force=False)
+        out.put((name, time.time(), sorted(L.HELD)))
+
+    async def main():
+        await take_orphans()
+        await L.lease_loop(on_lost=lambda key: None, on_tick=take_orphans)
+
+    asyncio.run(main())
+
+
+def main():
+    procs_n = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    campaigns = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    ttl = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    db_path = os.path.join(tempfile.mkdtemp(), "leases.db")
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = {}
+    for i in range(procs_n):
+        name = f"inst{i}"
+        procs[name] = ctx.Process(target=_instance, args=(name, db_path, campaigns, ttl, out), daemon=True)
+        procs[name].start()
+
+    held = {}  # instance -> (ts, keys)
+    killed_at = None
+    victim = None
+    taken_over_at = None
+    overlaps = 0
+    t0 = time.time()
+    while time.time() - t0 < ttl * 8:
+        try:
+            name, ts, keys = out.get(timeout=0.5)
+        except Exception:
+            continue
+        held[name] = (ts, set(keys))
+        live = {n: k for n, (t, k) in held.items() if n != victim or killed_at is None}
+        owners = {}
+        for n, ks in live.items():
+            for k in ks:
+                owners.setdefault(k, []).append(n)
+        overlaps += sum(1 for ns in owners.values() if len(ns) > 1)
+        if killed_at is None and time.time() - t0 > ttl * 3:
+            # the current owner with the most leases (a process holding none measures no takeover)
+            victim, (_ts, victim_keys) = max(held.items(), key=lambda kv: len(kv[1][1]))
+            if not victim_keys:
+                victim = None
+                continue
+            procs[victim].kill()
+            killed_at = time.time()
+            print(f"killed {victim} holding {len(victim_keys)} campaign(s)")
+        elif killed_at is not None and taken_over_at is None and len(owners) == campaigns:
+            taken_over_at = time.time()
+
+    for p in procs.values():
+        p.kill()
+    final = {n: sorted(k) for n, (t, k) in held.items() if n != victim}
+    print("final owners:", {n: len(k) for n, k in final.items()})
+    print(f"all {campaigns} campaigns owned: {len(set().union(*map(set, final.values()))) == campaigns}")
+    print(f"double ownership observations: {overlaps}")
+    if taken_over_at:
+        print(f"takeover after kill: {taken_over_at - killed_at:.1f}s (lease ttl {ttl}s)")
+    else:
+        print("takeover: not observed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-target CPU cost of a copy-mode text send: high-level send_message() vs the prepared fast path.
+
+No network: the client's RPC call is replaced by a canned UpdateShortSentMessage, so only the
+client-side work (markup/entity handling, request building, response processing) is measured.
+
+    cd ottlyPro && python -m bench.text_send [targets]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from telethon import TelegramClient, types
+from telethon.sessions import StringSession
+from ottly.telethon.content_cache import _prepare, send_prepared
+
+TEXT = ("🚀 Grow your group with Ottly! Auto-forward your ads to hundreds of groups, "
+        "schedule campaigns and track every send. https://t.me/example\n") * 4
+
+
+def _source_message():
+    entities = [types.MessageEntityBold(0, 20), types.MessageEntityUrl(TEXT.index("https"), 20),
+                types.MessageEntityItalic(30, 40)]
+    return types.Message(id=1, peer_id=types.PeerChannel(1), date=None, message=TEXT, entities=entities)
+
+
+def _client():
+    client = TelegramClient(StringSession(), 1, "0" * 32, receive_updates=False)
+
+    async def fake_call(sender, request, ordered=False, flood_sleep_threshold=None):
+        return types.UpdateShortSentMessage(id=100, pts=1, pts_count=1, date=datetime.now(timezone.utc))
+
+    client._call = fake_call
+    return client
+
+
+async def _run(n: int):
+    client = _client()
+    msg = _source_message()
+    prepared = _prepare(0, msg)
+    dst = types.InputPeerChannel(12345, 678)
+
+    async def legacy():
+        await client.send_message(dst, msg.message, buttons=msg.reply_markup)
+
+    async def legacy_entities():
+        await client.send_message(dst, msg.message, formatting_entities=msg.entities, buttons=msg.reply_markup)
+
+    async def fast():
+        await send_prepared(client, dst, prepared)
+
+    results = {}
+    for name, fn in (("send_message (parse text)", legacy), ("send_message (entities)", legacy_entities),
+                     ("prepared fast path", fast)):
+        for _ in range(200):
+            await fn()
+        t0 = time.process_time()
+        for _ in range(n):
+            await fn()
+        results[name] = (time.process_time() - t0) / n * 1e6
+    base = results["send_message (parse text)"]
+    for name, us in results.items():
+        print(f"{name:28s} {us:8.1f} µs/target  ({base / us:4.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(_run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
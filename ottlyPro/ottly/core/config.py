@@ -44,6 +44,9 @@ class Env:
 
     SESSIONS_DIR: str = os.getenv("SESSIONS_DIR", "./sessions")
     DB_PATH: str = os.getenv("DB_PATH", "./ottly.db")
+    # Where Telethon session strings live: "files" (one file per account in SESSIONS_DIR) or
+    # "sqlite" (session_store table of the main DB; existing files are imported on first use)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "files").strip().lower()
 
     API_ID_DEFAULT: int = int(os.getenv("API_ID_DEFAULT", "0"))
     API_HASH_DEFAULT: str = os.getenv("API_HASH_DEFAULT", "")
@@ -62,6 +65,47 @@ class Env:
     FOUNDER_USERNAME: str = os.getenv("FOUNDER_USERNAME", "a9b4n")
     BACKUP_DIR: str = os.getenv("BACKUP_DIR", "./logs/backups")
 
+    # Campaign scheduler: concurrent work items, and how long a pooled client may idle connected
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "16"))
+    CLIENT_IDLE_SEC: int = int(os.getenv("CLIENT_IDLE_SEC", "120"))
+    # Weighted fair share of the scheduler workers per user, by tier (premium users get more turns)
+    FAIR_WEIGHT_PREMIUM: float = float(os.getenv("FAIR_WEIGHT_PREMIUM", "4"))
+    FAIR_WEIGHT_FREE: float = float(os.getenv("FAIR_WEIGHT_FREE", "1"))
+    # Campaign runs that fail are restarted with backoff this many times in a row before giving up
+    SUPERVISOR_MAX_RESTARTS: int = int(os.getenv("SUPERVISOR_MAX_RESTARTS", "5"))
+    # Graceful shutdown: how long in-flight campaign steps may take to finish before they are cut
+    SHUTDOWN_DRAIN_SEC: int = int(os.getenv("SHUTDOWN_DRAIN_SEC", "20"))
+    # Auto Mode: spread campaign starts over this many seconds after a window opens
+    AUTO_OPEN_STAGGER_SEC: int = int(os.getenv("AUTO_OPEN_STAGGER_SEC", "300"))
+    # Live-log digest: how often the per-campaign status message is edited, and errors kept on it
+    LIVE_DIGEST_EVERY_SEC: int = int(os.getenv("LIVE_DIGEST_EVERY_SEC", "15"))
+    LIVE_DIGEST_ERRORS: int = int(os.getenv("LIVE_DIGEST_ERRORS", "5"))
+    # Outbound Bot API pacing per bot token: global msg/s (shared by the bot process and the
+    # campaign workers, each gets an equal part) and min seconds between sends to one chat
+    BOT_GLOBAL_RATE: float = float(os.getenv("BOT_GLOBAL_RATE", "30"))
+    BOT_CHAT_INTERVAL_SEC: float = float(os.getenv("BOT_CHAT_INTERVAL_SEC", "1"))
+    BOT_GROUP_INTERVAL_SEC: float = float(os.getenv("BOT_GROUP_INTERVAL_SEC", "3"))
+    # Campaign (send-only) clients: max chats/channels remembered per session, and FloodWaits
+    # Telethon may sleep through itself (0 = every FloodWait goes to the campaign's own handling)
+    SENDER_ENTITY_LIMIT: int = int(os.getenv("SENDER_ENTITY_LIMIT", "5000"))
+    SENDER_FLOOD_SLEEP_SEC: int = int(os.getenv("SENDER_FLOOD_SLEEP_SEC", "0"))
+    # Campaign worker processes (sessions sharded by id): 0 = run campaigns in the bot process,
+    # "auto" = one per CPU core minus one for the bots
+    CAMPAIGN_WORKERS: str = os.getenv("CAMPAIGN_WORKERS", "0")
+    # MTProto egress per process: concurrent in-flight requests and connect attempts, interactive
+    # clients (login, pickers) and background ones (campaign senders) on separate budgets
+    EGRESS_INTERACTIVE_REQUESTS: int = int(os.getenv("EGRESS_INTERACTIVE_REQUESTS", "32"))
+    EGRESS_BACKGROUND_REQUESTS: int = int(os.getenv("EGRESS_BACKGROUND_REQUESTS", "48"))
+    EGRESS_INTERACTIVE_CONNECTS: int = int(os.getenv("EGRESS_INTERACTIVE_CONNECTS", "8"))
+    EGRESS_BACKGROUND_CONNECTS: int = int(os.getenv("EGRESS_BACKGROUND_CONNECTS", "6"))
+    # Several instances on one DB: each running campaign is leased to one process, leases of a
+    # dead process are taken over once they expire (INSTANCE_ID defaults to the host name)
+    CAMPAIGN_LEASES: bool = os.getenv("CAMPAIGN_LEASES", "0") == "1"
+    LEASE_TTL_SEC: int = int(os.getenv("LEASE_TTL_SEC", "60"))
+    INSTANCE_ID: str = os.getenv("INSTANCE_ID", "")
+    # Opt-in: campaign clients receive updates to keep group caches fresh (costs CPU per group message)
+    CAMPAIGN_UPDATE_LISTENER: bool = os.getenv("CAMPAIGN_UPDATE_LISTENER", "0") == "1"
+
 ENV = Env()
 os.makedirs(ENV.SESSIONS_DIR, exist_ok=True)
 os.makedirs(ENV.LOGS_DIR, exist_ok=True)
@@ -14,6 +14,29 @@ def _column_exists(conn, table: str, col: str) -> bool:
     cur.execute(f"PRAGMA table_info({table})")
     return any(r[1] == col for r in cur.fetchall())
 
+def _backfill_metric_dims(c):
+    """Move text columns of old message_metrics rows into dim_groups / dim_links."""
+    pending = ("public_link IS NOT NULL OR campaign_link IS NOT NULL "
+               "OR (group_name IS NOT NULL AND COALESCE(group_id, 0) != 0)")
+    c.execute(f"SELECT 1 FROM message_metrics WHERE {pending} LIMIT 1")
+    if not c.fetchone():
+        return
+    c.execute("""INSERT OR IGNORE INTO dim_links (link)
+                 SELECT public_link FROM message_metrics WHERE public_link IS NOT NULL
+                 UNION
+                 SELECT campaign_link FROM message_metrics WHERE campaign_link IS NOT NULL""")
+    # latest known title per group wins
+    c.execute("""INSERT OR IGNORE INTO dim_groups (group_id, title, updated_at)
+                 SELECT group_id, group_name, MAX(ts_utc) FROM message_metrics
+                 WHERE COALESCE(group_id, 0) != 0 AND group_name IS NOT NULL
+                 GROUP BY group_id""")
+    c.execute(f"""UPDATE message_metrics SET
+                 public_link_id = COALESCE(public_link_id, (SELECT id FROM dim_links WHERE link = message_metrics.public_link)),
+                 campaign_link_id = COALESCE(campaign_link_id, (SELECT id FROM dim_links WHERE link = message_metrics.campaign_link)),
+                 group_name = CASE WHEN COALESCE(group_id, 0) != 0 THEN NULL ELSE group_name END,
+                 public_link = NULL, campaign_link = NULL
+                 WHERE {pending}""")
+
 def init_db():
     with closing(db()) as conn, conn:
         c = conn.cursor()
@@ -93,6 +116,147 @@ def init_db():
         if not _column_exists(conn, "message_metrics", "is_env_ad"):
             c.execute("ALTER TABLE message_metrics ADD COLUMN is_env_ad INTEGER DEFAULT 0")
 
+        # --- Dimension tables: fact rows in message_metrics keep integer keys only ---
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS dim_groups (
+            group_id INTEGER PRIMARY KEY,
+            title TEXT,
+            username TEXT,
+            link TEXT,
+            updated_at TEXT
+        )""")
+
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS dim_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            link TEXT UNIQUE
+        )""")
+
+        if not _column_exists(conn, "message_metrics", "public_link_id"):
+            c.execute("ALTER TABLE message_metrics ADD COLUMN public_link_id INTEGER")
+        if not _column_exists(conn, "message_metrics", "campaign_link_id"):
+            c.execute("ALTER TABLE message_metrics ADD COLUMN campaign_link_id INTEGER")
+        _backfill_metric_dims(c)
+
+        c.execute("""
+        CREATE VIEW IF NOT EXISTS message_metrics_view AS
+        SELECT m.id, m.user_id, m.ts_utc, m.username, m.profile_name,
+               COALESCE(g.title, m.group_name) AS group_name,
+               m.group_id,
+               COALESCE(pl.link, m.public_link) AS public_link,
+               COALESCE(cl.link, m.campaign_link) AS campaign_link,
+               m.is_env_ad
+        FROM message_metrics m
+        LEFT JOIN dim_groups g ON g.group_id = m.group_id
+        LEFT JOIN dim_links pl ON pl.id = m.public_link_id
+        LEFT JOIN dim_links cl ON cl.id = m.campaign_link_id""")
+
+        # Per-group interval (premium) and per-target next-due times for campaign cycles
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS group_intervals (
+            user_id INTEGER,
+            group_id INTEGER,
+            interval_sec INTEGER,
+            PRIMARY KEY (user_id, group_id)
+        )""")
+
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS target_due (
+            campaign_id INTEGER,
+            group_id INTEGER,
+            next_due_utc TEXT,
+            PRIMARY KEY (campaign_id, group_id)
+        )""")
+        # Same for topic links, which have no group id
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS topic_due (
+            campaign_id INTEGER,
+            link TEXT,
+            next_due_utc TEXT,
+            PRIMARY KEY (campaign_id, link)
+        )""")
+
+        # Send ledger (one row per target sent in a campaign cycle) and resume checkpoints
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS send_ledger (
+            campaign_id INTEGER,
+            cycle INTEGER,
+            target TEXT,
+            link_id INTEGER,
+            sent_utc TEXT,
+            PRIMARY KEY (campaign_id, cycle, target, link_id)
+        ) WITHOUT ROWID""")
+
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_checkpoints (
+            campaign_id INTEGER PRIMARY KEY,
+            link_idx INTEGER,
+            cycle INTEGER,
+            in_progress INTEGER DEFAULT 0,
+            updated_at TEXT
+        )""")
+
+        # Per-session target health: consecutive failures and quarantine of dead targets
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS target_health (
+            session_id INTEGER,
+            target TEXT,
+            fails INTEGER DEFAULT 0,
+            reason TEXT,
+            quarantined_until TEXT,
+            PRIMARY KEY (session_id, target)
+        ) WITHOUT ROWID""")
+
+        # Per-session learned pause between targets (features/pacer.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS session_pacing (
+            session_id INTEGER PRIMARY KEY,
+            delay_s REAL,
+            successes INTEGER DEFAULT 0,
+            floods INTEGER DEFAULT 0,
+            last_flood_at TEXT,
+            updated_at TEXT
+        )""")
+
+        # Telethon session strings when ENV.SESSION_STORE = "sqlite" (telethon/sessions.py), keyed by session path
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS session_store (
+            path TEXT PRIMARY KEY,
+            session TEXT NOT NULL,
+            updated_at TEXT
+        )""")
+
+        # Worker-process mode: commands from the bot process to campaign workers, and their status
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS worker_commands (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shard INTEGER,
+            cmd TEXT,
+            user_id INTEGER,
+            session_id INTEGER,
+            created_at TEXT
+        )""")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_worker_commands_shard ON worker_commands(shard, id)")
+
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS worker_status (
+            shard INTEGER PRIMARY KEY,
+            pid INTEGER,
+            heartbeat_at TEXT,
+            running TEXT
+        )""")
+
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_leases (
+            user_id INTEGER,
+            session_id INTEGER,
+            owner TEXT,
+            expires_at TEXT,
+            heartbeat_at TEXT,
+            acquired_at TEXT,
+            PRIMARY KEY (user_id, session_id)
+        )""")
+
         c.execute("""
         CREATE TABLE IF NOT EXISTS user_counters (
             user_id INTEGER PRIMARY KEY,
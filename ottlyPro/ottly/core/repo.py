@@ -113,6 +113,48 @@ def get_session_path(conn, session_id: int):
     row = c.fetchone()
     return row[0] if row else None
 
+@with_conn
+def list_session_paths(conn):
+    c = conn.cursor()
+    c.execute("SELECT session_path FROM sessions WHERE session_path IS NOT NULL ORDER BY id")
+    return [r[0] for r in c.fetchall()]
+
+@with_conn
+def get_stored_session(conn, path: str):
+    """(session, updated_at) from session_store, or None."""
+    c = conn.cursor()
+    c.execute("SELECT session, updated_at FROM session_store WHERE path=?", (path,))
+    return c.fetchone()
+
+@with_conn
+def stored_session_stamp(conn, path: str):
+    c = conn.cursor()
+    c.execute("SELECT updated_at FROM session_store WHERE path=?", (path,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+@with_conn
+def list_stored_sessions(conn):
+    """[(path, session, updated_at)]"""
+    c = conn.cursor()
+    c.execute("SELECT path, session, updated_at FROM session_store ORDER BY path")
+    return c.fetchall()
+
+@with_conn
+def put_stored_sessions(conn, rows: list) -> str:
+    """Upsert [(path, session)] in one transaction; returns the updated_at stamp they got."""
+    now = datetime.utcnow().isoformat()
+    conn.cursor().executemany(
+        "INSERT INTO session_store (path, session, updated_at) VALUES (?,?,?) "
+        "ON CONFLICT(path) DO UPDATE SET session=excluded.session, updated_at=excluded.updated_at",
+        [(p, sess, now) for p, sess in rows]
+    )
+    return now
+
+@with_conn
+def delete_stored_session(conn, path: str):
+    conn.cursor().execute("DELETE FROM session_store WHERE path=?", (path,))
+
 @with_conn
 def get_first_session_path(conn, user_id: int):
     c = conn.cursor()
@@ -153,6 +195,218 @@ def campaigns_running_all(conn):
     c.execute("SELECT user_id, session_id FROM campaigns WHERE is_running=1")
     return c.fetchall()
 
+@with_conn
+def set_group_interval(conn, user_id: int, group_id: int, interval_sec: Optional[int]):
+    c = conn.cursor()
+    if interval_sec is None:
+        c.execute("DELETE FROM group_intervals WHERE user_id=? AND group_id=?", (user_id, group_id))
+        return
+    c.execute(
+        "INSERT INTO group_intervals (user_id, group_id, interval_sec) VALUES (?,?,?) "
+        "ON CONFLICT(user_id, group_id) DO UPDATE SET interval_sec=excluded.interval_sec",
+        (user_id, group_id, interval_sec)
+    )
+
+@with_conn
+def get_group_intervals(conn, user_id: int) -> dict:
+    c = conn.cursor()
+    c.execute("SELECT group_id, interval_sec FROM group_intervals WHERE user_id=?", (user_id,))
+    return {gid: ivl for gid, ivl in c.fetchall()}
+
+@with_conn
+def get_target_due(conn, campaign_id: int) -> dict:
+    c = conn.cursor()
+    c.execute("SELECT group_id, next_due_utc FROM target_due WHERE campaign_id=?", (campaign_id,))
+    return {gid: due for gid, due in c.fetchall()}
+
+@with_conn
+def get_topic_due(conn, campaign_id: int) -> dict:
+    c = conn.cursor()
+    c.execute("SELECT link, next_due_utc FROM topic_due WHERE campaign_id=?", (campaign_id,))
+    return {link: due for link, due in c.fetchall()}
+
+@with_conn
+def get_checkpoint(conn, campaign_id: int):
+    """(link_idx, cycle, in_progress) of the campaign's last checkpoint, or None."""
+    c = conn.cursor()
+    c.execute("SELECT link_idx, cycle, in_progress FROM campaign_checkpoints WHERE campaign_id=?", (campaign_id,))
+    return c.fetchone()
+
+@with_conn
+def ledger_sent_targets(conn, campaign_id: int, cycle: int, link: str) -> set:
+    c = conn.cursor()
+    c.execute(
+        "SELECT l.target FROM send_ledger l JOIN dim_links d ON d.id = l.link_id "
+        "WHERE l.campaign_id=? AND l.cycle=? AND d.link=?",
+        (campaign_id, cycle, link)
+    )
+    return {r[0] for r in c.fetchall()}
+
+@with_conn
+def get_target_health(conn, session_id: int) -> list:
+    c = conn.cursor()
+    c.execute("SELECT target, fails, reason, quarantined_until FROM target_health WHERE session_id=?", (session_id,))
+    return c.fetchall()
+
+@with_conn
+def get_session_pacing(conn, session_id: int):
+    """(delay_s, successes, floods, last_flood_at) or None."""
+    c = conn.cursor()
+    c.execute("SELECT delay_s, successes, floods, last_flood_at FROM session_pacing WHERE session_id=?", (session_id,))
+    return c.fetchone()
+
+@with_conn
+def list_session_pacing(conn):
+    """[(session_id, phone, delay_s, successes, floods, last_flood_at, updated_at)], slowest first."""
+    c = conn.cursor()
+    c.execute("""SELECT p.session_id, s.phone, p.delay_s, p.successes, p.floods, p.last_flood_at, p.updated_at
+                 FROM session_pacing p LEFT JOIN sessions s ON s.id = p.session_id
+                 ORDER BY p.delay_s DESC""")
+    return c.fetchall()
+
+def _dims_after_commit(fn):
+    """
+    For @with_conn writers that look up dim ids (_link_id, _touch_group_dim): fn gets a pending
+    list as its first argument and the ids reach the module caches only once the write committed.
+    """
+    def wrapper(*args, **kwargs):
+        pending = []
+        out = fn(pending, *args, **kwargs)
+        for cache, key, value in pending:
+            cache[key] = value
+        return out
+    return wrapper
+
+@_dims_after_commit
+@with_conn
+def save_campaign_progress(conn, pending: list, campaign_id: int, due_rows: list, ledger_rows: list, checkpoint=None, health=None,
+                           pacing=None, topic_due_rows=None):
+    """
+    One transaction for everything a campaign buffered since its last flush:
+    due_rows [(group_id, next_due_utc_iso)], topic_due_rows [(link, next_due_utc_iso)], ledger_rows [(cycle, target, link, sent_utc_iso)],
+    checkpoint (link_idx, cycle, in_progress), health (session_id, [(target, fails, reason, until_iso)],
+    fails 0 = healthy again) and pacing (session_id, delay_s, successes, floods, last_flood_iso).
+    Ledger rows of older cycles are pruned.
+    """
+    c = conn.cursor()
+    if pacing:
+        c.execute(
+            "INSERT INTO session_pacing (session_id, delay_s, successes, floods, last_flood_at, updated_at) VALUES (?,?,?,?,?,?) "
+            "ON CONFLICT(session_id) DO UPDATE SET delay_s=excluded.delay_s, successes=excluded.successes, "
+            "floods=excluded.floods, last_flood_at=excluded.last_flood_at, updated_at=excluded.updated_at",
+            (*pacing, datetime.utcnow().isoformat())
+        )
+    if health and health[1]:
+        session_id, rows = health
+        c.executemany("DELETE FROM target_health WHERE session_id=? AND target=?",
+                      [(session_id, t) for t, fails, _r, _u in rows if not fails])
+        c.executemany(
+            "INSERT INTO target_health (session_id, target, fails, reason, quarantined_until) VALUES (?,?,?,?,?) "
+            "ON CONFLICT(session_id, target) DO UPDATE SET fails=excluded.fails, reason=excluded.reason, "
+            "quarantined_until=excluded.quarantined_until",
+            [(session_id, t, fails, r, u) for t, fails, r, u in rows if fails]
+        )
+    if due_rows:
+        c.executemany(
+            "INSERT INTO target_due (campaign_id, group_id, next_due_utc) VALUES (?,?,?) "
+            "ON CONFLICT(campaign_id, group_id) DO UPDATE SET next_due_utc=excluded.next_due_utc",
+            [(campaign_id, gid, due) for gid, due in due_rows]
+        )
+    if topic_due_rows:
+        c.executemany(
+            "INSERT INTO topic_due (campaign_id, link, next_due_utc) VALUES (?,?,?) "
+            "ON CONFLICT(campaign_id, link) DO UPDATE SET next_due_utc=excluded.next_due_utc",
+            [(campaign_id, link, due) for link, due in topic_due_rows]
+        )
+    if ledger_rows:
+        c.executemany(
+            "INSERT OR IGNORE INTO send_ledger (campaign_id, cycle, target, link_id, sent_utc) VALUES (?,?,?,?,?)",
+            [(campaign_id, cycle, str(target), _link_id(c, link, pending), ts) for cycle, target, link, ts in ledger_rows]
+        )
+    if checkpoint is not None:
+        link_idx, cycle, in_progress = checkpoint
+        c.execute(
+            "INSERT INTO campaign_checkpoints (campaign_id, link_idx, cycle, in_progress, updated_at) VALUES (?,?,?,?,?) "
+            "ON CONFLICT(campaign_id) DO UPDATE SET link_idx=excluded.link_idx, cycle=excluded.cycle, "
+            "in_progress=excluded.in_progress, updated_at=excluded.updated_at",
+            (campaign_id, link_idx, cycle, int(in_progress), datetime.utcnow().isoformat())
+        )
+        c.execute("DELETE FROM send_ledger WHERE campaign_id=? AND cycle < ?", (campaign_id, cycle))
+
+@with_conn
+def push_worker_command(conn, shard: int, cmd: str, user_id: int, session_id: Optional[int] = None):
+    c = conn.cursor()
+    c.execute("INSERT INTO worker_commands (shard, cmd, user_id, session_id, created_at) VALUES (?,?,?,?,?)",
+              (shard, cmd, user_id, session_id, datetime.utcnow().isoformat()))
+
+@with_conn
+def take_worker_commands(conn, shard: int):
+    """Pending (cmd, user_id, session_id) for the shard, oldest first; they are removed."""
+    c = conn.cursor()
+    c.execute("SELECT id, cmd, user_id, session_id FROM worker_commands WHERE shard=? ORDER BY id", (shard,))
+    rows = c.fetchall()
+    if rows:
+        c.execute("DELETE FROM worker_commands WHERE shard=? AND id<=?", (shard, rows[-1][0]))
+    return [(cmd, uid, sid) for _id, cmd, uid, sid in rows]
+
+@with_conn
+def save_worker_status(conn, shard: int, pid: int, running: dict):
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO worker_status (shard, pid, heartbeat_at, running) VALUES (?,?,?,?) "
+        "ON CONFLICT(shard) DO UPDATE SET pid=excluded.pid, heartbeat_at=excluded.heartbeat_at, running=excluded.running",
+        (shard, pid, datetime.utcnow().isoformat(), json.dumps(running))
+    )
+
+@with_conn
+def get_worker_status(conn):
+    """[(shard, pid, heartbeat_at, running_dict)]"""
+    c = conn.cursor()
+    c.execute("SELECT shard, pid, heartbeat_at, running FROM worker_status ORDER BY shard")
+    return [(shard, pid, hb, json.loads(running or "{}")) for shard, pid, hb, running in c.fetchall()]
+
+@with_conn
+def acquire_lease(conn, user_id: int, session_id: int, owner: str, ttl_sec: int, force: bool = False) -> bool:
+    """Take or extend the campaign lease; an unexpired lease of another owner is only taken with force."""
+    now = datetime.utcnow()
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO campaign_leases (user_id, session_id, owner, expires_at, heartbeat_at, acquired_at) VALUES (?,?,?,?,?,?) "
+        "ON CONFLICT(user_id, session_id) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at, "
+        "heartbeat_at=excluded.heartbeat_at, "
+        "acquired_at=CASE WHEN campaign_leases.owner=excluded.owner THEN campaign_leases.acquired_at ELSE excluded.acquired_at END "
+        "WHERE ? OR campaign_leases.owner=excluded.owner OR campaign_leases.expires_at < ?",
+        (user_id, session_id, owner, (now + timedelta(seconds=ttl_sec)).isoformat(), now.isoformat(), now.isoformat(),
+         int(force), now.isoformat())
+    )
+    return c.rowcount > 0
+
+@with_conn
+def renew_leases(conn, owner: str, keys, ttl_sec: int) -> set:
+    """Extend the owner's leases on keys [(user_id, session_id)]; returns the keys it still holds."""
+    now = datetime.utcnow()
+    expires = (now + timedelta(seconds=ttl_sec)).isoformat()
+    c = conn.cursor()
+    held = set()
+    for uid, sid in keys:
+        c.execute("UPDATE campaign_leases SET expires_at=?, heartbeat_at=? WHERE user_id=? AND session_id=? AND owner=?",
+                  (expires, now.isoformat(), uid, sid, owner))
+        if c.rowcount:
+            held.add((uid, sid))
+    return held
+
+@with_conn
+def release_lease(conn, user_id: int, session_id: int, owner: str):
+    c = conn.cursor()
+    c.execute("DELETE FROM campaign_leases WHERE user_id=? AND session_id=? AND owner=?", (user_id, session_id, owner))
+
+@with_conn
+def live_leases(conn):
+    """{(user_id, session_id): owner} of unexpired leases."""
+    c = conn.cursor()
+    c.execute("SELECT user_id, session_id, owner FROM campaign_leases WHERE expires_at >= ?", (datetime.utcnow().isoformat(),))
+    return {(uid, sid): owner for uid, sid, owner in c.fetchall()}
+
 @with_conn
 def premium_active(conn, user_id: int) -> bool:
     c = conn.cursor()
@@ -191,12 +445,46 @@ def remove_premium(conn, user_id: int):
     c = conn.cursor()
     c.execute("UPDATE users SET is_premium=0, premium_until=NULL WHERE user_id=?", (user_id,))
 
+# In-process copies of dim_groups / dim_links so the send path only writes when something changed.
+_GROUP_DIMS: dict[int, tuple] = {}
+_LINK_IDS: dict[str, int] = {}
+
+def _link_id(c, link: Optional[str], pending: list) -> Optional[int]:
+    if not link or link == "—":
+        return None
+    lid = _LINK_IDS.get(link)
+    if lid is None:
+        c.execute("INSERT OR IGNORE INTO dim_links (link) VALUES (?)", (link,))
+        c.execute("SELECT id FROM dim_links WHERE link=?", (link,))
+        lid = c.fetchone()[0]
+        pending.append((_LINK_IDS, link, lid))
+    return lid
+
+def _touch_group_dim(c, pending: list, group_id: int, title: Optional[str], username: Optional[str], link: Optional[str]):
+    if not group_id:
+        return
+    dims = (title, username, link if link != "—" else None)
+    if _GROUP_DIMS.get(group_id) == dims:
+        return
+    c.execute(
+        "INSERT INTO dim_groups (group_id, title, username, link, updated_at) VALUES (?,?,?,?,?) "
+        "ON CONFLICT(group_id) DO UPDATE SET title=excluded.title, username=excluded.username, "
+        "link=COALESCE(excluded.link, dim_groups.link), updated_at=excluded.updated_at",
+        (group_id, dims[0], dims[1], dims[2], datetime.utcnow().isoformat())
+    )
+    pending.append((_GROUP_DIMS, group_id, dims))
+
+@_dims_after_commit
 @with_conn
-def add_metric(conn, user_id: int, ts_utc: str, username: str, profile_name: str, group_name: str, group_id: int, public_link: str, campaign_link: str, is_env_ad: int):
+def add_metric(conn, pending: list, user_id: int, ts_utc: str, username: str, profile_name: str, group_name: str, group_id: int, public_link: str, campaign_link: str, is_env_ad: int,
+               *, group_username: Optional[str] = None, group_link: Optional[str] = None):
     c = conn.cursor()
-    c.execute("""INSERT INTO message_metrics (user_id, ts_utc, username, profile_name, group_name, group_id, public_link, campaign_link, is_env_ad)
+    _touch_group_dim(c, pending, group_id, group_name, group_username, group_link)
+    # group_name is only kept on the fact row when there is no group key to join on
+    c.execute("""INSERT INTO message_metrics (user_id, ts_utc, username, profile_name, group_name, group_id, public_link_id, campaign_link_id, is_env_ad)
                  VALUES (?,?,?,?,?,?,?,?,?)""",
-              (user_id, ts_utc, username, profile_name, group_name, group_id, public_link, campaign_link, is_env_ad))
+              (user_id, ts_utc, username, profile_name, None if group_id else group_name, group_id,
+               _link_id(c, public_link, pending), _link_id(c, campaign_link, pending), is_env_ad))
 
 @with_conn
 def bump_counters(conn, user_id: int, env_ad: bool):
@@ -0,0 +1,313 @@
+import re
+import time
+import zlib
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import pytz
+from ..core.config import ENV
+from ..core.repo import get_cfg, set_cfg
+
+# Auto Mode config (config key "auto_mode:{uid}"):
+#   {"enabled": True, "start": 210, "end": 840}                        <- legacy single daily window
+#   {"enabled": True, "tz": "Europe/London",
+#    "windows": [{"days": [0,1,2,3,4], "start": 540, "end": 1020}, ...]}  <- days: 0=Mon..6=Sun, None=daily
+# Minutes are local to tz (default ENV.TIMEZONE). A window with end <= start runs past midnight.
+
+DAY_MIN = 24 * 60
+WEEK_MIN = 7 * DAY_MIN
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def mins_to_12h(mins: int) -> str:
+    mins = mins % (24 * 60)
+    h = mins // 60
+    m = mins % 60
+    suffix = "am" if h < 12 else "pm"
+    h12 = h % 12
+    if h12 == 0:
+        h12 = 12
+    return f"{h12}:{m:02d} {suffix}"
+
+
+def parse_time_range(text: str):
+    """'3:30 am - 2:00 pm' (or 24h '09:00-17:00') -> (start_min, end_min), or None."""
+    txt = (text or "").strip().lower()
+    txt = txt.replace("–", "-")
+    if "-" not in txt:
+        return None
+    left, right = [part.strip() for part in txt.split("-", 1)]
+
+    def _one(side: str):
+        s = side
+        ampm = None
+        if s.endswith("am"):
+            ampm = "am"
+            s = s[:-2].strip()
+        elif s.endswith("pm"):
+            ampm = "pm"
+            s = s[:-2].strip()
+        if ":" in s:
+            hh_str, mm_str = s.split(":", 1)
+        else:
+            hh_str, mm_str = s, "0"
+        try:
+            hh = int(hh_str)
+            mm = int(mm_str)
+        except ValueError:
+            return None
+        if mm < 0 or mm > 59:
+            return None
+        if ampm:
+            if hh < 1 or hh > 12:
+                return None
+            if ampm == "am":
+                hh = 0 if hh == 12 else hh
+            else:
+                hh = 12 if hh == 12 else hh + 12
+        else:
+            if hh < 0 or hh > 23:
+                return None
+        return hh * 60 + mm
+
+    start = _one(left)
+    end = _one(right)
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def _parse_days(spec: str):
+    spec = spec.strip().lower()
+    if spec in ("", "daily", "everyday", "every day"):
+        return None
+    days = set()
+    for part in re.split(r"[,/\s]+", spec):
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            if a[:3] not in DAY_NAMES or b[:3] not in DAY_NAMES:
+                return False
+            i, j = DAY_NAMES.index(a[:3]), DAY_NAMES.index(b[:3])
+            while True:
+                days.add(i)
+                if i == j:
+                    break
+                i = (i + 1) % 7
+        elif part[:3] in DAY_NAMES:
+            days.add(DAY_NAMES.index(part[:3]))
+        else:
+            return False
+    return sorted(days)
+
+
+_DAYS_PREFIX_RE = re.compile(r"^\s*([a-z,/\s-]*?)\s*(?=\d)")
+
+
+def parse_windows_text(text: str):
+    """
+    Parse one window per line (or ';'-separated), each optionally prefixed with days:
+
+        mon-fri 9:00 am - 5:00 pm
+        sat,sun 11 am - 2 pm
+        tz Europe/London
+
+    Returns {"windows": [...], "tz": str|None} or None if any line is invalid.
+    """
+    windows = []
+    tz_name = None
+    for raw in re.split(r"[;\n]+", (text or "").lower()):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("tz"):
+            name = line[2:].strip(" :=")
+            match = next((z for z in pytz.all_timezones if z.lower() == name), None)
+            if not match:
+                return None
+            tz_name = match
+            continue
+        m = _DAYS_PREFIX_RE.match(line)
+        days = _parse_days(m.group(1)) if m else None
+        if days is False:
+            return None
+        rng = parse_time_range(line[m.end():] if m else line)
+        if not rng:
+            return None
+        windows.append({"days": days, "start": rng[0], "end": rng[1]})
+    if not windows:
+        return None
+    return {"windows": windows, "tz": tz_name}
+
+
+class AutoSchedule:
+    """
+    Compiled Auto Mode schedule: merged [start, end) spans in minutes of the local week.
+
+    is_open() is answered from a memo that stays valid until the next open/close
+    transition, so campaigns can ask on every step for free.
+    """
+
+    def __init__(self, spans: list, tz):
+        self.spans = spans  # sorted, merged, within [0, WEEK_MIN)
+        self.starts = [s for s, _ in spans]
+        self.tz = tz
+        self._memo = (0.0, 0.0, False)  # (computed_at, valid_until, open)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """None means Auto Mode is off (always open)."""
+        if not isinstance(cfg, dict) or not cfg.get("enabled"):
+            return None
+        windows = cfg.get("windows")
+        if not isinstance(windows, list):
+            windows = [{"days": None, "start": cfg.get("start", 0), "end": cfg.get("end", DAY_MIN)}]
+        try:
+            tz = pytz.timezone(cfg.get("tz") or ENV.TIMEZONE)
+        except Exception:
+            tz = pytz.timezone(ENV.TIMEZONE)
+        raw = []
+        for w in windows:
+            try:
+                start = max(0, min(DAY_MIN, int(w.get("start", 0))))
+                end = max(0, min(DAY_MIN, int(w.get("end", DAY_MIN))))
+            except Exception:
+                continue
+            if start == end:
+                continue  # misconfigured window never opens
+            length = end - start if end > start else DAY_MIN - start + end
+            for day in (w.get("days") or range(7)):
+                s = int(day) % 7 * DAY_MIN + start
+                e = s + length
+                if e <= WEEK_MIN:
+                    raw.append((s, e))
+                else:
+                    raw.append((s, WEEK_MIN))
+                    raw.append((0, e - WEEK_MIN))
+        raw.sort()
+        spans = []
+        for s, e in raw:
+            if spans and s <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], e))
+            else:
+                spans.append((s, e))
+        return cls(spans, tz)
+
+    # --- local week helpers ---
+
+    def _local(self, ts: float) -> datetime:
+        return datetime.fromtimestamp(ts, self.tz)
+
+    @staticmethod
+    def _week_minute(dt: datetime) -> float:
+        return dt.weekday() * DAY_MIN + dt.hour * 60 + dt.minute + dt.second / 60
+
+    def _at_week_minute(self, local_now: datetime, week_min: float) -> float:
+        week_start = local_now.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=local_now.weekday())
+        naive = week_start + timedelta(minutes=week_min)
+        return self.tz.normalize(self.tz.localize(naive)).timestamp()
+
+    def _span_at(self, wm: float):
+        i = bisect_right(self.starts, wm) - 1
+        if i >= 0 and wm < self.spans[i][1]:
+            return i
+        return None
+
+    # --- queries ---
+
+    def is_open(self, ts: float | None = None) -> bool:
+        ts = time.time() if ts is None else ts
+        computed_at, valid_until, is_open = self._memo
+        if computed_at <= ts < valid_until:
+            return is_open
+        is_open = self._span_at(self._week_minute(self._local(ts))) is not None
+        nxt = self.next_close(ts) if is_open else self.next_open(ts)
+        self._memo = (ts, nxt if nxt is not None else ts + 3600, is_open)
+        return is_open
+
+    def next_open(self, ts: float | None = None):
+        """Timestamp the schedule is next open at (ts itself when open now); None if it never opens."""
+        ts = time.time() if ts is None else ts
+        if not self.spans:
+            return None
+        local = self._local(ts)
+        wm = self._week_minute(local)
+        if self._span_at(wm) is not None:
+            return ts
+        i = bisect_right(self.starts, wm)
+        start = self.starts[i] if i < len(self.starts) else self.starts[0] + WEEK_MIN
+        return self._at_week_minute(local, start)
+
+    def next_close(self, ts: float | None = None):
+        """Timestamp the current (or next) window closes; None when open around the clock."""
+        ts = time.time() if ts is None else ts
+        if not self.spans:
+            return None
+        if self.spans == [(0, WEEK_MIN)]:
+            return None
+        local = self._local(ts)
+        wm = self._week_minute(local)
+        i = self._span_at(wm)
+        if i is None:
+            i = bisect_right(self.starts, wm) % len(self.spans)
+        end = self.spans[i][1]
+        if end <= wm:
+            end += WEEK_MIN
+        if end == WEEK_MIN and self.spans[0][0] == 0:
+            end += self.spans[0][1]  # window runs on past Sunday midnight
+        return self._at_week_minute(local, end)
+
+    def describe(self) -> str:
+        cfg_lines = []
+        for s, e in self.spans:
+            day = DAY_NAMES[s // DAY_MIN].capitalize()
+            cfg_lines.append(f"{day} {mins_to_12h(s % DAY_MIN)} - {mins_to_12h(e % DAY_MIN)}")
+        return "\n".join(cfg_lines) or "never"
+
+
+# --- per-user compiled cache ---
+_COMPILED: dict[int, AutoSchedule | None] = {}
+
+
+def auto_schedule_for(user_id: int):
+    """Compiled schedule for the user (None = Auto Mode off). Rebuilt only after set_auto_mode()."""
+    if user_id in _COMPILED:
+        return _COMPILED[user_id]
+    try:
+        cfg = get_cfg(f"auto_mode:{user_id}", None)
+    except Exception:
+        cfg = None
+    sched = AutoSchedule.from_config(cfg)
+    _COMPILED[user_id] = sched
+    return sched
+
+
+def set_auto_mode(user_id: int, cfg: dict):
+    set_cfg(f"auto_mode:{user_id}", cfg)
+    _COMPILED.pop(user_id, None)
+
+
+def stagger_offset(key) -> int:
+    """Stable per-campaign delay after a window opens, so openings don't all fire at once."""
+    if ENV.AUTO_OPEN_STAGGER_SEC <= 0:
+        return 0
+    return zlib.crc32(repr(key).encode()) % ENV.AUTO_OPEN_STAGGER_SEC
+
+
+def opening_load(user_ids, bucket_min: int = 30) -> list:
+    """[(label, campaigns_opening)] across the week for the given users, busiest first."""
+    buckets: dict[int, int] = {}
+    for uid in user_ids:
+        sched = auto_schedule_for(uid)
+        if not sched:
+            continue
+        for s, _ in sched.spans:
+            if s == 0 and sched.spans[-1][1] == WEEK_MIN:
+                continue  # continuation of Sunday's window, not an opening
+            b = int(s // bucket_min)
+            buckets[b] = buckets.get(b, 0) + 1
+    out = []
+    for b, n in sorted(buckets.items(), key=lambda kv: (-kv[1], kv[0])):
+        wm = b * bucket_min
+        out.append((f"{DAY_NAMES[wm // DAY_MIN].capitalize()} {mins_to_12h(wm % DAY_MIN)}", n))
+    return out
@@ -1,8 +1,66 @@
-# autostart.py (stub)
+import logging
+from ..core.repo import campaigns_running_all, list_sessions
+from .leases import leases_enabled, lease_loop, unowned
+from .supervisor import is_live, live_keys
 
-import asyncio
+log = logging.getLogger("camprun.autostart")
 
-async def autostart_all(main_bot, arg2, log_bot, owner_id):
-    # TODO: Implement autostart logic
-    await asyncio.sleep(0)  # placeholder for async compatibility
-    pass
+
+async def resume_campaigns(main_bot, log_bot, owner_id, accept=None) -> int:
+    """
+    Start every is_running campaign that isn't running here and isn't leased to a live process.
+    accept(session_id) narrows it down (a campaign worker only takes its own shard).
+    """
+    from .campaigns import start_campaign_for, start_balanced_campaigns, balanced_mode
+    keys = [tuple(k) for k in campaigns_running_all() if not is_live(tuple(k))]
+    # balanced users resume as one multi-account run, on the worker of their first session
+    balanced = {}
+    for uid, sid in keys:
+        if uid not in balanced:
+            balanced[uid] = balanced_mode(uid)
+    keys_solo = [k for k in keys if not balanced[k[0]]]
+    if accept is not None:
+        keys_solo = [k for k in keys_solo if accept(k[1])]
+    started = 0
+    free = unowned([k for k in keys if balanced[k[0]]])
+    for uid in (u for u, on in balanced.items() if on):
+        sids = [sid for u, sid in free if u == uid]
+        owner_sid = min((sid for sid, *_ in list_sessions(uid)), default=None)
+        if not sids or (accept is not None and (owner_sid is None or not accept(owner_sid))):
+            continue
+        if any(u == uid for u, _sid in live_keys()):
+            continue  # the user's plan is running here: a lone session is not split off into its own plan
+        try:
+            await start_balanced_campaigns(main_bot, log_bot, owner_id, uid, sids=sids)
+        except Exception:
+            log.exception("balanced resume failed for user %s", uid)
+            continue
+        started += sum(1 for sid in sids if is_live((uid, sid)))
+    for uid, sid in unowned(keys_solo):
+        try:
+            await start_campaign_for(main_bot, None, log_bot, owner_id, uid, sid, None, takeover=False)
+        except Exception:
+            log.exception("resume failed for %s/%s", uid, sid)
+            continue
+        if is_live((uid, sid)):
+            started += 1
+    if started:
+        log.info("resumed %s campaign(s)", started)
+    return started
+
+
+async def autostart_all(main_bot, arg2, log_bot, owner_id, accept=None):
+    """Resume campaigns on boot; with leases, keep renewing them and take over those of dead instances."""
+    try:
+        from ..telethon.sessions import preload_sessions
+        log.info("preloaded %s session(s)", preload_sessions())
+    except Exception:
+        log.exception("session preload failed")
+    await resume_campaigns(main_bot, log_bot, owner_id, accept)
+    if not leases_enabled():
+        return
+    from .campaigns import stop_campaign_for
+    await lease_loop(
+        on_lost=lambda key: stop_campaign_for(*key),
+        on_tick=lambda: resume_campaigns(main_bot, log_bot, owner_id, accept),
+    )
@@ -0,0 +1,104 @@
+import time
+
+
+class AccountPlan:
+    """
+    Splits one user's target groups across their accounts (multi-account campaign mode).
+
+    Every group is posted by exactly one account: groups that only one account is in go to it,
+    the rest go to the least loaded account that is not in a flood wait. The split is sticky and
+    only recomputed when an account floods or leaves, so groups don't bounce between accounts.
+    Campaign runs share next_due, so a group that moves keeps its schedule.
+    """
+
+    def __init__(self, user_id: int, membership: dict):
+        self.user_id = user_id
+        self.membership = {sid: list(gids) for sid, gids in membership.items()}  # sid -> gids it can post to
+        self.holders: dict[int, list] = {}  # gid -> sids that are in the group
+        for sid, gids in self.membership.items():
+            for gid in gids:
+                self.holders.setdefault(gid, []).append(sid)
+        self.owner: dict[int, int] = {}  # gid -> sid
+        self.flood_until: dict[int, float] = {}
+        self.left: set = set()
+        self.next_due: dict = {}  # shared by the runs of this plan (group ids and topic links)
+        self._dirty = True
+        self._recheck_at = None  # earliest flood-wait end
+
+    @property
+    def total_groups(self) -> int:
+        return len(self.holders)
+
+    @property
+    def duplicates_removed(self) -> int:
+        return sum(len(g) for g in self.membership.values()) - len(self.holders)
+
+    def groups_for(self, session_id: int) -> list:
+        if self._recheck_at is not None and time.time() >= self._recheck_at:
+            self._dirty = True
+        if self._dirty:
+            self._rebalance()
+        return [gid for gid in self.membership.get(session_id, []) if self.owner.get(gid) == session_id]
+
+    def topics_for(self, session_id: int, topic_links: list) -> list:
+        """
+        Topic links are user-wide: deal them out round-robin over the accounts that are still running
+        (those not in a flood wait, if any), so each is posted by one account.
+        """
+        now = time.time()
+        alive = sorted(sid for sid in self.membership if sid not in self.left)
+        sids = [sid for sid in alive if self.flood_until.get(sid, 0) <= now] or alive
+        if session_id not in sids:
+            return []
+        return list(topic_links)[sids.index(session_id)::len(sids)]
+
+    def note_flood(self, session_id: int, seconds: float):
+        """The account hit a FloodWait: hand its groups to other accounts until it ends."""
+        until = time.time() + seconds
+        if until > self.flood_until.get(session_id, 0):
+            self.flood_until[session_id] = until
+            self._dirty = True
+
+    def leave(self, session_id: int):
+        """The account's run ended: its groups move to the remaining accounts."""
+        self.left.add(session_id)
+        self._dirty = True
+
+    def rejoin(self, session_id: int):
+        """The account's run was restarted after a failure: it takes its share again."""
+        self.left.discard(session_id)
+        self._dirty = True
+
+    def _rebalance(self):
+        now = time.time()
+        alive = [sid for sid in self.membership if sid not in self.left]
+        ready = {sid for sid in alive if self.flood_until.get(sid, 0) <= now}
+        counts = {sid: 0 for sid in alive}
+        owner = {}
+        # keep current owners that can still post, up to a fair share each
+        fair = -(-len(self.holders) // max(1, len(ready)))
+        for gid, sid in self.owner.items():
+            if sid in ready and counts[sid] < fair:
+                owner[gid] = sid
+                counts[sid] += 1
+        # groups with fewest candidate accounts first, so shared groups fill the gaps
+        pending = sorted((g for g in self.holders if g not in owner), key=lambda g: len(self.holders[g]))
+        for gid in pending:
+            cands = [s for s in self.holders[gid] if s in counts]
+            if not cands:
+                continue
+            sid = min(cands, key=lambda s: (s not in ready, counts[s], s))
+            owner[gid] = sid
+            counts[sid] += 1
+        self.owner = owner
+        self._dirty = False
+        floods = [t for s, t in self.flood_until.items() if t > now and s in counts]
+        self._recheck_at = min(floods) if floods else None
+
+    def loads(self) -> dict:
+        """sid -> number of groups currently assigned to it."""
+        self.groups_for(None)
+        out = {sid: 0 for sid in self.membership}
+        for sid in self.owner.values():
+            out[sid] += 1
+        return out
@@ -0,0 +1,145 @@
+import logging
+import time
+from telethon import events, types, utils
+from ..core.config import ENV
+from ..telethon.capabilities import CAPS, _caps_from_entity
+from ..telethon.resolver import ENTITIES, prime
+from .target_health import health_for
+
+log = logging.getLogger("camprun.cache_events")
+
+# Opt-in (ENV.CAMPAIGN_UPDATE_LISTENER): pooled campaign clients listen for membership and group
+# changes and patch the dialog snapshot, the entity/capability caches and target health as they
+# happen, instead of finding out from a failed send or a full iter_dialogs rescan.
+
+_TYPES = [types.UpdateChannel, types.UpdateChannelParticipant, types.UpdateChatParticipant,
+          types.UpdateChatDefaultBannedRights]
+
+# session_path -> (client, listening_since); a snapshot taken after listening_since stays valid
+LISTENING: dict = {}
+STATS = {"updates": 0, "left": 0, "joined": 0, "changed": 0, "migrated": 0}
+
+
+def attach_cache_listener(client, session_id: int, session_path: str):
+    """Register the listener on a pooled client (once per client object)."""
+    if not ENV.CAMPAIGN_UPDATE_LISTENER or getattr(client, "_cache_listener", False):
+        return
+    client._cache_listener = True
+
+    async def on_update(update):
+        try:
+            _apply(client, session_id, session_path, update)
+        except Exception:
+            log.exception("cache update failed for session %s", session_id)
+
+    client.add_event_handler(on_update, events.Raw(types=_TYPES))
+    LISTENING[session_path] = (client, time.time())
+
+
+def snapshot_live(session_path: str, snapshot_ts: float) -> bool:
+    """True if the dialog snapshot taken at snapshot_ts has been kept up to date by updates since."""
+    hit = LISTENING.get(session_path)
+    if not hit:
+        return False
+    client, since = hit
+    try:
+        connected = client.is_connected()
+    except Exception:
+        connected = False
+    if not connected:
+        LISTENING.pop(session_path, None)
+        return False
+    return snapshot_ts >= since
+
+
+def _patch_snapshot(session_path: str, remove=(), upsert=None):
+    from .campaigns import DIALOGS_CACHE
+    cached = DIALOGS_CACHE.get(session_path)
+    if not cached:
+        return
+    ts, entries = cached
+    drop = set(remove)
+    if upsert is not None:
+        drop.add(upsert[0])
+    entries = [(g, t) for g, t in entries if g not in drop]
+    if upsert is not None:
+        entries.append(upsert)
+        entries.sort(key=lambda x: x[1].lower())
+    DIALOGS_CACHE[session_path] = (ts, entries)
+
+
+def _forget(session_id: int, gid: int):
+    ENTITIES.pop((session_id, gid), None)
+    caps = CAPS.get((session_id, gid))
+    if caps is not None:
+        caps.stale = True
+
+
+def _group_gone(session_id: int, session_path: str, gid: int, reason: str):
+    STATS["left"] += 1
+    _forget(session_id, gid)
+    health_for(session_id).mark_gone(str(gid), reason)
+    _patch_snapshot(session_path, remove=[gid])
+
+
+def _was_locked_out(session_id: int, gid: int) -> bool:
+    """The cached state before this update said the account had left, was banned or couldn't write."""
+    hit = ENTITIES.get((session_id, gid))
+    prev = hit[1] if hit else None
+    if prev is not None and (isinstance(prev, (types.ChannelForbidden, types.ChatForbidden)) or getattr(prev, "left", False)):
+        return True
+    caps = CAPS.get((session_id, gid))
+    if caps is not None and caps.ready_at() is None:
+        return True
+    entry = health_for(session_id).entries.get(str(gid))
+    return bool(entry) and entry[1] in ("left", "banned")
+
+
+def _group_changed(session_id: int, session_path: str, ent):
+    gid = ent.id
+    if isinstance(ent, (types.ChannelForbidden, types.ChatForbidden)):
+        return _group_gone(session_id, session_path, gid, "banned")
+    if getattr(ent, "left", False) or getattr(ent, "deactivated", False):
+        return _group_gone(session_id, session_path, gid, "left")
+    STATS["changed"] += 1
+    rejoined = _was_locked_out(session_id, gid) and _caps_from_entity(ent).ready_at() is not None
+    caps = CAPS.get((session_id, gid))
+    if caps is not None:
+        caps.stale = True
+    prime(session_id, [ent])  # new username / title / rights
+    if rejoined:
+        health_for(session_id).record(str(gid), None)  # rejoined or unbanned: let it through again
+    if getattr(ent, "megagroup", False) or isinstance(ent, types.Chat):
+        title = getattr(ent, "title", None) or getattr(ent, "username", None) or str(gid)
+        _patch_snapshot(session_path, upsert=(gid, title))
+
+
+def _apply(client, session_id: int, session_path: str, update):
+    STATS["updates"] += 1
+    ents = getattr(update, "_entities", None) or {}
+    for ent in ents.values():
+        migrated = getattr(ent, "migrated_to", None)
+        if isinstance(ent, types.Chat) and isinstance(migrated, types.InputChannel):
+            # basic group upgraded to a supergroup: the old id is gone for good
+            STATS["migrated"] += 1
+            _group_gone(session_id, session_path, ent.id, "not_found")
+    if isinstance(update, types.UpdateChannel):
+        ent = ents.get(utils.get_peer_id(types.PeerChannel(update.channel_id)))
+        if ent is None:
+            _forget(session_id, update.channel_id)  # refetched by the next bulk resolve
+        else:
+            _group_changed(session_id, session_path, ent)
+    elif isinstance(update, (types.UpdateChannelParticipant, types.UpdateChatParticipant)):
+        self_id = getattr(client._mb_entity_cache, "self_id", None)
+        if self_id is None or update.user_id != self_id:
+            return
+        gid = update.channel_id if isinstance(update, types.UpdateChannelParticipant) else update.chat_id
+        new = update.new_participant
+        if new is None or isinstance(new, (types.ChannelParticipantBanned, types.ChannelParticipantLeft)):
+            _group_gone(session_id, session_path, gid, "banned" if new is not None else "left")
+        else:
+            STATS["joined"] += 1
+            _forget(session_id, gid)
+            health_for(session_id).record(str(gid), None)
+    elif isinstance(update, types.UpdateChatDefaultBannedRights):
+        _forget(session_id, utils.resolve_id(utils.get_peer_id(update.peer))[0])
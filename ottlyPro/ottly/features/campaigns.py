@@ -1,83 +1,71 @@
 import asyncio
 import json
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardButton
-from telethon import functions
+from telethon import errors, functions
 from ..core.repo import (
     list_sessions, insert_campaign, get_latest_campaign, get_latest_campaign_any, get_session_path,
-    set_campaign_running, get_cfg, premium_active
+    set_campaign_running, get_group_intervals, get_target_due, get_topic_due,
+    get_checkpoint, ledger_sent_targets, save_campaign_progress, get_cfg, set_cfg
 )
-from ..telethon.client import client_from_session_file
-from ..telethon.forwards import forward_to_groups, parse_post_link
+from ..telethon.client import client_from_session_file, borrow_client, pin_client, unpin_client
+from ..telethon.governor import interactive_egress
+from ..telethon.forwards import ForwardCycle
 from ..features.pagination import slice_page
-from ..tg.logging_svc import send_live_log
-from ..core.timeutil import now_local
-
-RUNNING_TASKS: dict[tuple[int,int], asyncio.Task] = {}
-
-def _auto_mode_config(user_id: int):
-    try:
-        cfg = get_cfg(f"auto_mode:{user_id}", None)
-    except Exception:
-        cfg = None
-    if not isinstance(cfg, dict):
-        return None
-    if not cfg.get("enabled"):
-        return None
-    try:
-        start = int(cfg.get("start", 0))
-        end = int(cfg.get("end", 24 * 60))
-    except Exception:
-        return None
-    start = max(0, min(24 * 60, start))
-    end = max(0, min(24 * 60, end))
-    return start, end
-
-
-def _auto_mode_allows_now(user_id: int) -> bool:
-    cfg = _auto_mode_config(user_id)
-    if not cfg:
-        return True
-    start, end = cfg
-    now = now_local()
-    mins = now.hour * 60 + now.minute
-    if start == end:
-        return False
-    if start < end:
-        return start <= mins < end
-    return mins >= start or mins < end
-
-
-async def _auto_mode_sleep(user_id: int, interval: int):
-    cfg = _auto_mode_config(user_id)
-    if not cfg:
-        await asyncio.sleep(interval)
+from ..tg.logging_svc import send_live_log, close_live_digest
+from ..core.timeutil import now_local, TZ
+from .scheduler import SCHEDULER, JobHandle
+from .auto_schedule import auto_schedule_for, stagger_offset
+from .balancer import AccountPlan
+from .target_health import health_for
+from .pacer import pacer_for
+from .send_plan import SendPlan, user_tier
+from .cache_events import attach_cache_listener, snapshot_live
+from ..telethon.resolver import prime
+from .workers import delegated, send_command, remote_running
+from .leases import claim, release, lease_held
+from . import supervisor
+from .shutdown import shutting_down
+from ..telethon.capabilities import refresh_caps, split_postable, note_send_result, mark_stale
+
+# Sends, due times and the checkpoint are buffered and written in one transaction this often
+PROGRESS_FLUSH_TARGETS = 10
+PROGRESS_FLUSH_SEC = 120
+# A group whose send failed (not a FloodWait) is retried after this, or its own interval if shorter
+FAILED_RETRY_S = 300
+
+# (user_id, session_id) -> scheduler handle (task-like: cancel / cancelled / done)
+RUNNING_TASKS: dict[tuple[int,int], JobHandle] = {}
+# (user_id, session_id) -> CampaignRun currently scheduled
+LIVE_RUNS: dict = {}
+
+# Parked campaigns whose schedule never opens (all windows removed) are re-checked this rarely;
+# set_auto_mode() callers wake them explicitly via wake_user_campaigns().
+AUTO_PARK_NEVER_S = 7 * 24 * 3600
+
+
+def _auto_mode_due(user_id: int, key, due: float) -> float:
+    """due itself, or the next Auto Mode opening (plus this campaign's stagger) if the window is closed then."""
+    sched = auto_schedule_for(user_id)
+    if sched is None or sched.is_open(due):
+        return due
+    opens = sched.next_open(due)
+    if opens is None:
+        return due + AUTO_PARK_NEVER_S
+    return opens + stagger_offset(key)
+
+
+def wake_user_campaigns(user_id: int):
+    """Re-evaluate the user's parked campaigns now (call after changing their Auto Mode schedule)."""
+    if delegated():
+        send_command("refresh", user_id, all_shards=True)
         return
-    start, end = cfg
-    now = now_local()
-    mins = now.hour * 60 + now.minute
-    if start == end:
-        # misconfigured: don't send, just back off a bit
-        await asyncio.sleep(60)
-        return
-    if start < end:
-        if start <= mins < end:
-            await asyncio.sleep(interval)
-            return
-        if mins < start:
-            delta = start - mins
-        else:
-            delta = 24 * 60 - mins + start
-    else:
-        # window crosses midnight
-        if mins >= start or mins < end:
-            await asyncio.sleep(interval)
-            return
-        if mins < start:
-            delta = start - mins
-        else:
-            delta = 24 * 60 - mins + start
-    await asyncio.sleep(delta * 60)
+    for key in list(RUNNING_TASKS):
+        if key[0] == user_id:
+            SCHEDULER.wake(key)
 
 
 # --- Lightweight cache to speed up group selection ---
@@ -120,26 +108,59 @@ async def count_all_groups_in_session(session_path:str) -> int:
             pass
     return total
 
-async def build_groups_markup(session_path:str, selected:set[int], page:int=0):
-    # Build a fast, paginated list of groups using cached dialogs (gid, title)
+async def _cached_group_entries(session_path:str):
+    # Fast list of (gid, title) for the session, cached for CACHE_TTL
+    now_ts = int(time.time())
+    cached = DIALOGS_CACHE.get(session_path)
+    if cached and (now_ts - cached[0] < CACHE_TTL or snapshot_live(session_path, cached[0])):
+        return cached[1]
     client = await client_from_session_file(session_path)
     try:
         await client.connect()
     except Exception:
         pass
     try:
-        now_ts = int(__import__('time').time())
-        cached = DIALOGS_CACHE.get(session_path)
-        if cached and (now_ts - cached[0] < CACHE_TTL):
-            entries = cached[1]
-        else:
-            entries = await _list_group_dialogs_fast(client)  # list[(gid, title)]
-            DIALOGS_CACHE[session_path] = (now_ts, entries)
+        entries = await _list_group_dialogs_fast(client)  # list[(gid, title)]
+        DIALOGS_CACHE[session_path] = (now_ts, entries)
     finally:
         try:
             await client.disconnect()
         except Exception:
             pass
+    return entries
+
+def fmt_interval(sec:int) -> str:
+    if sec % 3600 == 0:
+        return f"{sec // 3600}h"
+    if sec % 60 == 0:
+        return f"{sec // 60}m"
+    return f"{sec}s"
+
+async def build_group_intervals_markup(session_path:str, intervals:dict, page:int=0):
+    # Paginated group list showing each group's own interval (premium per-group interval)
+    entries = await _cached_group_entries(session_path)
+    items, prev_page, next_page, total, pages = slice_page(entries, page, per_page=8)
+
+    btn = InlineKeyboardBuilder()
+    for gid, name in items:
+        ivl = fmt_interval(intervals[gid]) if gid in intervals else "default"
+        btn.row(InlineKeyboardButton(text=f"⏱️ {name} — {ivl}", callback_data=f"pgi_grp:{gid}"))
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(text="⏮️ Back", callback_data=f"pgi_page:{prev_page}"))
+    if (page+1) < pages:
+        nav.append(InlineKeyboardButton(text="⏭️ Next", callback_data=f"pgi_page:{next_page}"))
+    if nav:
+        btn.row(*nav)
+    btn.row(InlineKeyboardButton(text="Ads Manager Section", callback_data="back_ads"))
+
+    text = (f"⏱️ Per-group interval. Page {page+1}/{max(1,pages)} (Total groups: {total})\n"
+            "Tap a group to set how often it receives your ad. Groups on <b>default</b> use the campaign interval.")
+    return text, btn.as_markup()
+
+async def build_groups_markup(session_path:str, selected:set[int], page:int=0):
+    # Build a fast, paginated list of groups using cached dialogs (gid, title)
+    entries = await _cached_group_entries(session_path)
 
     # Paginate small pages for speed
     items, prev_page, next_page, total, pages = slice_page(entries, page, per_page=8)
@@ -198,7 +219,339 @@ async def create_env_ad_post_and_link(client) -> str:
         link = f"https://t.me/c/{cid}/{msg.id}"
     return link
 
-async def start_campaign_for(main_bot, admin_log_bot_unused, log_bot, owner_id: int, user_id:int, session_id:int, kb_join):
+class CampaignRun:
+    """
+    Scheduler job for one (user, session) campaign.
+
+    Each step borrows the session's pooled client, sends to one target and returns when the
+    next target (or, after the last one, the next link) is due. Nothing waits in between.
+    """
+
+    def __init__(self, main_bot, log_bot, owner_id: int, user_id: int, session_id: int,
+                 camp_id: int, session_path: str, links: list, gids: list, interval: int,
+                 plan: AccountPlan | None = None):
+        self.main_bot = main_bot
+        self.log_bot = log_bot
+        self.owner_id = owner_id
+        self.user_id = user_id
+        self.session_id = session_id
+        self.camp_id = camp_id
+        self.session_path = session_path
+        self.links = links
+        self.gids = gids
+        self.interval = int(interval)
+        self.started = False
+        self.topic_links = []
+        self._user_topics: dict = {}  # all of the user's topic links (a plan deals them out per cycle)
+        self.with_tag = False
+        self.link_idx = 0
+        self.target_idx = 0
+        self.cycle = None
+        self.send_plan = None  # SendPlan: parsed links/topics, sources, tag mode and delays, reused by every cycle
+        self.group_intervals = {}  # gid -> interval_sec (premium per-group interval)
+        self.plan = plan  # multi-account mode: which of gids this account posts to
+        self.next_due = plan.next_due if plan else {}  # gid / topic link -> unix ts it may be posted to again
+        self._due_dirty = []  # (gid, iso) not yet persisted
+        self._topic_due_dirty = []  # (link, iso) not yet persisted
+        self.cycle_no = 0  # cycle number in the send ledger
+        self._ledger_dirty = []  # (cycle, target, link, iso) not yet persisted
+        self._checkpoint = None  # (link_idx, cycle, in_progress) not yet persisted
+        self._resume_sent = None  # targets already sent in the cycle being resumed after a restart
+        self._last_flush = time.time()
+        self.health = None  # TargetHealth of this session: quarantined targets are left out of cycles
+        self.pacer = None  # Pacer of this session: learned pause between targets
+        self._target_cost = 30.0  # avg seconds a target costs (send + delay), for the reclaimed-time report
+        self.record = supervisor.CampaignRecord((user_id, session_id))  # the registry's record once scheduled
+
+    async def _begin(self, client) -> bool:
+        set_campaign_running(self.camp_id, 1)
+
+        # --- SEND THE ONE-TIME "started the campaign" LOG ---
+        try:
+            ts_str = now_local().strftime("%d/%m/%Y %H:%M:%S %Z")
+            mins = int(self.interval // 60)
+            first_link = self.links[0]
+            init_text = (
+                "started the campaign \n"
+                f"🕒 {ts_str}\n"
+                f'🔗 Source: <a href="{first_link}">Open Post</a> \n'
+                f"👥 Total Group: {len(self.gids)}\n\n"
+                f"⏱ Interval: {int(self.interval)}s ({mins}m)"
+            )
+            await send_live_log(self.log_bot, self.user_id, init_text)
+        except Exception:
+            pass
+        # ----------------------------------------------------
+
+        self.send_plan = self._build_send_plan()
+        _lk, first_peer, first_id = self.send_plan.links[0]
+        if not first_peer or not first_id:
+            return False
+        try:
+            for gid, iso in get_target_due(self.camp_id).items():
+                self.next_due[gid] = datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+            for link, iso in get_topic_due(self.camp_id).items():
+                self.next_due[link] = datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+        except Exception:
+            pass
+        self.health = health_for(self.session_id)
+        self.pacer = pacer_for(self.session_id)
+        attach_cache_listener(client, self.session_id, self.session_path)
+        # Resume: continue the interrupted cycle, skipping targets the ledger says were sent
+        try:
+            ckpt = get_checkpoint(self.camp_id)
+        except Exception:
+            ckpt = None
+        if ckpt:
+            link_idx, cycle_no, in_progress = ckpt
+            self.cycle_no = int(cycle_no or 0)
+            if link_idx is not None and 0 <= int(link_idx) < len(self.links):
+                self.link_idx = int(link_idx)
+                if in_progress:
+                    try:
+                        self._resume_sent = ledger_sent_targets(self.camp_id, self.cycle_no, self.links[self.link_idx])
+                    except Exception:
+                        self._resume_sent = None
+        self.started = True
+        return True
+
+    def _build_send_plan(self, previous: SendPlan | None = None) -> SendPlan:
+        sp = SendPlan.build(self.user_id, self.links)
+        self._user_topics = dict(sp.topics)
+        if self.plan:
+            sp.topics = {ln: sp.topics[ln] for ln in self.plan.topics_for(self.session_id, sp.topic_links)}
+        if previous is not None:
+            # same account and links: resolved sources and identity stay valid
+            sp.sources = previous.sources
+            sp.identity = previous.identity
+        self.topic_links = sp.topic_links
+        self.with_tag = sp.with_tag
+        return sp
+
+    def _deal_topics(self):
+        """Balanced runs: the accounts running right now share the user's topic links."""
+        if self.plan:
+            self.send_plan.topics = {ln: self._user_topics[ln]
+                                     for ln in self.plan.topics_for(self.session_id, list(self._user_topics))}
+            self.topic_links = self.send_plan.topic_links
+
+    def _interval_for(self, gid) -> int:
+        return int(self.group_intervals.get(gid) or self.interval)
+
+    def _due_groups(self) -> list:
+        try:
+            self.group_intervals = get_group_intervals(self.user_id) if self.send_plan.premium else {}
+        except Exception:
+            self.group_intervals = {}
+        if self.plan:
+            self.gids = self.plan.groups_for(self.session_id)
+        now = time.time()
+        return [g for g in self.gids
+                if self.next_due.get(g, 0) <= now and self.health.allowed(str(g), self._target_cost)]
+
+    def _due_topics(self) -> list:
+        """Topic links whose campaign interval has elapsed (they have no per-group interval)."""
+        now = time.time()
+        return [t for t in self.topic_links
+                if self.next_due.get(t, 0) <= now and self.health.allowed(t, self._target_cost)]
+
+    async def _postable(self, client, gids: list) -> list:
+        """Drop groups that can't take a post now: slow mode pushes the group's due time to when it
+        may post again, send-restricted groups wait a full interval and their caps are re-fetched
+        when they come up again."""
+        try:
+            await refresh_caps(client, self.session_id, gids)
+        except Exception:
+            return gids
+        ok, deferred, blocked = split_postable(self.session_id, gids)
+        for gid, ready in deferred.items():
+            self.next_due[gid] = ready
+        now = time.time()
+        for gid in blocked:
+            self.next_due[gid] = now + self._interval_for(gid)
+        mark_stale(self.session_id, blocked)
+        return ok
+
+    def _mark_sent(self, gid):
+        self._mark_due(gid, time.time() + self._interval_for(gid))
+
+    def _mark_due(self, gid, due: float):
+        self.next_due[gid] = due
+        self._due_dirty.append((gid, datetime.fromtimestamp(due, timezone.utc).replace(tzinfo=None).isoformat()))
+
+    def _mark_topic_due(self, link: str, due: float):
+        self.next_due[link] = due
+        self._topic_due_dirty.append((link, datetime.fromtimestamp(due, timezone.utc).replace(tzinfo=None).isoformat()))
+
+    def _record_sent(self, key: str):
+        self._ledger_dirty.append((self.cycle_no, key, self.cycle.source_link, datetime.utcnow().isoformat()))
+
+    def _flush(self):
+        """Persist buffered due times, ledger rows and the checkpoint in one transaction."""
+        self._last_flush = time.time()
+        health_dirty = bool(self.health and self.health.dirty)
+        pacing_dirty = bool(self.pacer and self.pacer.dirty)
+        if not (self._due_dirty or self._topic_due_dirty or self._ledger_dirty or self._checkpoint
+                or health_dirty or pacing_dirty):
+            return
+        due, self._due_dirty = self._due_dirty, []
+        topic_due, self._topic_due_dirty = self._topic_due_dirty, []
+        ledger, self._ledger_dirty = self._ledger_dirty, []
+        ckpt, self._checkpoint = self._checkpoint, None
+        health = (self.session_id, self.health.take_dirty()) if health_dirty else None
+        pacing = self.pacer.take_dirty() if pacing_dirty else None
+        try:
+            save_campaign_progress(self.camp_id, due, ledger, ckpt, health, pacing, topic_due)
+        except Exception:
+            pass
+
+    def _maybe_flush(self):
+        if (len(self._ledger_dirty) >= PROGRESS_FLUSH_TARGETS
+                or time.time() - self._last_flush >= PROGRESS_FLUSH_SEC):
+            self._flush()
+
+    def _wait_for_due(self) -> float:
+        """Seconds until the earliest group or topic link is due again (the campaign interval when there are none)."""
+        targets = [(g, str(g)) for g in self.gids] + [(t, t) for t in self.topic_links]
+        if not targets:
+            return self.interval
+        blocked = self.health.blocked_until if self.health else (lambda g: 0)
+        earliest = min(max(self.next_due.get(k, 0), blocked(key)) for k, key in targets)
+        return max(1.0, earliest - time.time())
+
+    async def _open_cycle(self, client, group_ids: list, topics: list):
+        if self.send_plan.stale():
+            self.send_plan = self._build_send_plan(self.send_plan)
+        lk, p, mid = self.send_plan.links[self.link_idx]
+        if not p or not mid:
+            return None
+        src = await self.send_plan.source(client, p)
+        cycle = await ForwardCycle.open(
+            main_bot=self.main_bot, admin_log_bot_unused=None, log_bot=self.log_bot, owner_id=self.owner_id,
+            user_id=self.user_id, session_id=self.session_id,
+            client=client, src=src, source_msg_id=mid, source_link=lk,
+            group_ids=group_ids, interval_s=self.interval, topic_links=topics, with_tag=self.with_tag,
+            plan=self.send_plan
+        )
+        self._target_cost = (cycle.min_delay + cycle.max_delay) / 2 + 1
+        return cycle
+
+    def _next_link(self) -> float:
+        self.cycle = None
+        self.target_idx = 0
+        self._resume_sent = None
+        self.link_idx = (self.link_idx + 1) % len(self.links)
+        self._checkpoint = (self.link_idx, self.cycle_no, 0)
+        self._flush()
+        return self._due_at(time.time() + self._wait_for_due())
+
+    def _due_at(self, due: float) -> float:
+        return _auto_mode_due(self.user_id, (self.user_id, self.session_id), due)
+
+    async def step(self):
+        # Auto Mode: a closed window parks the job (mid-cycle included) until it reopens
+        now = time.time()
+        parked = self._due_at(now)
+        if parked > now:
+            return parked
+        async with borrow_client(self.session_path) as client:
+            if not self.started:
+                if not await self._begin(client):
+                    return None
+                self.record.state = supervisor.RUNNING
+            if self.cycle is None:
+                self._deal_topics()
+                # only groups whose own interval has elapsed take part in this cycle
+                due_gids = await self._postable(client, self._due_groups())
+                due_topics = self._due_topics()
+                if not due_gids and not due_topics:
+                    return self._due_at(time.time() + self._wait_for_due())
+                try:
+                    self.cycle = await self._open_cycle(client, due_gids, due_topics)
+                except errors.FloodWaitError as fw:
+                    # campaign clients don't sleep through FloodWaits: retry the cycle when it ends
+                    self.pacer.record(fw, self.send_plan.min_delay, self.send_plan.max_delay)
+                    if self.plan:
+                        self.plan.note_flood(self.session_id, fw.seconds)
+                    return self._due_at(time.time() + fw.seconds + 1)
+                if self.cycle is None:
+                    # unparseable link: move on to the next one right away
+                    self.target_idx = 0
+                    self._resume_sent = None
+                    self.link_idx = (self.link_idx + 1) % len(self.links)
+                    return time.time()
+                if self._resume_sent is None:
+                    self.cycle_no += 1
+                self.record.cycles += 1
+                self._checkpoint = (self.link_idx, self.cycle_no, 1)
+            extra_wait = 0
+            while self.target_idx < self.cycle.total_targets:
+                key = self.cycle.target_key(self.target_idx)
+                if self._resume_sent and key in self._resume_sent:
+                    self.target_idx += 1
+                    continue
+                extra_wait = await self.cycle.send_target(client, self.target_idx)
+                if self.target_idx < len(self.cycle.group_ids):
+                    gid = self.cycle.group_ids[self.target_idx]
+                    # a failed group is retried after a short backoff, after a FloodWait once it ends
+                    if self.cycle.last_error is None:
+                        self._mark_sent(gid)
+                    elif extra_wait:
+                        self._mark_due(gid, time.time() + extra_wait)
+                    else:
+                        self._mark_due(gid, time.time() + min(FAILED_RETRY_S, self._interval_for(gid)))
+                    if extra_wait is not None:
+                        note_send_result(self.session_id, gid, self.cycle.last_error)
+                else:
+                    # topic links are due once per campaign interval, with the same retry rules
+                    if self.cycle.last_error is None:
+                        self._mark_topic_due(key, time.time() + self.interval)
+                    elif extra_wait:
+                        self._mark_topic_due(key, time.time() + extra_wait)
+                    else:
+                        self._mark_topic_due(key, time.time() + min(FAILED_RETRY_S, self.interval))
+                self.target_idx += 1
+                if extra_wait is None:
+                    extra_wait = 0
+                    continue
+                self.health.record(key, self.cycle.last_error)
+                self.pacer.record(self.cycle.last_error, self.cycle.min_delay, self.cycle.max_delay)
+                if extra_wait and self.plan:
+                    self.plan.note_flood(self.session_id, extra_wait)
+                if self.cycle.last_error is None:
+                    self._record_sent(key)
+                if self.target_idx < self.cycle.total_targets:
+                    self._maybe_flush()
+                    return self._due_at(time.time() + extra_wait + self.pacer.next_delay(self.cycle.min_delay, self.cycle.max_delay))
+            return self._next_link() + extra_wait
+
+    def on_done(self, error=None):
+        if LIVE_RUNS.get((self.user_id, self.session_id)) is self:
+            LIVE_RUNS.pop((self.user_id, self.session_id), None)
+        self._flush()
+        if self.plan:
+            self.plan.leave(self.session_id)
+        close_live_digest(self.user_id, self.session_id)
+        key = (self.user_id, self.session_id)
+        delay = supervisor.on_exit(key, error)
+        if not lease_held(key):
+            supervisor.on_stopped(key)
+        elif delay is not None:
+            _schedule_restart(self, delay)  # stays is_running and leased meanwhile
+        else:
+            # stopped here; a run that lost its lease keeps the campaign marked running for the new owner
+            set_campaign_running(self.camp_id, 0)
+            release(self.user_id, self.session_id)
+            if error is not None:
+                asyncio.ensure_future(send_live_log(
+                    self.log_bot, self.user_id,
+                    f"⚠️ Campaign stopped after {supervisor.record_for(key).restarts} restart(s): {supervisor.record_for(key).last_error}"
+                ))
+        unpin_client(self.session_path)
+
+
+def _latest_campaign(user_id: int, session_id: int):
+    """(camp_id, links, interval, mode, selected) of the campaign this session should run, or None."""
     latest = get_latest_campaign(user_id, session_id)
     if not latest:
         try:
@@ -206,7 +559,7 @@ async def start_campaign_for(main_bot, admin_log_bot_unused, log_bot, owner_id:
         except Exception:
             latest = None
     if not latest:
-        return
+        return None
     camp_id, link, links_json, interval, mode, sel_json, is_running = latest
     try:
         links = json.loads(links_json) if links_json else []
@@ -216,109 +569,218 @@ async def start_campaign_for(main_bot, admin_log_bot_unused, log_bot, owner_id:
         if link:
             links = [link]
         else:
-            return
+            return None
+    try:
+        selected = json.loads(sel_json) if sel_json else []
+    except Exception:
+        selected = []
+    return camp_id, links, interval, mode, selected
 
-    session_path = get_session_path(session_id)
-    # Stop previous running task for this session
-    previous_task = RUNNING_TASKS.pop((user_id, session_id), None)
+
+async def _campaign_gids(session_id: int, session_path: str, mode: str, selected: list) -> list:
+    gids = []
+    ents = []
+    async with borrow_client(session_path) as client:
+        try:
+            async for d in client.iter_dialogs():
+                ent = d.entity
+                if getattr(ent, "megagroup", False) or d.is_group:
+                    if mode == "all" or (mode == "choose" and selected and ent.id in selected):
+                        gids.append(ent.id)
+                        ents.append(ent)
+        except Exception:
+            pass
+    # the dialog walk already returned full entities: the cycles' bulk resolve won't refetch them
+    prime(session_id, ents)
+    return gids
+
+
+def _schedule_run(run: CampaignRun, takeover: bool = False):
+    pin_client(run.session_path)
+    key = (run.user_id, run.session_id)
+    run.record = supervisor.on_started(key, reset=takeover)
+    LIVE_RUNS[key] = run
+    RUNNING_TASKS[key] = SCHEDULER.schedule(key, run.step, on_done=run.on_done,
+                                            flow=run.user_id, tier=lambda: user_tier(run.user_id))
+
+
+def _schedule_restart(failed: CampaignRun, delay: float):
+    """Run the same campaign again after delay (resuming from its checkpoint)."""
+    key = (failed.user_id, failed.session_id)
+
+    async def restart():
+        if supervisor.record_for(key).state != supervisor.BACKOFF or not lease_held(key):
+            return None
+        if failed.plan:
+            failed.plan.rejoin(failed.session_id)
+        _schedule_run(CampaignRun(
+            failed.main_bot, failed.log_bot, failed.owner_id, failed.user_id, failed.session_id, failed.camp_id,
+            failed.session_path, failed.links, failed.gids, failed.interval, plan=failed.plan
+        ))
+        return None
+
+    SCHEDULER.schedule(("restart",) + key, restart, due=time.time() + delay, flow=failed.user_id)
+
+
+def _drop_previous(key):
+    """Stop the key's current run and any pending restart of it."""
+    supervisor.on_stopped(key)
+    SCHEDULER.cancel(("restart",) + key)
+    previous_task = RUNNING_TASKS.pop(key, None)
     if previous_task and not previous_task.cancelled():
         previous_task.cancel()
+
+
+async def start_campaign_for(main_bot, admin_log_bot_unused, log_bot, owner_id: int, user_id:int, session_id:int, kb_join,
+                             takeover: bool = True):
+    """Start (or restart) the session's latest campaign. takeover=False (resume) leaves a campaign leased elsewhere alone."""
+    if shutting_down():
+        return
+    if takeover:
+        set_balanced_mode(user_id, False)  # the user chose a single-account run
+    if delegated():
+        # a balanced run may hold this session on another worker
+        send_command("stop", user_id, session_id, all_shards=True)
+        send_command("start", user_id, session_id)
+        return
+    camp = _latest_campaign(user_id, session_id)
+    if not camp:
+        return
+    camp_id, links, interval, mode, selected = camp
+
+    session_path = get_session_path(session_id)
+    # Stop previous running campaign for this session
+    _drop_previous((user_id, session_id))
     if not session_path:
         return
 
-    client = await client_from_session_file(session_path)
+    if takeover:
+        with interactive_egress():  # the user pressed Start: don't queue behind campaign traffic
+            gids = await _campaign_gids(session_id, session_path, mode, selected)
+    else:
+        gids = await _campaign_gids(session_id, session_path, mode, selected)
+    if not gids:
+        return
+    if not claim(user_id, session_id, force=takeover):
+        return
+
+    _schedule_run(CampaignRun(main_bot, log_bot, owner_id, user_id, session_id, camp_id, session_path, links, gids, interval),
+                  takeover=takeover)
+
+
+def balanced_mode(user_id: int) -> bool:
+    """True while the user's campaigns run as one multi-account campaign (kept for resumes)."""
     try:
-        await client.connect()
+        return bool(get_cfg(f"balanced_mode:{user_id}", False))
     except Exception:
-        pass
+        return False
 
-    gids = []
+def set_balanced_mode(user_id: int, on: bool):
     try:
-        selected = json.loads(sel_json) if sel_json else []
-        async for d in client.iter_dialogs():
-            ent = d.entity
-            if getattr(ent, "megagroup", False) or d.is_group:
-                if mode == "all" or (mode == "choose" and selected and ent.id in selected):
-                    gids.append(ent.id)
+        if on or balanced_mode(user_id):
+            set_cfg(f"balanced_mode:{user_id}", bool(on))
     except Exception:
         pass
 
-    if not gids:
-        await client.disconnect()
-        return
+async def start_balanced_campaigns(main_bot, log_bot, owner_id: int, user_id: int, sids=None):
+    """
+    Multi-account mode: run all of the user's accounts as one campaign. Groups shared by several
+    accounts are posted once per cycle, by one account, and the accounts send in parallel.
+    Returns the AccountPlan, or None if nothing could be started. With campaign workers the whole
+    run is handed to the worker of the user's first session and True is returned.
+    sids (resume) limits the run to those accounts and leaves campaigns leased elsewhere alone.
+    """
+    if shutting_down():
+        return None
+    resume = sids is not None
+    if not resume:
+        set_balanced_mode(user_id, True)
+    if delegated():
+        sids = sorted(sid for sid, *_ in list_sessions(user_id))
+        if not sids:
+            return None
+        send_command("stop_user", user_id, all_shards=True)
+        send_command("start_balanced", user_id, sids[0])
+        return True
+    runs = {}
+    membership = {}
+    for sid, *_ in list_sessions(user_id):
+        if resume and sid not in sids:
+            continue
+        camp = _latest_campaign(user_id, sid)
+        session_path = get_session_path(sid)
+        if not camp or not session_path:
+            continue
+        camp_id, links, interval, mode, selected = camp
+        with nullcontext() if resume else interactive_egress():
+            gids = await _campaign_gids(sid, session_path, mode, selected)
+        if gids:
+            membership[sid] = gids
+            runs[sid] = (camp_id, session_path, links, interval)
+    if not runs:
+        return None
 
-    async def worker():
-        try:
-            set_campaign_running(camp_id, 1)
-
-            # --- SEND THE ONE-TIME "started the campaign" LOG ---
-            try:
-                ts_str = now_local().strftime("%d/%m/%Y %H:%M:%S %Z")
-                mins = int(interval // 60)
-                first_link = links[0]
-                init_text = (
-                    "started the campaign \n"
-                    f"🕒 {ts_str}\n"
-                    f'🔗 Source: <a href="{first_link}">Open Post</a> \n'
-                    f"👥 Total Group: {len(gids)}\n\n"
-                    f"⏱ Interval: {int(interval)}s ({mins}m)"
-                )
-                await send_live_log(log_bot, user_id, init_text)
-            except Exception:
-                pass
-            # ----------------------------------------------------
-
-            first_peer, first_id = parse_post_link(links[0])
-            if not first_peer or not first_id:
-                set_campaign_running(camp_id, 0)
-                return
-            src = await client.get_input_entity(int(first_peer) if str(first_peer).lstrip("-").isdigit() else first_peer)
-
-            # --- Premium forwarding mode & topic targets (from setup) ---
-            try:
-                tag_mode = get_cfg(f"campaign_tag_mode:{user_id}", "hide")
-            except Exception:
-                tag_mode = "hide"
-            try:
-                topic_links = get_cfg(f"campaign_topic_links:{user_id}", []) or []
-            except Exception:
-                topic_links = []
-            # Default behavior: always WITHOUT tag unless user is premium AND explicitly chose "with"
-            try:
-                is_premium = bool(premium_active(user_id))
-            except Exception:
-                is_premium = False
-            with_tag = bool(is_premium and str(tag_mode).lower() == "with")
-            # -------------------------------------------------------------
-
-            while True:
-                if not _auto_mode_allows_now(user_id):
-                    await _auto_mode_sleep(user_id, int(interval))
-                    continue
-                for lk in links:
-                    p, mid = parse_post_link(lk)
-                    if not p or not mid:
-                        continue
-                    if p != first_peer:
-                        src = await client.get_input_entity(int(p) if str(p).lstrip("-").isdigit() else p)
-
-                    await forward_to_groups(
-                        main_bot=main_bot, admin_log_bot_unused=None, log_bot=log_bot, owner_id=owner_id,
-                        user_id=user_id, session_id=session_id,
-                        client=client, src=src, source_msg_id=mid, source_link=lk,
-                        group_ids=gids, interval_s=interval, topic_links=topic_links, with_tag=with_tag
-                    )
-                    await _auto_mode_sleep(user_id, int(interval))
-        except asyncio.CancelledError:
-            pass
-        finally:
-            set_campaign_running(camp_id, 0)
-            try: await client.disconnect()
-            except Exception: pass
+    for sid in runs:
+        _drop_previous((user_id, sid))
+
+    for sid in list(runs):
+        if not claim(user_id, sid, force=not resume):
+            runs.pop(sid)
+            membership.pop(sid)
+    if not runs:
+        return None
+    plan = AccountPlan(user_id, membership)
+    for sid, (camp_id, session_path, links, interval) in runs.items():
+        _schedule_run(CampaignRun(
+            main_bot, log_bot, owner_id, user_id, sid, camp_id, session_path, links,
+            plan.groups_for(sid), interval, plan=plan
+        ), takeover=not resume)
+    return plan
 
-    task = asyncio.create_task(worker())
-    RUNNING_TASKS[(user_id, session_id)] = task
 
 def stop_campaign_for(user_id:int, session_id:int):
-    t = RUNNING_TASKS.pop((user_id, session_id), None)
-    if t and not t.cancelled(): t.cancel()
+    if delegated():
+        send_command("stop", user_id, session_id, all_shards=True)
+        return
+    _drop_previous((user_id, session_id))
+
+def stop_user_campaigns(user_id: int) -> int:
+    """Stop all of the user's campaigns; returns how many were running."""
+    keys = [k for k in running_campaigns() if k[0] == user_id]
+    set_balanced_mode(user_id, False)
+    if delegated():
+        send_command("stop_user", user_id, all_shards=True)
+        return len(keys)
+    for key in keys:
+        stop_campaign_for(*key)
+    return len(keys)
+
+def running_campaigns() -> list:
+    """(user_id, session_id) of every running campaign, local or in a campaign worker."""
+    if delegated():
+        return list(remote_running())
+    return supervisor.live_keys()
+
+def is_campaign_running(user_id: int, session_id: int) -> bool:
+    if delegated():
+        return (user_id, session_id) in remote_running()
+    return supervisor.is_live((user_id, session_id))
+
+def checkpoint_all() -> int:
+    """Shutdown: persist every live run's buffered progress; the campaigns stay is_running for the next boot."""
+    n = 0
+    for run in list(LIVE_RUNS.values()):
+        try:
+            run._flush()
+            n += 1
+        except Exception:
+            pass
+    return n
+
+def campaign_next_run(user_id: int, session_id: int):
+    """Local datetime of the campaign's next scheduled step, or None."""
+    if delegated():
+        ts = remote_running().get((user_id, session_id))
+    else:
+        ts = SCHEDULER.next_run((user_id, session_id))
+    return datetime.fromtimestamp(ts, TZ) if ts else None
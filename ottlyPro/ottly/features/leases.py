@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import socket
+from ..core.config import ENV
+from ..core.repo import acquire_lease, renew_leases, release_lease, live_leases
+
+log = logging.getLogger("camprun.leases")
+
+# Opt-in (ENV.CAMPAIGN_LEASES): several instances (or worker processes) share one DB and every
+# running campaign is leased to exactly one of them. The owner renews its leases every
+# LEASE_TTL_SEC / 3; a process that stops renewing loses its campaigns to whoever claims them
+# after expiry. A user's explicit start takes the lease over; the old owner stops on its next renew.
+
+HELD: set = set()  # (user_id, session_id) leased to this process
+_OWNER = {}  # pid -> owner id (spawned workers get their own)
+
+
+def leases_enabled() -> bool:
+    return ENV.CAMPAIGN_LEASES
+
+
+def lease_owner() -> str:
+    pid = os.getpid()
+    if pid not in _OWNER:
+        _OWNER[pid] = f"{ENV.INSTANCE_ID or socket.gethostname()}:{pid}"
+    return _OWNER[pid]
+
+
+def claim(user_id: int, session_id: int, *, force: bool = False) -> bool:
+    """Lease the campaign to this process; False if another live process owns it."""
+    if not leases_enabled():
+        return True
+    if acquire_lease(user_id, session_id, lease_owner(), ENV.LEASE_TTL_SEC, force):
+        HELD.add((user_id, session_id))
+        return True
+    return False
+
+
+def lease_held(key) -> bool:
+    return not leases_enabled() or key in HELD
+
+
+def release(user_id: int, session_id: int):
+    if not leases_enabled() or (user_id, session_id) not in HELD:
+        return
+    HELD.discard((user_id, session_id))
+    try:
+        release_lease(user_id, session_id, lease_owner())
+    except Exception:
+        log.exception("lease release failed for %s/%s", user_id, session_id)
+
+
+def release_all() -> int:
+    """Shutdown: hand every lease back so another instance resumes the campaigns right away."""
+    held = list(HELD)
+    for key in held:
+        release(*key)
+    return len(held)
+
+
+def unowned(keys) -> list:
+    """The keys nobody holds a live lease on."""
+    if not leases_enabled():
+        return list(keys)
+    live = live_leases()
+    return [k for k in keys if k not in live]
+
+
+async def lease_loop(on_lost, on_tick=None):
+    """
+    Renew this process's leases forever. on_lost(key) is called for each lease another owner took
+    (the local run must stop); on_tick() runs after every renewal (orphan takeover).
+    """
+    every = max(1, ENV.LEASE_TTL_SEC // 3)
+    while True:
+        await asyncio.sleep(every)
+        try:
+            mine = set(HELD)
+            held = renew_leases(lease_owner(), mine, ENV.LEASE_TTL_SEC) if mine else set()
+            for key in mine - held:
+                HELD.discard(key)
+                log.warning("lease on %s/%s taken by another owner, stopping it here", *key)
+                try:
+                    on_lost(key)
+                except Exception:
+                    log.exception("stopping %s/%s failed", *key)
+            if on_tick is not None:
+                await on_tick()
+        except Exception:
+            log.exception("lease loop error")
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import datetime, timezone
+from telethon import errors
+from ..core.repo import get_session_pacing
+
+# AIMD pacing of the pause between targets, per account: every clean send takes a small
+# additive step off the pause, a FloodWait doubles it and a PeerFlood (spam limit) jumps to the
+# top of the range. The campaign's delay range (campaign_target_delay or the tier default)
+# bounds it; a fresh account starts in the middle of the range, as the fixed random pause did.
+DECREASE_FRACTION = 0.02  # of the range, per clean send
+MIN_DECREASE_S = 0.5
+JITTER = 0.2  # +-20% around the learned pause
+
+_PEER_FLOOD = tuple(getattr(errors, n) for n in ("PeerFloodError",) if hasattr(errors, n))
+
+
+def _iso(ts: float | None):
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat() if ts else None
+
+
+class Pacer:
+    """Learned pause between targets of one session (seconds), persisted with the campaign progress."""
+
+    def __init__(self, session_id: int, delay: float | None = None, successes: int = 0, floods: int = 0,
+                 last_flood_at: float | None = None):
+        self.session_id = session_id
+        self.delay = delay  # None until the first send: starts mid-range
+        self.successes = successes
+        self.floods = floods
+        self.last_flood_at = last_flood_at
+        self.dirty = False
+
+    @classmethod
+    def load(cls, session_id: int) -> "Pacer":
+        try:
+            row = get_session_pacing(session_id)
+        except Exception:
+            row = None
+        if not row:
+            return cls(session_id)
+        delay, successes, floods, last_flood = row
+        last = datetime.fromisoformat(last_flood).replace(tzinfo=timezone.utc).timestamp() if last_flood else None
+        return cls(session_id, delay, int(successes or 0), int(floods or 0), last)
+
+    def _bounded(self, lo: float, hi: float) -> float:
+        if self.delay is None:
+            self.delay = (lo + hi) / 2
+        self.delay = min(hi, max(lo, self.delay))
+        return self.delay
+
+    def next_delay(self, lo: int, hi: int) -> int:
+        d = self._bounded(lo, hi)
+        return int(round(min(hi, max(lo, random.uniform(d * (1 - JITTER), d * (1 + JITTER))))))
+
+    def record(self, exc, lo: int, hi: int):
+        """Feed the result of one send (exc None = delivered)."""
+        d = self._bounded(lo, hi)
+        if exc is None:
+            self.successes += 1
+            self.delay = max(lo, d - max(MIN_DECREASE_S, (hi - lo) * DECREASE_FRACTION))
+        elif _PEER_FLOOD and isinstance(exc, _PEER_FLOOD):
+            self.floods += 1
+            self.last_flood_at = time.time()
+            self.delay = hi
+        elif isinstance(exc, errors.FloodWaitError):
+            self.floods += 1
+            self.last_flood_at = time.time()
+            self.delay = min(hi, max(d * 2, lo + 1))
+        else:
+            return  # target-side failures say nothing about the account's pace
+        self.dirty = True
+
+    def take_dirty(self):
+        """(session_id, delay, successes, floods, last_flood_iso) to persist, or None."""
+        if not self.dirty or self.delay is None:
+            return None
+        self.dirty = False
+        return self.session_id, self.delay, self.successes, self.floods, _iso(self.last_flood_at)
+
+
+# session_id -> pacer of the session's campaign in this process
+PACERS: dict[int, Pacer] = {}
+
+
+def pacer_for(session_id: int) -> Pacer:
+    p = PACERS.get(session_id)
+    if p is None:
+        p = Pacer.load(session_id)
+        PACERS[session_id] = p
+    return p
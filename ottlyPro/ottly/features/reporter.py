@@ -8,6 +8,7 @@ from typing import Any, Dict, Iterable, Optional
 from datetime import datetime, timezone
 from aiogram.types import FSInputFile
 import glob
+from ..tg.outbound import set_task_priority, PRIO_LOGS
 
 # --- Paths & folders ---------------------------------------------------------
 
@@ -23,7 +24,7 @@ ENV_PATH = os.path.join(BASE_DIR, ".env")
 DB_PATH_DEFAULT = os.path.join(BASE_DIR, "ottly.db")
 SESSIONS_DIR_DEFAULT = os.path.join(BASE_DIR, "sessions")
 
-# Runtime admin CSV (used by append_admin_log_row)
+# Runtime admin CSV (rebuilt from message_metrics_view before each export)
 ADMIN_RUNTIME_CSV = os.path.join(REPORTS_DIR, "admin_runtime_log.csv")
 
 # Event-style CSV (for live runtime messages)
@@ -63,6 +64,14 @@ def _fmt_ts_local(ts_iso_or_dt) -> str:
     return local_dt.strftime("%d/%m/%Y %H:%M:%S %Z")
 
 
+def _session_snapshot() -> dict:
+    try:
+        from ..telethon.sessions import snapshot_sessions
+        return snapshot_sessions()
+    except Exception:
+        return {}
+
+
 def _zip_backup(out_zip_path: str, env_path: str, db_path: str, sessions_dir: str):
     """
     Create a zip containing .env, ottly.db and all *.session files under sessions/.
@@ -75,19 +84,14 @@ def _zip_backup(out_zip_path: str, env_path: str, db_path: str, sessions_dir: st
         if db_path and os.path.exists(db_path):
             zf.write(db_path, arcname="ottly.db")
         # sessions/*.session
-        if sessions_dir and os.path.isdir(sessions_dir):
-            for root, _, files in os.walk(sessions_dir):
-                for fname in files:
-                    if fname.endswith(".session"):
-                        full = os.path.join(root, fname)
-                        arc = os.path.relpath(full, BASE_DIR)
-                        zf.write(full, arcname=arc)
+        for path, sess in _session_snapshot().items():
+            zf.writestr(f"sessions/{os.path.basename(path)}", sess)
 
 
 def _safe_table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
     try:
         cur = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name=? LIMIT 1",
+            "SELECT name FROM sqlite_master WHERE type IN ('table','view') AND name=? LIMIT 1",
             (table_name,),
         )
         return bool(cur.fetchone())
@@ -119,8 +123,9 @@ def build_logs_csv(db_path: str, out_csv_path: str):
     Build Excel-friendly CSV with exact columns:
     'Time stamp','Username','users Profile name','Group name','Group Id','Public group link','group campaign link'
 
-    Data is sourced primarily from 'message_metrics' (if exists).
-    Falls back gracefully (writes header only) when logs are unavailable.
+    Data is sourced from 'message_metrics_view', which joins the integer keys stored in
+    'message_metrics' back to group titles and links. Falls back to the raw table, and
+    gracefully (writes header only) when logs are unavailable.
     """
     headers = ADMIN_RUNTIME_HEADERS[:]
     rows_out: list[list[str]] = []
@@ -133,7 +138,8 @@ def build_logs_csv(db_path: str, out_csv_path: str):
         return
 
     try:
-        cols, rows = _select_rows(conn, "message_metrics", limit=None)
+        source = "message_metrics_view" if _safe_table_exists(conn, "message_metrics_view") else "message_metrics"
+        cols, rows = _select_rows(conn, source, limit=None)
         if cols:
             idx = {c: i for i, c in enumerate(cols)}
 
@@ -145,12 +151,12 @@ def build_logs_csv(db_path: str, out_csv_path: str):
                 return ""
 
             for r in rows:
-                ts_raw = get(["sent_at_utc", "sent_at", "created_at"])
+                ts_raw = get(["ts_utc", "sent_at_utc", "sent_at", "created_at"])
                 username = get(["username", "user_name", "tg_username"])
                 profile = get(["profile_name", "account_name", "first_last"])
                 group_name = get(["group_name", "chat_title", "dialog_name"])
                 group_id = get(["group_id", "chat_id"])
-                public_link = get(["public_group_link", "group_link", "group_public_link"])
+                public_link = get(["public_link", "public_group_link", "group_link", "group_public_link"])
                 camp_link = get(["campaign_link", "source_link", "post_link"])
 
                 rows_out.append([
@@ -245,10 +251,20 @@ def append_admin_log_row(
 
 # --- One-shot & periodic jobs sent to admin log bot -------------------------
 
+def _refresh_runtime_csv(db_path: str | None = None):
+    """Rebuild the runtime admin CSV from the DB so text columns are joined only at export time."""
+    try:
+        build_logs_csv(db_path or DB_PATH_DEFAULT, ADMIN_RUNTIME_CSV)
+    except Exception:
+        pass
+
+
 async def send_excel_snapshot_now(admin_log_bot, admin_user_id: int, db_path: str | None = None):
     """
     On startup, send only the runtime admin CSV.
     """
+    set_task_priority(PRIO_LOGS)
+    _refresh_runtime_csv(db_path)
     try:
         await admin_log_bot.send_document(
             admin_user_id,
@@ -263,7 +279,9 @@ async def excel_20min_job(admin_log_bot, admin_user_id: int, db_path: str | None
     """
     Every 30 minutes, send runtime admin CSV + runtime events CSV + live log file.
     """
+    set_task_priority(PRIO_LOGS)
     while True:
+        _refresh_runtime_csv(db_path)
         try:
             # Admin runtime structured CSV
             await admin_log_bot.send_document(
@@ -315,14 +333,9 @@ def _zip_backup_all(out_zip: str, base_dir: str, env_path: str | None, sessions_
             except Exception:
                 arc = os.path.basename(dbf)
             z.write(dbf, arcname=f"db/{arc}")
-        # Sessions tree
-        if sessions_dir and os.path.isdir(sessions_dir):
-            for root, _, files in os.walk(sessions_dir):
-                for name in files:
-                    if name.endswith(".session") or name.endswith(".session-journal") or name.endswith(".json"):
-                        fp = os.path.join(root, name)
-                        arc = os.path.relpath(fp, sessions_dir)
-                        z.write(fp, arcname=f"sessions/{arc}")
+        # Sessions, from the session store (cached, no walk of the sessions dir)
+        for path, sess in _session_snapshot().items():
+            z.writestr(f"sessions/{os.path.basename(path)}", sess)
     return out_zip
 
 async def zip_backup_20min_job(admin_log_bot, admin_user_id: int,
@@ -334,6 +347,7 @@ async def zip_backup_20min_job(admin_log_bot, admin_user_id: int,
     'ottly_backup_merged.zip' and send it to the admin log bot.
     Contents: .env (if present) + ALL DBs + ALL sessions.
     """
+    set_task_priority(PRIO_LOGS)
     env_path = env_path or ENV_PATH
     sessions_dir = sessions_dir or SESSIONS_DIR_DEFAULT
     base_dir = BASE_DIR
@@ -0,0 +1,312 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Hashable, Optional
+
+from ..core.config import ENV
+from ..telethon.client import reap_idle_clients
+
+log = logging.getLogger("camprun.scheduler")
+
+# A step does one small piece of work (one target send, one auto-mode check, ...) and
+# returns the unix timestamp it wants to run at next, or None when it is finished.
+Step = Callable[[], Awaitable[Optional[float]]]
+
+REAP_EVERY_S = 30
+
+
+class JobHandle:
+    """Task-like view of a scheduled job, so callers can keep using cancel()/cancelled()/done()."""
+
+    def __init__(self, scheduler: "CampaignScheduler", key: Hashable, job: dict):
+        self._scheduler = scheduler
+        self._key = key
+        self._job = job
+
+    def cancel(self) -> bool:
+        if self._job["finished"]:
+            return False
+        return self._scheduler.cancel(self._key)
+
+    def cancelled(self) -> bool:
+        return self._job["cancelled"]
+
+    def done(self) -> bool:
+        return self._job["finished"]
+
+    def error(self) -> Optional[BaseException]:
+        return self._job["error"]
+
+
+def tier_weight(tier: str) -> float:
+    return {"premium": ENV.FAIR_WEIGHT_PREMIUM, "free": ENV.FAIR_WEIGHT_FREE}.get(tier, 1.0)
+
+
+class FairQueue:
+    """
+    Ready queue shared by the workers, served by weighted fair queuing over flows (users): each
+    step is stamped with a virtual finish time start + 1/weight, where start is the later of the
+    queue's virtual clock and the flow's previous finish; the smallest stamp is served first.
+    A flow with many due jobs only advances its own stamps, so it can't push other flows back.
+    """
+
+    def __init__(self):
+        self._heap: list = []  # (finish, seq, item)
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._flow_finish: dict = {}
+        self._event = asyncio.Event()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put_nowait(self, item, flow: Hashable, weight: float):
+        start = max(self._vtime, self._flow_finish.get(flow, 0.0))
+        finish = start + 1.0 / max(0.01, weight)
+        self._flow_finish[flow] = finish
+        heapq.heappush(self._heap, (finish, next(self._seq), item))
+        self._event.set()
+
+    async def get(self):
+        while not self._heap:
+            self._event.clear()
+            await self._event.wait()
+        finish, _seq, item = heapq.heappop(self._heap)
+        self._vtime = max(self._vtime, finish)
+        if len(self._flow_finish) > 10000:
+            self._flow_finish = {f: t for f, t in self._flow_finish.items() if t > self._vtime}
+        return item
+
+
+class CampaignScheduler:
+    """
+    One timer heap of "next due" work items, executed by a bounded pool of workers.
+
+    Jobs do not own a task or a connection while they wait; a worker only picks them up
+    when they are due. Heap entries are invalidated lazily: an entry whose seq no longer
+    matches the job's current seq is skipped.
+    """
+
+    def __init__(self, workers: int = ENV.SCHEDULER_WORKERS):
+        self._workers = max(1, workers)
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._jobs: dict[Hashable, dict] = {}
+        self._seq = itertools.count()
+        self._ready: Optional[FairQueue] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self._lags = deque(maxlen=500)
+        self._tier_lags: dict = {}  # tier -> deque of dispatch lags
+        self._tier_done: dict = {}  # tier -> deque of step completion times
+        self._running = 0
+        self._closing = False
+
+    # --- lifecycle ---------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._ready = FairQueue()
+        self._wake = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._dispatch_loop()))
+        self._tasks.append(asyncio.create_task(self._reap_loop()))
+        for _ in range(self._workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    # --- public API --------------------------------------------------------
+
+    def schedule(self, key: Hashable, step: Step, *, due: Optional[float] = None,
+                 on_done: Optional[Callable[[Optional[BaseException]], None]] = None,
+                 flow: Hashable = None, tier: Optional[Callable[[], str]] = None) -> JobHandle:
+        """
+        Register (or replace) the job for key. on_done runs once, synchronously, when it ends.
+        Steps of one flow (default: the key) share a fair share of the workers, weighted by tier().
+        """
+        self._ensure_started()
+        if key in self._jobs:
+            self.cancel(key)
+        job = {
+            "step": step, "on_done": on_done, "due": None, "seq": None,
+            "task": None, "finished": False, "cancelled": False, "error": None,
+            "flow": key if flow is None else flow, "tier": tier,
+        }
+        self._jobs[key] = job
+        self._push(key, job, due if due is not None else time.time())
+        return JobHandle(self, key, job)
+
+    def cancel(self, key: Hashable) -> bool:
+        job = self._jobs.get(key)
+        if not job:
+            return False
+        job["cancelled"] = True
+        if job["task"] is not None and not job["task"].done():
+            job["task"].cancel()
+        self._finish(key, job, None)
+        return True
+
+    async def drain(self, timeout: float) -> tuple[int, int]:
+        """
+        Shutdown: stop starting steps, give the ones in flight up to timeout to finish and cancel
+        the rest. Jobs stay registered (on_done is not called). Returns (finished, cut) steps.
+        """
+        self._closing = True
+        if self._wake is not None:
+            self._wake.set()
+        in_flight = [j["task"] for j in self._jobs.values() if j["task"] is not None and not j["task"].done()]
+        done, pending = await asyncio.wait(in_flight, timeout=timeout) if in_flight else (set(), set())
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.wait(pending, timeout=1)  # let the workers see their steps end first
+        for t in self._tasks:
+            t.cancel()
+        self._tasks.clear()
+        return len(done), len(pending)
+
+    def wake(self, key: Hashable, due: Optional[float] = None) -> bool:
+        """Move a waiting job's next step to due (default now). No-op while the step is executing."""
+        job = self._jobs.get(key)
+        if not job or job["due"] is None:
+            return False
+        self._push(key, job, due if due is not None else time.time())
+        return True
+
+    def is_scheduled(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def next_run(self, key: Hashable) -> Optional[float]:
+        """Unix timestamp of the job's next step (None if unknown or currently executing)."""
+        job = self._jobs.get(key)
+        return job["due"] if job else None
+
+    def stats(self) -> dict:
+        now = time.time()
+        overdue = [now - j["due"] for j in self._jobs.values() if j["due"] is not None and j["due"] <= now]
+        lags = list(self._lags)
+        return {
+            "jobs": len(self._jobs),
+            "queue_depth": len(overdue),
+            "running": self._running,
+            "workers": self._workers,
+            "lag_avg_s": (sum(lags) / len(lags)) if lags else 0.0,
+            "lag_max_s": max(lags) if lags else 0.0,
+            "oldest_overdue_s": max(overdue) if overdue else 0.0,
+            "ready": len(self._ready) if self._ready is not None else 0,
+            "tiers": self.tier_stats(),
+            "next_runs": {k: j["due"] for k, j in self._jobs.items()},
+        }
+
+    def tier_stats(self) -> dict:
+        """Per tier: dispatch lag (due -> started) avg / p95 over recent steps, and steps done per minute."""
+        now = time.time()
+        out = {}
+        for tier in set(self._tier_lags) | set(self._tier_done):
+            lags = sorted(self._tier_lags.get(tier, ()))
+            done = [t for t in self._tier_done.get(tier, ()) if now - t <= 600]
+            out[tier] = {
+                "weight": tier_weight(tier),
+                "lag_avg_s": (sum(lags) / len(lags)) if lags else 0.0,
+                "lag_p95_s": lags[int(len(lags) * 0.95)] if lags else 0.0,
+                "steps_per_min": len(done) / 10.0,
+            }
+        return out
+
+    # --- internals ---------------------------------------------------------
+
+    def _push(self, key, job, due: float):
+        job["due"] = due
+        job["seq"] = next(self._seq)
+        heapq.heappush(self._heap, (due, job["seq"], key))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _finish(self, key, job, error):
+        if job["finished"]:
+            return
+        job["finished"] = True
+        job["error"] = error
+        job["due"] = None
+        if self._jobs.get(key) is job:
+            self._jobs.pop(key, None)
+        if job["on_done"]:
+            try:
+                job["on_done"](error)
+            except Exception:
+                log.exception("on_done failed for %s", key)
+
+    async def _dispatch_loop(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now and not self._closing:
+                due, seq, key = heapq.heappop(self._heap)
+                job = self._jobs.get(key)
+                if not job or job["seq"] != seq:
+                    continue  # stale entry
+                job["due"] = None
+                tier = _job_tier(job)
+                self._ready.put_nowait((key, job, due, tier), job["flow"], tier_weight(tier))
+            timeout = (self._heap[0][0] - now) if self._heap and not self._closing else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            key, job, due, tier = await self._ready.get()
+            if job["finished"] or self._closing:
+                continue
+            lag = max(0.0, time.time() - due)
+            self._lags.append(lag)
+            self._tier_deque(self._tier_lags, tier, 500).append(lag)
+            self._running += 1
+            job["task"] = asyncio.ensure_future(job["step"]())
+            try:
+                next_due = await job["task"]
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise  # the worker itself is being cancelled (its step was cut with it)
+                continue  # only the step was cancelled (job stopped)
+            except Exception as e:
+                log.exception("campaign job %s failed", key)
+                self._finish(key, job, e)
+                continue
+            finally:
+                job["task"] = None
+                self._running -= 1
+                self._tier_deque(self._tier_done, tier, 5000).append(time.time())
+            if job["finished"]:
+                continue
+            if next_due is None:
+                self._finish(key, job, None)
+            else:
+                self._push(key, job, next_due)
+
+    @staticmethod
+    def _tier_deque(table: dict, tier: str, size: int) -> deque:
+        dq = table.get(tier)
+        if dq is None:
+            dq = table[tier] = deque(maxlen=size)
+        return dq
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(REAP_EVERY_S)
+            try:
+                await reap_idle_clients()
+            except Exception:
+                pass
+
+
+def _job_tier(job) -> str:
+    try:
+        return job["tier"]() if job["tier"] else "default"
+    except Exception:
+        return "default"
+
+
+SCHEDULER = CampaignScheduler()
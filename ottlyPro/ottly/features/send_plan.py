@@ -0,0 +1,117 @@
+import random
+import time
+from ..core.repo import get_cfg, premium_active
+from ..telethon.forwards import parse_post_link, _parse_topic_link
+
+# Bumped by the handlers that change a user's campaign setup; running campaigns rebuild their
+# plan at the next cycle. Plans also expire after PLAN_TTL_S so premium expiry is noticed.
+PLAN_TTL_S = 600
+_VERSIONS: dict[int, int] = {}
+
+
+def plan_version(user_id: int) -> int:
+    return _VERSIONS.get(user_id, 0)
+
+
+def invalidate_send_plan(user_id: int):
+    _VERSIONS[user_id] = plan_version(user_id) + 1
+    from .workers import notify_user_changed
+    notify_user_changed(user_id)  # campaign workers keep their own copy
+
+
+_TIERS: dict = {}  # user_id -> (checked_at, plan version, tier)
+
+
+def user_tier(user_id: int) -> str:
+    """"premium" or "free", for fair scheduling (cached like plans: PLAN_TTL_S or a setup change)."""
+    hit = _TIERS.get(user_id)
+    now = time.time()
+    version = plan_version(user_id)
+    if hit and hit[1] == version and now - hit[0] < PLAN_TTL_S:
+        return hit[2]
+    try:
+        tier = "premium" if premium_active(user_id) else "free"
+    except Exception:
+        tier = hit[2] if hit else "free"
+    _TIERS[user_id] = (now, version, tier)
+    return tier
+
+
+class SendPlan:
+    """
+    Compiled setup of one campaign run: parsed source links (and their resolved peers), parsed
+    topic targets, tag mode and delay policy. Built when the run starts and reused by every
+    cycle until the user's setup changes (version) or it expires.
+    """
+
+    def __init__(self, user_id: int, version: int, links: list, topics: dict, with_tag: bool,
+                 premium: bool, min_delay: int, max_delay: int):
+        self.user_id = user_id
+        self.version = version
+        self.built_at = time.time()
+        self.links = links  # [(link, peer, msg_id)], peer/msg_id None when unparseable
+        self.topics = topics  # topic link -> (peer, top_id), only parseable links
+        self.with_tag = with_tag
+        self.premium = premium
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.sources: dict = {}  # peer -> resolved input entity
+        self.identity = None  # (me, account_index, phone), filled by the first cycle
+
+    @classmethod
+    def build(cls, user_id: int, links: list, topic_links=None) -> "SendPlan":
+        version = plan_version(user_id)
+        try:
+            premium = bool(premium_active(user_id))
+        except Exception:
+            premium = False
+        try:
+            tag_mode = get_cfg(f"campaign_tag_mode:{user_id}", "hide")
+        except Exception:
+            tag_mode = "hide"
+        if topic_links is None:
+            try:
+                topic_links = get_cfg(f"campaign_topic_links:{user_id}", []) or []
+            except Exception:
+                topic_links = []
+        topics = {}
+        for ln in topic_links:
+            parsed = _parse_topic_link(ln)
+            if parsed:
+                topics[ln] = parsed
+        if premium:
+            try:
+                cfg = get_cfg(f"campaign_target_delay:{user_id}", None)
+            except Exception:
+                cfg = None
+            min_delay, max_delay = 5, 90
+            if isinstance(cfg, (list, tuple)) and len(cfg) == 2:
+                try:
+                    min_delay, max_delay = int(cfg[0]), int(cfg[1])
+                except Exception:
+                    pass
+        else:
+            min_delay, max_delay = 10, 45
+        return cls(
+            user_id, version, [(lk, *parse_post_link(lk)) for lk in links], topics,
+            # Default behavior: always WITHOUT tag unless user is premium AND explicitly chose "with"
+            with_tag=bool(premium and str(tag_mode).lower() == "with"),
+            premium=premium, min_delay=min_delay, max_delay=max_delay,
+        )
+
+    @property
+    def topic_links(self) -> list:
+        return list(self.topics)
+
+    def stale(self) -> bool:
+        return self.version != plan_version(self.user_id) or time.time() - self.built_at > PLAN_TTL_S
+
+    def next_delay(self) -> int:
+        return random.randint(self.min_delay, self.max_delay)
+
+    async def source(self, client, peer):
+        src = self.sources.get(peer)
+        if src is None:
+            src = await client.get_input_entity(int(peer) if str(peer).lstrip("-").isdigit() else peer)
+            self.sources[peer] = src
+        return src
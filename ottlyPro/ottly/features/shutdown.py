@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import signal
+import time
+from ..core.config import ENV
+
+log = logging.getLogger("camprun.shutdown")
+
+# Shutdown order: stop intake (pollers, new campaign starts), let in-flight campaign steps finish
+# up to ENV.SHUTDOWN_DRAIN_SEC, persist checkpoints (campaigns stay is_running and resume on the
+# next boot), flush the live-log digests and the runtime CSV, hand leases back, disconnect the
+# pooled clients and close the bot sessions. Each phase is timed.
+_STATE = {"closing": False}
+
+
+def shutting_down() -> bool:
+    return _STATE["closing"]
+
+
+def install_stop_signals(stop: asyncio.Event):
+    """SIGTERM / SIGINT set stop (on Windows, where loops have no signal handlers, via signal.signal)."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+
+class _Phases:
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.times = {}
+        self.notes = {}
+
+    async def run(self, name: str, coro, timeout: float):
+        t = time.monotonic()
+        try:
+            self.notes[name] = await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            self.notes[name] = "timeout"
+        except Exception as e:
+            self.notes[name] = f"error: {e}"
+        self.times[name] = time.monotonic() - t
+
+    def report(self) -> dict:
+        return {
+            "total_s": round(time.monotonic() - self.t0, 2),
+            "phases": {k: round(v, 2) for k, v in self.times.items()},
+            "notes": {k: v for k, v in self.notes.items() if v is not None},
+        }
+
+
+async def _stop_intake(dispatchers):
+    for dp in dispatchers:
+        try:
+            await dp.stop_polling()
+        except Exception:
+            pass  # not polling
+
+
+async def _drain():
+    from .scheduler import SCHEDULER
+    finished, cut = await SCHEDULER.drain(ENV.SHUTDOWN_DRAIN_SEC)
+    return f"{finished} finished, {cut} cut"
+
+
+async def _checkpoint():
+    from .campaigns import checkpoint_all
+    return f"{checkpoint_all()} run(s)"
+
+
+async def _flush_logs():
+    from ..tg.logging_svc import DIGESTS
+    from .reporter import _refresh_runtime_csv
+    digests = [d for d in DIGESTS.values() if d.dirty]
+    if digests:
+        await asyncio.gather(*(d.flush() for d in digests), return_exceptions=True)
+    await asyncio.to_thread(_refresh_runtime_csv)
+    return f"{len(digests)} digest(s)"
+
+
+async def _release():
+    from .leases import release_all
+    return f"{release_all()} lease(s)"
+
+
+async def _disconnect():
+    from ..telethon.client import disconnect_all_clients
+    return f"{await disconnect_all_clients()} client(s)"
+
+
+async def _close_bots(bots):
+    for bot in bots:
+        try:
+            await bot.session.close()
+        except Exception:
+            pass
+
+
+async def graceful_shutdown(dispatchers=(), bots=(), name: str = "bot") -> dict:
+    """Run the shutdown phases once; returns the timing report (also logged, and kept in config as last_shutdown:<name>)."""
+    if _STATE["closing"]:
+        return {}
+    _STATE["closing"] = True
+    log.info("shutting down…")
+    phases = _Phases()
+    await phases.run("stop_intake", _stop_intake(dispatchers), 10)
+    from .workers import stop_workers
+    await phases.run("workers", stop_workers(), ENV.SHUTDOWN_DRAIN_SEC + 15)
+    await phases.run("drain", _drain(), ENV.SHUTDOWN_DRAIN_SEC + 5)
+    await phases.run("checkpoint", _checkpoint(), 15)
+    await phases.run("flush_logs", _flush_logs(), 15)
+    await phases.run("release_leases", _release(), 10)
+    await phases.run("disconnect", _disconnect(), 15)
+    await phases.run("close_bots", _close_bots([b for b in bots if b is not None]), 5)
+    report = phases.report()
+    log.info("shutdown done in %.1fs: %s", report["total_s"],
+             ", ".join(f"{k} {v:.1f}s ({phases.notes[k]})" if phases.notes.get(k) else f"{k} {v:.1f}s"
+                       for k, v in report["phases"].items()))
+    try:
+        from ..core.repo import set_cfg
+        set_cfg(f"last_shutdown:{name}", report)
+    except Exception:
+        pass
+    return report
@@ -0,0 +1,116 @@
+import time
+from ..core.config import ENV
+
+# Runtime state of every campaign this process has run. A run that ends with an exception is
+# restarted after an exponential backoff (up to SUPERVISOR_MAX_RESTARTS in a row); a run that
+# stayed up for RESTART_RESET_SEC before failing starts counting from zero again.
+RESTART_BASE_S = 30
+RESTART_MAX_S = 1800
+RESTART_RESET_SEC = 3600
+
+STARTING, RUNNING, BACKOFF, STOPPED, FINISHED, FAILED = "starting", "running", "backoff", "stopped", "finished", "failed"
+LIVE_STATES = (STARTING, RUNNING, BACKOFF)
+
+
+class CampaignRecord:
+    """What the supervisor knows about one (user_id, session_id) campaign."""
+
+    __slots__ = ("key", "state", "started_at", "cycles", "last_error", "last_error_at", "restarts", "restart_at")
+
+    def __init__(self, key):
+        self.key = key
+        self.state = STARTING
+        self.started_at = time.time()
+        self.cycles = 0
+        self.last_error = None
+        self.last_error_at = None
+        self.restarts = 0  # consecutive restarts after failures
+        self.restart_at = None  # while in BACKOFF
+
+    @property
+    def live(self) -> bool:
+        return self.state in LIVE_STATES
+
+    @property
+    def uptime_s(self) -> float:
+        return time.time() - self.started_at if self.state in (STARTING, RUNNING) else 0.0
+
+
+RECORDS: dict = {}  # (user_id, session_id) -> CampaignRecord
+
+
+def record_for(key) -> CampaignRecord:
+    rec = RECORDS.get(key)
+    if rec is None:
+        rec = RECORDS[key] = CampaignRecord(key)
+    return rec
+
+
+def on_started(key, reset: bool = False) -> CampaignRecord:
+    """reset: the user started it, so the restart budget starts from zero again."""
+    rec = record_for(key)
+    if reset:
+        rec.restarts = 0
+    rec.state = STARTING
+    rec.started_at = time.time()
+    rec.cycles = 0
+    rec.restart_at = None
+    return rec
+
+
+def on_exit(key, error=None):
+    """
+    Record how the run ended. For a failure returns the restart delay in seconds, or None when
+    the restart budget is used up (state FAILED).
+    """
+    rec = record_for(key)
+    if error is None:
+        if rec.state != STOPPED:
+            rec.state = FINISHED  # the run returned on its own (nothing left to send)
+        rec.restart_at = None
+        return None
+    now = time.time()
+    if now - rec.started_at >= RESTART_RESET_SEC:
+        rec.restarts = 0
+    rec.last_error = f"{type(error).__name__}: {error}"[:300]
+    rec.last_error_at = now
+    if rec.restarts >= ENV.SUPERVISOR_MAX_RESTARTS:
+        rec.state = FAILED
+        rec.restart_at = None
+        return None
+    delay = min(RESTART_MAX_S, RESTART_BASE_S * (2 ** rec.restarts))
+    rec.restarts += 1
+    rec.state = BACKOFF
+    rec.restart_at = now + delay
+    return delay
+
+
+def on_stopped(key):
+    """The user (or a lost lease) stopped it: a pending restart no longer applies."""
+    rec = RECORDS.get(key)
+    if rec is not None and rec.live:
+        rec.state = STOPPED
+        rec.restart_at = None
+
+
+def is_live(key) -> bool:
+    rec = RECORDS.get(key)
+    return rec is not None and rec.live
+
+
+def live_keys() -> list:
+    return [k for k, rec in RECORDS.items() if rec.live]
+
+
+def state_counts() -> dict:
+    out = {}
+    for rec in RECORDS.values():
+        out[rec.state] = out.get(rec.state, 0) + 1
+    return out
+
+
+def troubled(limit: int = 10) -> list:
+    """Records with a failure, most recent first."""
+    recs = [r for r in RECORDS.values() if r.last_error_at]
+    recs.sort(key=lambda r: r.last_error_at, reverse=True)
+    return recs[:limit]
@@ -0,0 +1,151 @@
+import time
+from datetime import datetime, timezone
+from telethon import errors
+from ..core.repo import get_target_health
+
+# Failure classes. Only target-side classes count towards quarantine; flood waits and
+# source problems (restricted / deleted source post) say nothing about the target.
+DEAD_REASONS = {"banned", "private", "write_forbidden", "not_found", "left"}
+IGNORED_REASONS = {"flood", "source"}
+
+QUARANTINE_AFTER_DEAD = 2  # consecutive failures before a dead-looking target is quarantined
+QUARANTINE_AFTER_OTHER = 4
+BASE_BACKOFF_S = 3600
+MAX_BACKOFF_S = 7 * 24 * 3600
+
+
+def _errs(*names):
+    return tuple(getattr(errors, n) for n in names if hasattr(errors, n))
+
+
+_CLASSES = [
+    ("flood", _errs("FloodWaitError", "FloodPremiumWaitError")),
+    ("slowmode", _errs("SlowModeWaitError")),
+    ("source", _errs("ChatForwardsRestrictedError", "MessageIdInvalidError")),
+    ("banned", _errs("UserBannedInChannelError", "UserNotParticipantError", "ChatRestrictedError")),
+    ("private", _errs("ChannelPrivateError", "ChannelPublicGroupNaError")),
+    ("write_forbidden", _errs(
+        "ChatWriteForbiddenError", "ChatSendPlainForbiddenError", "ChatSendMediaForbiddenError",
+        "ChatGuestSendForbiddenError", "ChatAdminRequiredError", "TopicDeletedError",
+    )),
+    ("not_found", _errs("PeerIdInvalidError", "ChannelInvalidError", "ChatIdInvalidError")),
+]
+
+
+def classify_failure(exc) -> str:
+    for name, types in _CLASSES:
+        if types and isinstance(exc, types):
+            return name
+    if isinstance(exc, errors.ForbiddenError):
+        return "write_forbidden"
+    if isinstance(exc, ValueError) and "entity" in str(exc).lower():
+        return "not_found"  # telethon: "Could not find the input entity for ..."
+    return "other"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class TargetHealth:
+    """
+    Per-session health of send targets (group id or topic link).
+
+    Targets that keep failing for target-side reasons are quarantined with exponential backoff;
+    when the quarantine ends the target is let through once as a probe. Changes are buffered
+    and persisted by the campaign's batched progress write.
+    """
+
+    def __init__(self, session_id: int, entries: dict | None = None):
+        self.session_id = session_id
+        self.entries = entries or {}  # target -> [fails, reason, until_ts]
+        self.dirty: dict = {}  # target -> (fails, reason, until_iso) ; fails 0 = forget
+        self.skipped = 0
+        self.reclaimed_s = 0.0
+
+    @classmethod
+    def load(cls, session_id: int) -> "TargetHealth":
+        entries = {}
+        try:
+            for target, fails, reason, until_iso in get_target_health(session_id):
+                until = datetime.fromisoformat(until_iso).replace(tzinfo=timezone.utc).timestamp() if until_iso else 0.0
+                entries[target] = [int(fails or 0), reason, until]
+        except Exception:
+            pass
+        return cls(session_id, entries)
+
+    def allowed(self, target: str, cost_s: float = 0.0) -> bool:
+        """False while the target is quarantined; each skip adds cost_s to the reclaimed time."""
+        e = self.entries.get(str(target))
+        if not e or e[2] <= time.time():
+            return True
+        self.skipped += 1
+        self.reclaimed_s += cost_s
+        return False
+
+    def blocked_until(self, target: str) -> float:
+        e = self.entries.get(str(target))
+        return e[2] if e else 0.0
+
+    def record(self, target: str, exc=None):
+        target = str(target)
+        if exc is None:
+            if target in self.entries:
+                del self.entries[target]
+                self.dirty[target] = (0, None, None)
+            return
+        reason = classify_failure(exc)
+        if reason in IGNORED_REASONS:
+            return
+        now = time.time()
+        e = self.entries.setdefault(target, [0, reason, 0.0])
+        if reason == "slowmode":
+            # not a strike: just wait the slow mode out
+            e[2] = now + float(getattr(exc, "seconds", 60) or 60)
+        else:
+            e[0] += 1
+            e[1] = reason
+            threshold = QUARANTINE_AFTER_DEAD if reason in DEAD_REASONS else QUARANTINE_AFTER_OTHER
+            if e[0] >= threshold:
+                e[2] = now + min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2 ** (e[0] - threshold))
+        self.dirty[target] = (e[0], e[1], _iso(e[2]) if e[2] else None)
+
+    def mark_gone(self, target: str, reason: str = "banned"):
+        """Quarantine right away: an update said the account can't post there any more."""
+        target = str(target)
+        e = self.entries.setdefault(target, [0, reason, 0.0])
+        e[0] = max(e[0], QUARANTINE_AFTER_DEAD)
+        e[1] = reason
+        e[2] = time.time() + BASE_BACKOFF_S
+        self.dirty[target] = (e[0], e[1], _iso(e[2]))
+
+    def take_dirty(self) -> list:
+        rows = [(t, f, r, u) for t, (f, r, u) in self.dirty.items()]
+        self.dirty = {}
+        return rows
+
+    def quarantined(self) -> dict:
+        """reason -> number of targets quarantined right now."""
+        now = time.time()
+        out: dict[str, int] = {}
+        for fails, reason, until in self.entries.values():
+            if until > now:
+                out[reason] = out.get(reason, 0) + 1
+        return out
+
+
+# session_id -> live tracker of the running campaign (for reports)
+HEALTH: dict[int, TargetHealth] = {}
+
+
+def health_for(session_id: int) -> TargetHealth:
+    h = HEALTH.get(session_id)
+    if h is None:
+        h = TargetHealth.load(session_id)
+        HEALTH[session_id] = h
+    return h
+
+
+def health_report() -> list:
+    """[(session_id, quarantined_by_reason, skipped, reclaimed_s)] for trackers loaded in this process."""
+    return [(sid, h.quarantined(), h.skipped, h.reclaimed_s) for sid, h in HEALTH.items()]
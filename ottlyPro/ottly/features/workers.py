@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from ..core.config import ENV
+from ..core.repo import (
+    push_worker_command, take_worker_commands, save_worker_status, get_worker_status
+)
+
+log = logging.getLogger("camprun.workers")
+
+# Worker-process mode (ENV.CAMPAIGN_WORKERS): campaigns run in N worker processes, session id % N
+# picks the worker. The bot process keeps the pollers and sends commands through the
+# worker_commands table; workers report what they run through worker_status. A balanced
+# (multi-account) run is owned by the worker of the user's first session and may hold sessions
+# of other shards; a restarted worker leaves those to it.
+POLL_SEC = 1.0
+HEARTBEAT_SEC = 5
+STALE_AFTER_SEC = 30
+RESPAWN_BACKOFF_SEC = 5
+
+IS_WORKER = False  # True inside a worker process
+PROCS: dict = {}  # bot process: shard -> multiprocessing.Process
+_REMOTE = {"at": 0.0, "running": {}}  # bot process: cached worker status
+
+
+def worker_count() -> int:
+    raw = str(ENV.CAMPAIGN_WORKERS).strip().lower()
+    if raw == "auto":
+        return max(1, (os.cpu_count() or 2) - 1)
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+def delegated() -> bool:
+    """True in the bot process when campaigns run in worker processes."""
+    return not IS_WORKER and worker_count() > 0
+
+
+def shard_of(session_id: int, n: int | None = None) -> int:
+    return int(session_id) % (n or worker_count())
+
+
+def send_command(cmd: str, user_id: int, session_id: int | None = None, *, all_shards: bool = False):
+    n = worker_count()
+    shards = range(n) if all_shards else [shard_of(session_id, n)]
+    for shard in shards:
+        push_worker_command(shard, cmd, user_id, session_id)
+    _REMOTE["at"] = 0.0  # next status read goes to the DB
+
+
+def notify_user_changed(user_id: int):
+    """Bot process: tell workers to drop their per-user caches (setup, schedule, live log) and re-check."""
+    if delegated():
+        send_command("refresh", user_id, all_shards=True)
+
+
+def remote_running() -> dict:
+    """(user_id, session_id) -> next run ts, from workers with a recent heartbeat (cached 2s)."""
+    now = time.time()
+    if now - _REMOTE["at"] < 2:
+        return _REMOTE["running"]
+    running = {}
+    try:
+        for shard, pid, hb, rows in get_worker_status():
+            if not hb or (datetime.utcnow() - datetime.fromisoformat(hb)).total_seconds() > STALE_AFTER_SEC:
+                continue
+            for key, next_ts in rows.items():
+                uid, sid = key.split(":")
+                running[(int(uid), int(sid))] = next_ts
+    except Exception:
+        pass
+    _REMOTE.update(at=now, running=running)
+    return running
+
+
+def worker_report() -> list:
+    """[(shard, pid, alive, campaigns)] for the admin panel."""
+    out = []
+    for shard, pid, hb, rows in get_worker_status():
+        alive = bool(hb) and (datetime.utcnow() - datetime.fromisoformat(hb)).total_seconds() <= STALE_AFTER_SEC
+        out.append((shard, pid, alive, len(rows)))
+    return out
+
+
+# --- worker process ---
+
+def _sessions_run_elsewhere(shard: int) -> set:
+    """Session ids that live workers other than this shard report running (balanced runs span shards)."""
+    sids = set()
+    for other, _pid, hb, rows in get_worker_status():
+        if other == shard or not hb or (datetime.utcnow() - datetime.fromisoformat(hb)).total_seconds() > STALE_AFTER_SEC:
+            continue
+        sids.update(int(key.split(":")[1]) for key in rows)
+    return sids
+
+
+def _resume_filter(shard: int, n: int):
+    """
+    accept(session_id) for autostart: sessions of this shard, except those a balanced run in
+    another live worker already holds (a restarted shard would otherwise send from them twice).
+    """
+    elsewhere = {"at": 0.0, "sids": set()}
+
+    def accept(sid) -> bool:
+        if shard_of(sid, n) != shard:
+            return False
+        if time.time() - elsewhere["at"] >= POLL_SEC:
+            try:
+                elsewhere["sids"] = _sessions_run_elsewhere(shard)
+            except Exception:
+                pass
+            elsewhere["at"] = time.time()
+        return sid not in elsewhere["sids"]
+    return accept
+
+
+def _refresh_user(user_id: int):
+    from ..tg.logging_svc import _LIVE_CHATS, _LIVE_DETAIL
+    from .auto_schedule import _COMPILED
+    from .send_plan import invalidate_send_plan
+    from .campaigns import wake_user_campaigns
+    _LIVE_CHATS.pop(user_id, None)
+    _LIVE_DETAIL.pop(user_id, None)
+    _COMPILED.pop(user_id, None)
+    invalidate_send_plan(user_id)
+    wake_user_campaigns(user_id)
+
+
+async def _run_command(cmd: str, user_id: int, session_id, main_bot, log_bot):
+    from . import campaigns as C
+    if cmd == "start":
+        await C.start_campaign_for(main_bot, None, log_bot, ENV.OWNER_ID, user_id, session_id, None)
+    elif cmd == "start_balanced":
+        await C.start_balanced_campaigns(main_bot, log_bot, ENV.OWNER_ID, user_id)
+    elif cmd == "stop":
+        C.stop_campaign_for(user_id, session_id)
+    elif cmd == "stop_user":
+        for uid, sid in C.supervisor.live_keys():
+            if uid == user_id:
+                C.stop_campaign_for(uid, sid)
+    elif cmd == "refresh":
+        _refresh_user(user_id)
+    else:
+        log.warning("unknown worker command %r", cmd)
+
+
+def _status(shard: int) -> dict:
+    from .supervisor import live_keys
+    from .scheduler import SCHEDULER
+    return {f"{uid}:{sid}": SCHEDULER.next_run((uid, sid)) for uid, sid in live_keys()}
+
+
+async def _worker_main(shard: int, n: int):
+    global IS_WORKER
+    IS_WORKER = True
+    from ..tg.outbound import build_bot
+    from .shutdown import graceful_shutdown, install_stop_signals
+    main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
+    log_bot = build_bot(ENV.LOG_BOT_TOKEN, "log") if ENV.LOG_BOT_TOKEN else main_bot
+    log.info("campaign worker %s/%s started (pid %s)", shard, n, os.getpid())
+    # campaigns of this shard that were running when this worker (re)started; with leases this
+    # keeps renewing them and picks up the shard's campaigns of dead instances
+    from .autostart import autostart_all
+    resumer = asyncio.create_task(autostart_all(main_bot, None, log_bot, ENV.OWNER_ID, accept=_resume_filter(shard, n)))
+    stop = asyncio.Event()
+    install_stop_signals(stop)
+    last_beat = 0.0
+    while not stop.is_set():
+        try:
+            for cmd, uid, sid in take_worker_commands(shard):
+                last_beat = 0.0  # report the change right away
+                try:
+                    await _run_command(cmd, uid, sid, main_bot, log_bot)
+                except Exception:
+                    log.exception("worker command %s failed for %s/%s", cmd, uid, sid)
+            if time.time() - last_beat >= HEARTBEAT_SEC:
+                save_worker_status(shard, os.getpid(), _status(shard))
+                last_beat = time.time()
+        except Exception:
+            log.exception("worker %s loop error", shard)
+        try:
+            await asyncio.wait_for(stop.wait(), POLL_SEC)
+        except asyncio.TimeoutError:
+            pass
+    resumer.cancel()
+    await graceful_shutdown(bots=(main_bot, log_bot), name=f"worker{shard}")
+    save_worker_status(shard, os.getpid(), {})
+
+
+def _worker_entry(shard: int, n: int):
+    logging.basicConfig(level=logging.INFO, format=f"[%(asctime)s] %(levelname)s w{shard} %(name)s: %(message)s")
+    try:
+        asyncio.run(_worker_main(shard, n))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+async def run_workers():
+    """Bot process: start the campaign workers and respawn any that exit."""
+    from .shutdown import shutting_down
+    n = worker_count()
+    ctx = multiprocessing.get_context("spawn")
+    log.info("starting %s campaign worker(s)", n)
+    while not shutting_down():
+        for shard in range(n):
+            p = PROCS.get(shard)
+            if p is not None and p.is_alive():
+                continue
+            if p is not None:
+                log.warning("campaign worker %s exited (code %s), restarting", shard, p.exitcode)
+            p = ctx.Process(target=_worker_entry, args=(shard, n), name=f"campaign-worker-{shard}", daemon=True)
+            p.start()
+            PROCS[shard] = p
+        await asyncio.sleep(RESPAWN_BACKOFF_SEC)
+
+
+async def stop_workers():
+    """Shutdown: ask every worker to shut down gracefully (SIGTERM) and wait for them."""
+    procs = [p for p in PROCS.values() if p.is_alive()]
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        await asyncio.to_thread(p.join, ENV.SHUTDOWN_DRAIN_SEC + 10)
+        if p.is_alive():
+            p.kill()
+    return f"{len(procs)} worker(s)"
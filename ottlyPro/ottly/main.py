@@ -1,9 +1,8 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.client.bot import DefaultBotProperties
-from aiogram.enums import ParseMode
+from aiogram import Dispatcher
 from .core.config import ENV
+from .tg.outbound import build_bot
 from .tg.middleware import DowntimeMiddleware, BanMiddleware, ChatTrackMiddleware
 from .tg.main_bot import rt_main, set_aux_bots
 from .tg.login_bot import rt_login
@@ -14,21 +13,20 @@ from .features.reporter import (
     send_excel_snapshot_now,
 )
 from .features.autostart import autostart_all
+from .features.workers import worker_count, run_workers
+from .features.shutdown import graceful_shutdown, install_stop_signals
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
 log = logging.getLogger("camprun")
 
-def build_bot(token: str) -> Bot:
-    return Bot(token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-
 async def main():
     log.info("Starting CAMP RUN bot suite…")
 
-    main_bot = build_bot(ENV.MAIN_BOT_TOKEN)
-    login_bot = build_bot(ENV.LOGIN_BOT_TOKEN)
-    admin_bot = build_bot(ENV.ADMIN_BOT_TOKEN)
-    log_bot = build_bot(ENV.LOG_BOT_TOKEN) if ENV.LOG_BOT_TOKEN else None
-    admin_log_bot = build_bot(ENV.ADMIN_LOG_BOT_TOKEN) if ENV.ADMIN_LOG_BOT_TOKEN else None
+    main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
+    login_bot = build_bot(ENV.LOGIN_BOT_TOKEN, "login")
+    admin_bot = build_bot(ENV.ADMIN_BOT_TOKEN, "admin")
+    log_bot = build_bot(ENV.LOG_BOT_TOKEN, "log") if ENV.LOG_BOT_TOKEN else None
+    admin_log_bot = build_bot(ENV.ADMIN_LOG_BOT_TOKEN, "admin_log") if ENV.ADMIN_LOG_BOT_TOKEN else None
 
     dp_main = Dispatcher()
     dp_login = Dispatcher()
@@ -65,15 +63,33 @@ async def main():
         # Zip backup (.env + ottly.db + sessions/*.session) every 20 minutes
         tasks.append(asyncio.create_task(zip_backup_20min_job(admin_log_bot, ENV.OWNER_ID)))
 
-    # Auto-resume campaigns on boot
-    tasks.append(asyncio.create_task(autostart_all(main_bot, None, log_bot or main_bot, ENV.OWNER_ID)))
+    # Auto-resume campaigns on boot; with campaign workers they run (and resume) in worker processes
+    if worker_count() > 0:
+        tasks.append(asyncio.create_task(run_workers()))
+    else:
+        tasks.append(asyncio.create_task(autostart_all(main_bot, None, log_bot or main_bot, ENV.OWNER_ID)))
+
+    # Pollers don't install their own signal handlers: SIGTERM / SIGINT run the graceful shutdown
+    stop = asyncio.Event()
+    install_stop_signals(stop)
+    pollers = [
+        asyncio.create_task(dp_main.start_polling(main_bot, handle_signals=False, close_bot_session=False)),
+        asyncio.create_task(dp_login.start_polling(login_bot, handle_signals=False, close_bot_session=False)),
+        asyncio.create_task(dp_admin.start_polling(admin_bot, handle_signals=False, close_bot_session=False)),
+    ]
+    stopper = asyncio.create_task(stop.wait())
+    await asyncio.wait([stopper, *pollers], return_when=asyncio.FIRST_COMPLETED)
+    for t in pollers:
+        if t.done() and t.exception():
+            log.error("poller stopped: %r", t.exception())
 
-    await asyncio.gather(
-        dp_main.start_polling(main_bot),
-        dp_login.start_polling(login_bot),
-        dp_admin.start_polling(admin_bot),
-        *tasks
+    await graceful_shutdown(
+        dispatchers=(dp_main, dp_login, dp_admin),
+        bots=(main_bot, login_bot, admin_bot, log_bot, admin_log_bot),
     )
+    for t in [stopper, *pollers, *tasks]:
+        t.cancel()
+    await asyncio.gather(*pollers, *tasks, return_exceptions=True)
 
 if __name__ == "__main__":
     try:
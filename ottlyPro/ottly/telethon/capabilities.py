@@ -0,0 +1,115 @@
+import time
+from telethon import errors, functions, types
+from .resolver import resolve_bulk
+
+# Per-account view of what a target group allows: filled in one batched pass when a cycle
+# opens, refreshed after CAPS_TTL_S or when a send fails in a way that hints it changed.
+CAPS_TTL_S = 6 * 3600
+
+_STALE_ON = tuple(getattr(errors, n) for n in (
+    "ChatWriteForbiddenError", "ChatSendPlainForbiddenError", "ChatSendMediaForbiddenError",
+    "ChatAdminRequiredError", "UserBannedInChannelError", "ChatRestrictedError", "ChannelPrivateError",
+) if hasattr(errors, n))
+
+
+class GroupCaps:
+    """Posting capabilities of one group for one account."""
+
+    def __init__(self, group_id: int, *, send_banned: bool = False, is_admin: bool = False, forum: bool = False):
+        self.group_id = group_id
+        self.send_banned = send_banned  # default_banned_rights / own banned_rights forbid send_messages
+        self.is_admin = is_admin
+        self.forum = forum
+        self.slowmode_s = 0
+        self.next_send_ts = 0.0  # slow mode: earliest time this account may post again
+        self.fetched_at = time.time()
+        self.stale = False
+
+    def ready_at(self):
+        """None if the account can't post at all, else when it may post next (<= now: now)."""
+        if self.is_admin:
+            return 0.0
+        if self.send_banned:
+            return None
+        return self.next_send_ts
+
+
+# (session_id, group_id) -> GroupCaps
+CAPS: dict[tuple[int, int], GroupCaps] = {}
+
+
+def _caps_from_entity(ent) -> GroupCaps:
+    if isinstance(ent, (types.ChannelForbidden, types.ChatForbidden)) or getattr(ent, "left", False) \
+            or getattr(ent, "deactivated", False):
+        return GroupCaps(ent.id, send_banned=True)
+    is_admin = bool(getattr(ent, "creator", False) or getattr(ent, "admin_rights", None))
+    banned = False
+    for rights in (getattr(ent, "default_banned_rights", None), getattr(ent, "banned_rights", None)):
+        if rights is not None and getattr(rights, "send_messages", False):
+            banned = True
+    return GroupCaps(ent.id, send_banned=banned, is_admin=is_admin, forum=bool(getattr(ent, "forum", False)))
+
+
+async def refresh_caps(client, session_id: int, group_ids, *, force: bool = False):
+    """Fetch caps for groups that are missing, stale or expired: one bulk resolve (GetChannels/GetChats
+    in chunks), plus GetFullChannel only for slow-mode groups (for the slow-mode delay)."""
+    now = time.time()
+    todo = []
+    for gid in group_ids:
+        c = CAPS.get((session_id, gid))
+        if force or c is None or c.stale or now - c.fetched_at > CAPS_TTL_S:
+            todo.append(gid)
+    if not todo:
+        return
+    ents = {id(e): e for e in (await resolve_bulk(client, session_id, todo, fresh=True)).values()}
+    for ent in ents.values():
+        caps = _caps_from_entity(ent)
+        if getattr(ent, "slowmode_enabled", False) and not caps.is_admin and not caps.send_banned:
+            try:
+                full = (await client(functions.channels.GetFullChannelRequest(ent))).full_chat
+                caps.slowmode_s = int(full.slowmode_seconds or 0)
+                if full.slowmode_next_send_date:
+                    caps.next_send_ts = full.slowmode_next_send_date.timestamp()
+            except Exception:
+                pass
+        CAPS[(session_id, ent.id)] = caps
+
+
+def split_postable(session_id: int, group_ids):
+    """(postable now, {gid: ts it may post at}, [gids it can't post to]). Unknown groups count as postable."""
+    now = time.time()
+    ok, deferred, blocked = [], {}, []
+    for gid in group_ids:
+        c = CAPS.get((session_id, gid))
+        ready = c.ready_at() if c else 0.0
+        if ready is None:
+            blocked.append(gid)
+        elif ready > now:
+            deferred[gid] = ready
+        else:
+            ok.append(gid)
+    return ok, deferred, blocked
+
+
+def mark_stale(session_id: int, group_ids):
+    """Re-fetch these groups' caps on the next refresh (TTL or not)."""
+    for gid in group_ids:
+        c = CAPS.get((session_id, gid))
+        if c is not None:
+            c.stale = True
+
+
+def note_send_result(session_id: int, group_id: int, exc=None):
+    """Update caps after a send: start the slow-mode clock, or mark them for refresh."""
+    c = CAPS.get((session_id, group_id))
+    if c is None:
+        return
+    now = time.time()
+    if exc is None:
+        if c.slowmode_s and not c.is_admin:
+            c.next_send_ts = now + c.slowmode_s
+    elif isinstance(exc, errors.SlowModeWaitError):
+        c.next_send_ts = now + float(getattr(exc, "seconds", 0) or 0)
+        c.stale = True
+    elif isinstance(exc, _STALE_ON):
+        c.stale = True
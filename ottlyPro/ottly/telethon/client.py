@@ -1,10 +1,113 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 from ..core.config import ENV
 from .sessions import read_string_session
+from .governor import GovernedClient, INTERACTIVE, BACKGROUND
 
-async def client_from_session_file(path:str) -> TelegramClient:
+class SenderSession(StringSession):
+    """
+    StringSession for send-only clients: remembers only chats and channels (the peers a campaign
+    posts to), one row per peer, at most ENV.SENDER_ENTITY_LIMIT of them.
+    """
+
+    def __init__(self, string: str = None):
+        super().__init__(string)
+        self._rows_by_id: dict = {}
+
+    def process_entities(self, tlo):
+        for row in self._entities_to_rows(tlo):
+            if row[0] >= 0:
+                continue  # users: never needed to post into groups
+            old = self._rows_by_id.get(row[0])
+            if old == row:
+                continue
+            if old is not None:
+                self._entities.discard(old)
+            elif len(self._rows_by_id) >= ENV.SENDER_ENTITY_LIMIT:
+                continue
+            self._entities.add(row)
+            self._rows_by_id[row[0]] = row
+
+
+async def client_from_session_file(path:str, *, sender: bool = False) -> TelegramClient:
+    """
+    Connected client for a session file. sender=True builds the campaign profile: no update
+    stream (no update handling, no entities pulled in from group traffic), a bounded session
+    entity store, and FloodWaits raised to the caller instead of slept through. Updates are only
+    received when ENV.CAMPAIGN_UPDATE_LISTENER is on (see features/cache_events.py).
+    """
     sess = read_string_session(path)
-    client = TelegramClient(StringSession(sess), ENV.API_ID_DEFAULT, ENV.API_HASH_DEFAULT)
+    if sender:
+        client = GovernedClient(
+            SenderSession(sess), ENV.API_ID_DEFAULT, ENV.API_HASH_DEFAULT,
+            receive_updates=ENV.CAMPAIGN_UPDATE_LISTENER, flood_sleep_threshold=ENV.SENDER_FLOOD_SLEEP_SEC,
+            entity_cache_limit=ENV.SENDER_ENTITY_LIMIT, egress=BACKGROUND,
+        )
+    else:
+        client = GovernedClient(StringSession(sess), ENV.API_ID_DEFAULT, ENV.API_HASH_DEFAULT, egress=INTERACTIVE)
     await client.connect()
     return client
+
+# --- Pooled clients for campaign work ---
+# One client object per session file. It is connected only while borrowed (plus a short
+# idle grace period) but the object, and with it Telethon's entity cache, is kept while
+# a campaign pins it.
+CLIENT_POOL: dict[str, dict] = {}  # session_path -> {"client", "users", "pins", "last_used", "lock"}
+CLIENT_FORGET_SEC = 3600
+
+def _pool_entry(path: str) -> dict:
+    ent = CLIENT_POOL.get(path)
+    if ent is None:
+        ent = {"client": None, "users": 0, "pins": 0, "last_used": time.monotonic(), "lock": asyncio.Lock()}
+        CLIENT_POOL[path] = ent
+    return ent
+
+def pin_client(path: str):
+    _pool_entry(path)["pins"] += 1
+
+def unpin_client(path: str):
+    ent = CLIENT_POOL.get(path)
+    if ent and ent["pins"] > 0:
+        ent["pins"] -= 1
+
+@asynccontextmanager
+async def borrow_client(path: str):
+    """Yield a connected pooled client for path; it goes back to the pool afterwards."""
+    ent = _pool_entry(path)
+    ent["users"] += 1
+    try:
+        async with ent["lock"]:
+            if ent["client"] is None:
+                ent["client"] = await client_from_session_file(path, sender=True)
+            elif not ent["client"].is_connected():
+                await ent["client"].connect()
+        yield ent["client"]
+    finally:
+        ent["users"] -= 1
+        ent["last_used"] = time.monotonic()
+
+async def reap_idle_clients(idle_sec: int | None = None):
+    """Disconnect pooled clients idle for idle_sec; forget unpinned ones idle for much longer."""
+    idle_sec = ENV.CLIENT_IDLE_SEC if idle_sec is None else idle_sec
+    now = time.monotonic()
+    for path, ent in list(CLIENT_POOL.items()):
+        if ent["users"] > 0:
+            continue
+        idle = now - ent["last_used"]
+        client = ent["client"]
+        listening = ENV.CAMPAIGN_UPDATE_LISTENER and ent["pins"] > 0  # keeps receiving cache updates
+        if client is not None and idle >= idle_sec and client.is_connected() and not listening:
+            try: await client.disconnect()
+            except Exception: pass
+        if ent["pins"] == 0 and idle >= CLIENT_FORGET_SEC:
+            CLIENT_POOL.pop(path, None)
+
+async def disconnect_all_clients(timeout: float = 10) -> int:
+    """Shutdown: disconnect every pooled client (in parallel); returns how many were connected."""
+    clients = [ent["client"] for ent in CLIENT_POOL.values() if ent["client"] is not None and ent["client"].is_connected()]
+    if clients:
+        await asyncio.wait([asyncio.ensure_future(c.disconnect()) for c in clients], timeout=timeout)
+    return len(clients)
@@ -0,0 +1,169 @@
+import hashlib
+import time
+from telethon import functions, helpers, types, utils
+
+# Source posts prepared for copy-mode sends. A cycle fetches its source post once instead of
+# once per target; identical content (the public ENV ad that every participating account posts
+# into its own channel) is interned by content hash and shared across campaigns. Media is kept as
+# a reusable InputMedia (file reference), so copies never re-download or re-upload it.
+SOURCE_TTL_S = 600  # an edited source post is picked up after this
+MAX_ENTRIES = 5000
+ALBUM_MAX = 10  # Telegram albums have up to 10 items
+
+
+class PreparedContent:
+    """Ready-to-send copy of a source post."""
+
+    def __init__(self, content_hash: str, text: str, entities, media, buttons, link_preview: bool, message,
+                 album=None):
+        self.content_hash = content_hash
+        self.text = text
+        self.entities = entities
+        self.media = media  # InputMedia, or None for text posts
+        self.buttons = buttons
+        self.link_preview = link_preview
+        self.message = message  # original Message: fallback for media that has no InputMedia form
+        self.album = album or []  # album parts [(msg_id, InputMedia, caption, entities)], in order
+
+    @property
+    def album_ids(self) -> list:
+        return [mid for mid, *_ in self.album]
+
+    @property
+    def sendable(self) -> bool:
+        """False when the post has media that can't be re-sent by reference (poll, geo, ...)."""
+        return bool(self.album) or self.media is not None or self.message is None or not _has_real_media(self.message)
+
+
+def _has_real_media(msg) -> bool:
+    media = getattr(msg, "media", None)
+    return media is not None and not isinstance(media, types.MessageMediaWebPage)
+
+
+def content_hash(msg) -> str:
+    h = hashlib.sha1((msg.message or "").encode())
+    for e in (msg.entities or []):
+        h.update(repr(e.to_dict()).encode())
+    media = getattr(msg, "media", None)
+    if _has_real_media(msg):
+        doc = getattr(media, "photo", None) or getattr(media, "document", None)
+        h.update(f"{type(media).__name__}:{getattr(doc, 'id', '')}".encode())
+    if msg.reply_markup is not None:
+        h.update(repr(msg.reply_markup.to_dict()).encode())
+    return h.hexdigest()
+
+
+# (session_id, source peer id, msg_id) -> (fetched_at, PreparedContent)
+_SOURCES: dict = {}
+# content hash -> PreparedContent for text posts (shared by every account); media posts are
+# interned per account, since file references are only guaranteed for the account that fetched them
+_BY_HASH: dict = {}
+STATS = {"hits": 0, "fetches": 0, "shared": 0}
+
+
+def _prepare(session_id: int, msg, parts=None) -> PreparedContent:
+    key = content_hash(msg)
+    album = []
+    if parts:
+        h = hashlib.sha1(key.encode())
+        for part in parts:
+            h.update(content_hash(part).encode())
+            try:
+                album.append((part.id, utils.get_input_media(part.media), part.message or "", part.entities))
+            except Exception:
+                album = []
+                break
+        key = h.hexdigest()
+    media = None
+    if _has_real_media(msg):
+        try:
+            media = utils.get_input_media(msg.media)
+        except Exception:
+            media = None
+    shared_key = key if media is None and not album else (session_id, key)
+    hit = _BY_HASH.get(shared_key)
+    if hit is not None:
+        STATS["shared"] += 1
+        return hit
+    prepared = PreparedContent(
+        key, msg.message or "", msg.entities, media, msg.reply_markup,
+        link_preview=isinstance(getattr(msg, "media", None), types.MessageMediaWebPage), message=msg,
+        album=album,
+    )
+    if len(_BY_HASH) >= MAX_ENTRIES:
+        _BY_HASH.clear()
+    _BY_HASH[shared_key] = prepared
+    return prepared
+
+
+async def _album_parts(client, src, msg) -> list:
+    """All messages of msg's album (at most ALBUM_MAX, ids are consecutive-ish) in one request."""
+    try:
+        around = await client.get_messages(src, ids=list(range(msg.id - ALBUM_MAX + 1, msg.id + ALBUM_MAX)))
+    except Exception:
+        return []
+    parts = [m for m in around if m is not None and m.grouped_id == msg.grouped_id]
+    parts.sort(key=lambda m: m.id)
+    return parts if len(parts) > 1 else []
+
+
+async def prepared_source(client, session_id: int, src, msg_id: int):
+    """PreparedContent of the source post (fetched at most once per SOURCE_TTL_S), or None if it's gone."""
+    try:
+        peer_id = utils.get_peer_id(src)
+    except Exception:
+        peer_id = str(src)
+    key = (session_id, peer_id, msg_id)
+    hit = _SOURCES.get(key)
+    now = time.time()
+    if hit and now - hit[0] < SOURCE_TTL_S:
+        STATS["hits"] += 1
+        return hit[1]
+    STATS["fetches"] += 1
+    msg = await client.get_messages(src, ids=msg_id)
+    if msg is None:
+        _SOURCES.pop(key, None)
+        return None
+    parts = None
+    if getattr(msg, "grouped_id", None):
+        parts = await _album_parts(client, src, msg)
+    prepared = _prepare(session_id, msg, parts)
+    if len(_SOURCES) >= MAX_ENTRIES:
+        for k in [k for k, (ts, _p) in _SOURCES.items() if now - ts >= SOURCE_TTL_S]:
+            del _SOURCES[k]
+    _SOURCES[key] = (now, prepared)
+    return prepared
+
+
+async def send_prepared(client, dst, prepared: PreparedContent, *, reply_to=None):
+    """
+    Send a copy (no forward tag) of the prepared post to dst: albums as one SendMultiMediaRequest,
+    text posts as a SendMessageRequest built from the precomputed fields (response not parsed).
+    """
+    if prepared.album:
+        # whole album in one request, captions per item kept
+        return await client(functions.messages.SendMultiMediaRequest(
+            peer=await client.get_input_entity(dst),
+            multi_media=[
+                types.InputSingleMedia(media=media, random_id=helpers.generate_random_long(),
+                                       message=caption, entities=entities)
+                for _mid, media, caption, entities in prepared.album
+            ],
+            reply_to=types.InputReplyToMessage(reply_to_msg_id=reply_to) if reply_to else None,
+        ))
+    if prepared.media is None and prepared.sendable:
+        return await client(functions.messages.SendMessageRequest(
+            peer=await client.get_input_entity(dst),
+            message=prepared.text,
+            random_id=helpers.generate_random_long(),
+            no_webpage=not prepared.link_preview,
+            reply_to=types.InputReplyToMessage(reply_to_msg_id=reply_to) if reply_to else None,
+            reply_markup=prepared.buttons,
+            entities=prepared.entities,
+        ))
+    if not prepared.sendable:
+        return await client.send_message(dst, prepared.message, buttons=prepared.buttons, reply_to=reply_to)
+    return await client.send_message(
+        dst, prepared.text, formatting_entities=prepared.entities, file=prepared.media,
+        buttons=prepared.buttons, link_preview=prepared.link_preview, reply_to=reply_to,
+    )
@@ -1,11 +1,12 @@
-import random
-import asyncio
+import re
+from datetime import datetime
 from telethon import errors, functions
 from ..core.config import ENV
 from ..core.repo import premium_active, add_metric, bump_counters, get_cfg, get_user_counters, list_sessions
-from ..tg.logging_svc import send_live_log, display_name
+from ..tg.logging_svc import send_live_log, display_name, live_digest, live_log_detail
 from ..core.timeutil import now_local
-from ..features.reporter import append_admin_log_row
+from .resolver import resolve_bulk, cached_entity
+from .content_cache import prepared_source, send_prepared
 
 def _extract_forwarded_msg_id(resp):
     """Try to extract the sent/forwarded message id from Telethon responses.
@@ -57,25 +58,28 @@ async def _append_csv_row_for_send(dst_ent, username: str, public_link: str, cam
     except Exception:
         pass
 
+_PUBLIC_LINK_RE = re.compile(r"^https?://t\.me/([^/]+)/([0-9]+)$")
+_PRIVATE_LINK_RE = re.compile(r"^https?://t\.me/c/([0-9]+)/([0-9]+)$")
+_DOMAIN_LINK_RE = re.compile(r"domain=([^&]+).*post=([0-9]+)")
+
 def parse_post_link(link: str):
     """Parse a Telegram post or topic link into (peer, message_id)."""
-    import re
     if not link:
         return None, None
     link = link.strip()
     # t.me/username/msgid
-    m = re.match(r"^https?://t\.me/([^/]+)/([0-9]+)$", link)
+    m = _PUBLIC_LINK_RE.match(link)
     if m and m.group(1) != "c":
         return m.group(1), int(m.group(2))
     # t.me/c/internal/msgid
-    m = re.match(r"^https?://t\.me/c/([0-9]+)/([0-9]+)$", link)
+    m = _PRIVATE_LINK_RE.match(link)
     if m:
         internal = m.group(1)
         msg_id = int(m.group(2))
         peer = int(f"-100{internal}")
         return peer, msg_id
     # domain=...&post=... style
-    m = re.search(r"domain=([^&]+).*post=([0-9]+)", link)
+    m = _DOMAIN_LINK_RE.search(link)
     if m:
         return m.group(1), int(m.group(2))
     return None, None
@@ -142,16 +146,15 @@ def _fallback_group_link(ent):
 
 def _parse_topic_link(link: str):
     """Accept t.me/<username>/<msgid> or t.me/c/<internal>/<msgid>."""
-    import re
     if not link:
         return None
     link = link.strip()
-    m = re.match(r"^https?://t\.me/([^/]+)/([0-9]+)$", link)
+    m = _PUBLIC_LINK_RE.match(link)
     if m and m.group(1) != "c":
         peer = m.group(1)
         top_id = int(m.group(2))
         return peer, top_id
-    m = re.match(r"^https?://t\.me/c/([0-9]+)/([0-9]+)$", link)
+    m = _PRIVATE_LINK_RE.match(link)
     if m:
         internal = m.group(1)
         top_id = int(m.group(2))
@@ -159,28 +162,9 @@ def _parse_topic_link(link: str):
         return peer, top_id
     return None
 
-async def forward_to_groups(
-    main_bot, admin_log_bot_unused, log_bot, owner_id: int,
-    user_id: int, session_id: int, client, src, source_msg_id: int, source_link: str,
-    group_ids: list, interval_s: int,
-    *, topic_links=None, with_tag: bool = False
-):
-    """Forward message to groups and then topic links; keep logs & metrics."""
-    if topic_links is None:
-        topic_links = []
-
-    # Premium gate
-    if (with_tag or len(topic_links) > 0) and not premium_active(user_id):
-        try:
-            await send_live_log(log_bot, user_id, "🔒 Premium required for with-tag / topics. Sent only basic group forwards.")
-        except Exception:
-            pass
-        topic_links = []
-        with_tag = False
-
+async def _account_identity(client, user_id: int, session_id: int):
+    """(me, account_index, phone) of the session: which account (#1, #2, ...) of the user is sending."""
     me = await client.get_me()
-
-    # Determine which account index (#1, #2, ...) and phone number are being used
     account_index = None
     phone_number = getattr(me, "phone", None) or "—"
     try:
@@ -200,67 +184,161 @@ async def forward_to_groups(
                 break
     if account_index is None:
         account_index = 1
-    source_msg = await client.get_messages(src, ids=source_msg_id)
-    source_text = (source_msg.message or "").strip() if source_msg else ""
-    is_env_ad_match = int(source_text == (ENV.ENV_AD_MESSAGE or "").strip())
+    return me, account_index, phone_number
+
 
-    # choose random delay range per target
-    if premium_active(user_id):
+class ForwardCycle:
+    """
+    One pass of a source post over a campaign's targets (groups first, then topic links),
+    sent one target at a time.
+
+    The campaign scheduler drives it as one work item per target, so nothing holds a task
+    or a connection between targets.
+    """
+
+    def __init__(self, *, log_bot, user_id: int, session_id: int, src, source_msg_id: int, source_link: str,
+                 group_ids: list, topic_links: list, with_tag: bool, me, account_index: int, phone_number: str,
+                 is_env_ad_match: int, min_delay: int, max_delay: int, parsed_topics: dict | None = None):
+        self.log_bot = log_bot
+        self.user_id = user_id
+        self.session_id = session_id
+        self.src = src
+        self.source_msg_id = source_msg_id
+        self.source_link = source_link
+        self.group_ids = list(group_ids)
+        self.topic_links = list(topic_links)
+        self.with_tag = with_tag
+        self.me = me
+        self.account_index = account_index
+        self.phone_number = phone_number
+        self.is_env_ad_match = is_env_ad_match
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.last_error = None  # exception of the last send_target(), None on success
+        self.parsed_topics = parsed_topics or {}  # topic link -> (peer, top_id)
+
+    @classmethod
+    async def open(
+        cls, main_bot, admin_log_bot_unused, log_bot, owner_id: int,
+        user_id: int, session_id: int, client, src, source_msg_id: int, source_link: str,
+        group_ids: list, interval_s: int,
+        *, topic_links=None, with_tag: bool = False, plan=None
+    ) -> "ForwardCycle":
+        """With a SendPlan (campaign runs), premium, delays, parsed topics and the account identity
+        come from the plan instead of being looked up again every cycle."""
+        if topic_links is None:
+            topic_links = []
+        is_premium = plan.premium if plan is not None else premium_active(user_id)
+
+        # Premium gate
+        if (with_tag or len(topic_links) > 0) and not is_premium:
+            try:
+                await send_live_log(log_bot, user_id, "🔒 Premium required for with-tag / topics. Sent only basic group forwards.")
+            except Exception:
+                pass
+            topic_links = []
+            with_tag = False
+
+        if plan is not None and plan.identity:
+            me, account_index, phone_number = plan.identity
+        else:
+            me, account_index, phone_number = await _account_identity(client, user_id, session_id)
+            if plan is not None:
+                plan.identity = (me, account_index, phone_number)
+        if plan is not None:
+            parsed_topics = plan.topics
+        else:
+            parsed_topics = {ln: p for ln in topic_links if (p := _parse_topic_link(ln))}
+        # all targets in one bulk resolve (cached per account, so topic usernames are resolved once)
         try:
-            cfg = get_cfg(f"campaign_target_delay:{user_id}", None)
+            topic_peers = [parsed_topics[ln][0] for ln in topic_links if ln in parsed_topics]
+            await resolve_bulk(client, session_id, list(group_ids) + topic_peers)
         except Exception:
-            cfg = None
-        if isinstance(cfg, (list, tuple)) and len(cfg) == 2:
+            pass
+        source_msg = await prepared_source(client, session_id, src, source_msg_id)
+        source_text = source_msg.text.strip() if source_msg else ""
+        is_env_ad_match = int(source_text == (ENV.ENV_AD_MESSAGE or "").strip())
+
+        # choose random delay range per target
+        if plan is not None:
+            min_delay, max_delay = plan.min_delay, plan.max_delay
+        elif is_premium:
             try:
-                min_delay = int(cfg[0])
-                max_delay = int(cfg[1])
+                cfg = get_cfg(f"campaign_target_delay:{user_id}", None)
             except Exception:
+                cfg = None
+            if isinstance(cfg, (list, tuple)) and len(cfg) == 2:
+                try:
+                    min_delay = int(cfg[0])
+                    max_delay = int(cfg[1])
+                except Exception:
+                    min_delay, max_delay = 5, 90
+            else:
                 min_delay, max_delay = 5, 90
         else:
-            min_delay, max_delay = 5, 90
-    else:
-        min_delay, max_delay = 10, 45
+            min_delay, max_delay = 10, 45
 
-    async def _sleep_between_targets():
-        import random as _r
-        delay = _r.randint(min_delay, max_delay)
-        await asyncio.sleep(delay)
+        return cls(
+            log_bot=log_bot, user_id=user_id, session_id=session_id, src=src, source_msg_id=source_msg_id,
+            source_link=source_link, group_ids=group_ids, topic_links=topic_links, with_tag=with_tag, me=me,
+            account_index=account_index, phone_number=phone_number, is_env_ad_match=is_env_ad_match,
+            min_delay=min_delay, max_delay=max_delay, parsed_topics=parsed_topics
+        )
 
-    
-    # Pre-compute total number of targets (groups + topics)
-    try:
-        total_targets = len(group_ids) + (len(topic_links) if topic_links else 0)
-    except Exception:
-        total_targets = len(group_ids)
+    @property
+    def total_targets(self) -> int:
+        return len(self.group_ids) + len(self.topic_links)
+
+    def target_key(self, idx: int) -> str:
+        """Stable id of target #idx for the send ledger: the group id, or the topic link."""
+        if idx < len(self.group_ids):
+            return str(self.group_ids[idx])
+        return self.topic_links[idx - len(self.group_ids)]
+
+    async def send_target(self, client, idx: int):
+        """
+        Send to target #idx (0-based over groups, then topics).
+
+        Returns None when the target was skipped (unparseable topic link), otherwise the
+        number of extra seconds to wait before the next target (FloodWait), usually 0.
+        """
+        if idx < len(self.group_ids):
+            return await self._send_group(client, idx + 1, self.group_ids[idx])
+        return await self._send_topic(client, idx + 1, self.topic_links[idx - len(self.group_ids)])
 
-    async def log_and_metrics(dst_ent, dst_id, public_link, status_text, fail_reason, sent_post_link=None, *, group_idx=None, total_targets=None):
+    async def _log_and_metrics(self, dst_ent, dst_id, public_link, status_text, fail_reason, sent_post_link=None, *, group_idx=None):
         gname = display_name(dst_ent) if dst_ent else "—"
-        total_sent_local = None
+        total_targets = self.total_targets
 
-        # Metrics and CSV logging (unchanged structure)
+        # Metrics: one keyed fact row per successful send; the admin CSV is rebuilt from it on export
         try:
-            add_metric(user_id, session_id, int(dst_id) if dst_id is not None else 0, status_text == "success", is_env_ad_match)
-            bump_counters(user_id, session_id, sent=(status_text == "success"), failed=(status_text != "success"))
-            try:
-                total_sent_local, _env_dummy = get_user_counters(user_id)
-            except Exception:
-                total_sent_local = None
-            append_admin_log_row(
-                user_id=user_id,
-                session_id=session_id,
-                status=status_text,
-                fail_reason=(fail_reason or "—"),
-                from_user=display_name(me),
-                group_name=gname,
-                group_id=int(dst_id) if dst_id is not None else 0,
-                public_link=public_link,
-                campaign_link=source_link
+            if status_text == "success":
+                add_metric(
+                    self.user_id, datetime.utcnow().isoformat(), getattr(self.me, "username", None) or "", display_name(self.me),
+                    gname, int(dst_id) if dst_id is not None else 0, public_link, self.source_link, self.is_env_ad_match,
+                    group_username=getattr(dst_ent, "username", None), group_link=_fallback_group_link(dst_ent)
+                )
+                bump_counters(self.user_id, env_ad=bool(self.is_env_ad_match))
+        except Exception:
+            # metrics failures must not stop the campaign loop
+            pass
+
+        # Live log: the campaign's status message is edited periodically with these counts
+        try:
+            live_digest(self.log_bot, self.user_id, self.session_id).record(
+                group_idx or 0, total_targets, status_text == "success", gname, fail_reason,
+                account=f"#{self.account_index} {self.phone_number or ''}".strip()
             )
         except Exception:
-            # metrics / CSV failures must not stop the campaign loop
             pass
+        if not live_log_detail(self.user_id):
+            return
 
-        # Human readable live log line with extended info
+        # Opt-in: human readable live log line per send with extended info
+        try:
+            total_sent_local, _env_dummy = get_user_counters(self.user_id)
+        except Exception:
+            total_sent_local = None
         try:
             date_str = now_local().strftime("%d %B %Y")
             time_str = now_local().strftime("%I:%M %p")
@@ -272,48 +350,47 @@ async def forward_to_groups(
             else:
                 group_idx_str = "—"
 
-            # which account index (#1, #2, ...)
-            account_idx_str = f"#{account_index}" if 'account_index' in locals() or 'account_index' in globals() else "—"
-            phone_str = phone_number if ('phone_number' in locals() or 'phone_number' in globals()) else "—"
+            account_idx_str = f"#{self.account_index}"
+            phone_str = self.phone_number or "—"
             total_sent_str = str(total_sent_local) if total_sent_local is not None else "—"
 
             plain = (
-                f"message sent | {gname} {date_str} | {time_str} | {source_link} | {public_link} | {post_link_str} | "
+                f"message sent | {gname} {date_str} | {time_str} | {self.source_link} | {public_link} | {post_link_str} | "
                 f"@{ENV.MAIN_BOT_USERNAME} | {group_idx_str} | {account_idx_str} | {phone_str} | "
                 f"{status_text} | {fail_reason} | {total_sent_str}"
             )
-            await send_live_log(log_bot, user_id, plain)
+            await send_live_log(self.log_bot, self.user_id, plain)
         except Exception:
             # Logging failures must not stop the campaign loop
             pass
 
-    # 1) groups
-    for idx_group, gid in enumerate(group_ids, start=1):
+    async def _send_group(self, client, idx_group: int, gid) -> int:
+        src, source_msg_id = self.src, self.source_msg_id
         status_text = "success"
         fail_reason = "—"
         glink = "—"
+        post_link = "—"
         dst_ent = None
+        flood_wait = 0
+        self.last_error = None
         try:
-            await ensure_trial_profile(client, user_id)
+            await ensure_trial_profile(client, self.user_id)
             dst = await client.get_input_entity(gid)
-            dst_ent = await client.get_entity(gid)
-            # get original message once per group send
-            orig = await client.get_messages(src, ids=source_msg_id)
+            dst_ent = cached_entity(self.session_id, gid) or await client.get_entity(gid)
+            # source post, prepared once per cycle (and shared by campaigns posting the same content)
+            orig = await prepared_source(client, self.session_id, src, source_msg_id)
             if orig is None:
                 raise RuntimeError("Source message not found")
             # when with_tag=True keep original forward tag; otherwise copy to hide sender
-            if with_tag:
-                fwd = await client.forward_messages(dst, source_msg_id, from_peer=src)
+            if self.with_tag:
+                # albums: all parts in one ForwardMessagesRequest
+                fwd = await client.forward_messages(dst, orig.album_ids or source_msg_id, from_peer=src)
                 if isinstance(fwd, (list, tuple)) and fwd:
                     fwd = fwd[0]
             else:
-                # try to hide tag for plain-text posts, but keep content/buttons the same
-                if getattr(orig, "message", None) and not getattr(orig, "media", None):
-                    fwd = await client.send_message(dst, orig.message, buttons=getattr(orig, "reply_markup", None))
-                else:
-                    fwd = await client.send_message(dst, orig, buttons=getattr(orig, "reply_markup", None))
+                # copy: same text, formatting, media and buttons, without the forward tag
+                fwd = await send_prepared(client, dst, orig)
             fwd_msg_id = _extract_forwarded_msg_id(fwd)
-            post_link = "—"
             try:
                 if dst_ent is not None and fwd_msg_id:
                     post_link = fmt_msg_public_link(dst_ent, fwd_msg_id)
@@ -329,49 +406,54 @@ async def forward_to_groups(
                 glink = _fallback_group_link(dst_ent)
             if glink == "—" and dst_ent is not None and fwd_msg_id:
                 glink = fmt_msg_public_link(dst_ent, fwd_msg_id)
-        except errors.ChatForwardsRestrictedError:
+        except errors.ChatForwardsRestrictedError as e:
+            self.last_error = e
             status_text = "failed"
             fail_reason = "Forward restricted by source"
         except errors.ForbiddenError as fe:
+            self.last_error = fe
             status_text = "failed"
             fail_reason = f"Forbidden: {fe}"
-        except errors.MessageIdInvalidError:
+        except errors.MessageIdInvalidError as e:
+            self.last_error = e
             status_text = "failed"
             fail_reason = "Message not found"
         except errors.FloodWaitError as fw:
+            self.last_error = fw
             status_text = "failed"
             fail_reason = f"Flood wait {fw.seconds}s"
-            await asyncio.sleep(fw.seconds + 1)
+            flood_wait = fw.seconds + 1
         except Exception as ge:
+            self.last_error = ge
             status_text = "failed"
             fail_reason = f"{ge}"
-        await log_and_metrics(dst_ent, gid, glink, status_text, fail_reason, sent_post_link=post_link, group_idx=idx_group, total_targets=total_targets)
-        await _sleep_between_targets()
+        await self._log_and_metrics(dst_ent, gid, glink, status_text, fail_reason, sent_post_link=post_link, group_idx=idx_group)
+        return flood_wait
 
-    # 2) topics
-    for offset_topic, ln in enumerate(topic_links, start=1):
-        current_idx = len(group_ids) + offset_topic
-        parsed = _parse_topic_link(ln)
+    async def _send_topic(self, client, current_idx: int, ln):
+        src, source_msg_id = self.src, self.source_msg_id
+        parsed = self.parsed_topics.get(ln) or _parse_topic_link(ln)
         if not parsed:
-            continue
+            return None
         peer, top_id = parsed
         status_text = "success"
         fail_reason = "—"
         dst_ent = None
         topic_link = ln
         post_link = "—"
+        flood_wait = 0
+        self.last_error = None
         try:
-            dst_ent = await client.get_entity(peer)
-            # get original message once per topic send
-            orig = await client.get_messages(src, ids=source_msg_id)
+            dst_ent = cached_entity(self.session_id, peer) or await client.get_entity(peer)
+            orig = await prepared_source(client, self.session_id, src, source_msg_id)
             if orig is None:
                 raise RuntimeError("Source message not found")
             # send inside the specific topic using top_msg_id when with_tag=True
-            if with_tag:
+            if self.with_tag:
                 fwd = await client(functions.messages.ForwardMessagesRequest(
                     from_peer=src,
-                    id=[source_msg_id],
-                    to_peer=peer,
+                    id=orig.album_ids or [source_msg_id],
+                    to_peer=dst_ent,
                     top_msg_id=top_id,
                     drop_author=False,
                     drop_media_captions=False
@@ -379,7 +461,7 @@ async def forward_to_groups(
                 if isinstance(fwd, (list, tuple)) and fwd:
                     fwd = fwd[0]
             else:
-                fwd = await client.send_message(peer, orig, reply_to=top_id)
+                fwd = await send_prepared(client, dst_ent, orig, reply_to=top_id)
             # Build exact forum-post link: /<topic_id>/<message_id>
             try:
                 fwd_msg_id = _extract_forwarded_msg_id(fwd)
@@ -387,16 +469,19 @@ async def forward_to_groups(
                     post_link = fmt_topic_msg_public_link(dst_ent, top_id, fwd_msg_id)
             except Exception:
                 post_link = "—"
-        except errors.ChatForwardsRestrictedError:
+        except errors.ChatForwardsRestrictedError as e:
+            self.last_error = e
             status_text = "failed"
             fail_reason = "Forward restricted by source"
         except errors.FloodWaitError as fw:
+            self.last_error = fw
             status_text = "failed"
             fail_reason = f"Flood wait {fw.seconds}s"
-            await asyncio.sleep(fw.seconds + 1)
+            flood_wait = fw.seconds + 1
         except Exception as ge:
+            self.last_error = ge
             status_text = "failed"
             fail_reason = f"{ge}"
         dst_id = getattr(dst_ent, "id", None) if dst_ent is not None else None
-        await log_and_metrics(dst_ent, dst_id, topic_link, status_text, fail_reason, sent_post_link=post_link, group_idx=current_idx, total_targets=total_targets)
-        await _sleep_between_targets()
+        await self._log_and_metrics(dst_ent, dst_id, topic_link, status_text, fail_reason, sent_post_link=post_link, group_idx=current_idx)
+        return flood_wait
@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from telethon import TelegramClient
+from ..core.config import ENV
+
+# Process-wide caps on MTProto egress: concurrent in-flight requests and concurrent connects,
+# with separate budgets for interactive clients (login, pickers, account actions) and background
+# ones (campaign senders). Campaigns queue behind their own budget, so a burst of them never
+# delays a user tapping through a picker. Queueing time is recorded per budget.
+INTERACTIVE, BACKGROUND = "interactive", "background"
+
+# task holding a slot: its nested calls (connect -> GetState, ...) reuse the slot; tasks spawned
+# from inside one (the update loop started by connect) inherit the var but are governed again
+_INSIDE = contextvars.ContextVar("egress_inside", default=None)
+# (task, egress): a user-facing action on a background client (same-task only, like _INSIDE)
+_OVERRIDE = contextvars.ContextVar("egress_override", default=None)
+
+
+class _Budget:
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.sem = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.total = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=500)
+
+    def stats(self) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "total": self.total,
+            "timeouts": self.timeouts,
+            "wait_avg_s": (sum(waits) / len(waits)) if waits else 0.0,
+            "wait_p95_s": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "wait_max_s": waits[-1] if waits else 0.0,
+        }
+
+
+BUDGETS = {
+    (INTERACTIVE, "request"): _Budget(ENV.EGRESS_INTERACTIVE_REQUESTS),
+    (BACKGROUND, "request"): _Budget(ENV.EGRESS_BACKGROUND_REQUESTS),
+    (INTERACTIVE, "connect"): _Budget(ENV.EGRESS_INTERACTIVE_CONNECTS),
+    (BACKGROUND, "connect"): _Budget(ENV.EGRESS_BACKGROUND_CONNECTS),
+}
+
+
+@contextmanager
+def interactive_egress():
+    """Requests of the current task go through the interactive budgets, whatever client they use."""
+    token = _OVERRIDE.set((asyncio.current_task(), INTERACTIVE))
+    try:
+        yield
+    finally:
+        _OVERRIDE.reset(token)
+
+
+def _egress_of(client) -> str:
+    hit = _OVERRIDE.get()
+    if hit is not None and hit[0] is asyncio.current_task():
+        return hit[1]
+    return client.egress
+
+
+@asynccontextmanager
+async def egress_slot(egress: str, kind: str = "request"):
+    task = asyncio.current_task()
+    if task is not None and _INSIDE.get() is task:
+        yield
+        return
+    b = BUDGETS[(egress, kind)]
+    t = time.monotonic()
+    b.waiting += 1
+    try:
+        await b.sem.acquire()
+    finally:
+        b.waiting -= 1
+    b.waits.append(time.monotonic() - t)
+    b.in_flight += 1
+    b.total += 1
+    token = _INSIDE.set(task)
+    try:
+        yield
+    except (asyncio.TimeoutError, TimeoutError):
+        b.timeouts += 1
+        raise
+    finally:
+        _INSIDE.reset(token)
+        b.in_flight -= 1
+        b.sem.release()
+
+
+class GovernedClient(TelegramClient):
+    """TelegramClient whose requests and connects go through the egress budgets of its class."""
+
+    def __init__(self, *args, egress: str = INTERACTIVE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.egress = egress
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        async with egress_slot(_egress_of(self)):
+            return await super().__call__(request, ordered=ordered, flood_sleep_threshold=flood_sleep_threshold)
+
+    async def connect(self):
+        async with egress_slot(_egress_of(self), "connect"):
+            return await super().connect()
+
+
+def egress_stats() -> dict:
+    """{"interactive request": {...}, ...} for this process."""
+    return {f"{egress} {kind}": b.stats() for (egress, kind), b in BUDGETS.items()}
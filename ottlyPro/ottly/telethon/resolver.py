@@ -0,0 +1,78 @@
+import time
+from telethon import functions, types, utils
+
+# Full entities of campaign targets per account, so sends don't call get_entity() one by one.
+# Missing peers are fetched in chunks of CHUNK ids per GetChannels/GetChats request.
+RESOLVE_TTL_S = 6 * 3600
+CHUNK = 100
+
+# (session_id, key) -> (fetched_at, entity); key is the bare id or the lower-cased username
+ENTITIES: dict = {}
+
+
+def _key(peer):
+    if isinstance(peer, int):
+        return utils.resolve_id(peer)[0]
+    return str(peer).strip().lstrip("@").lower()
+
+
+def cached_entity(session_id: int, peer):
+    hit = ENTITIES.get((session_id, _key(peer)))
+    return hit[1] if hit else None
+
+
+def prime(session_id: int, entities):
+    """Store entities we already hold (e.g. from iter_dialogs) so they are not fetched again."""
+    now = time.time()
+    for ent in entities:
+        if ent is not None and getattr(ent, "id", None) is not None:
+            ENTITIES[(session_id, ent.id)] = (now, ent)
+
+
+async def resolve_bulk(client, session_id: int, peers, *, fresh: bool = False) -> dict:
+    """
+    peer -> entity for every peer that could be resolved. Peers are group ids, marked ids or
+    usernames; usernames are resolved once and then served from the cache like ids.
+    fresh=True re-fetches even cached peers (used when their rights may have changed).
+    """
+    now = time.time()
+    out = {}
+    wanted: dict = {}  # (is_channel, id) -> peers
+    channels: dict = {}  # id -> InputChannel
+    chats = []
+    for peer in peers:
+        hit = None if fresh else ENTITIES.get((session_id, _key(peer)))
+        if hit and now - hit[0] < RESOLVE_TTL_S:
+            out[peer] = hit[1]
+            continue
+        try:
+            ip = await client.get_input_entity(peer)
+        except Exception:
+            continue
+        if isinstance(ip, types.InputPeerChannel):
+            channels[ip.channel_id] = types.InputChannel(ip.channel_id, ip.access_hash)
+            wanted.setdefault((True, ip.channel_id), []).append(peer)
+        elif isinstance(ip, types.InputPeerChat):
+            if (False, ip.chat_id) not in wanted:
+                chats.append(ip.chat_id)
+            wanted.setdefault((False, ip.chat_id), []).append(peer)
+    ents = []
+    ids = list(channels.values())
+    for i in range(0, len(ids), CHUNK):
+        try:
+            ents.extend((await client(functions.channels.GetChannelsRequest(ids[i:i + CHUNK]))).chats)
+        except Exception:
+            pass
+    for i in range(0, len(chats), CHUNK):
+        try:
+            ents.extend((await client(functions.messages.GetChatsRequest(chats[i:i + CHUNK]))).chats)
+        except Exception:
+            pass
+    for ent in ents:
+        is_channel = isinstance(ent, (types.Channel, types.ChannelForbidden))
+        ENTITIES[(session_id, ent.id)] = (now, ent)
+        for peer in wanted.get((is_channel, ent.id), ()):
+            ENTITIES[(session_id, _key(peer))] = (now, ent)
+            out[peer] = ent
+    return out
+
@@ -1,16 +1,114 @@
 import os
 import re
 from ..core.config import ENV
+from ..core.repo import (
+    list_session_paths, get_stored_session, stored_session_stamp, list_stored_sessions,
+    put_stored_sessions, delete_stored_session,
+)
+
+# Session store. Session strings are cached in memory by session path (the key the sessions table
+# keeps) and revalidated before use: against the file's mtime/size with ENV.SESSION_STORE "files",
+# against the row's updated_at with "sqlite" (session_store table, one transaction per write, the
+# per-account files are imported the first time they are read). File writes go through a temp
+# file and os.replace, so a crash never leaves a half-written session behind.
+_CACHE: dict[str, tuple] = {}  # path -> (stamp, session string)
+
+
+def _sqlite() -> bool:
+    return ENV.SESSION_STORE == "sqlite"
+
+
+def _file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_file(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
 
 def telethon_session_filepath(user_id:int, phone:str)->str:
     slug = re.sub(r"[^0-9+]", "", phone)
     return os.path.join(ENV.SESSIONS_DIR, f"{user_id}_{slug}.session")
 
 def write_string_session(path:str, session_str:str):
+    if _sqlite():
+        _CACHE[path] = (put_stored_sessions([(path, session_str)]), session_str)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         f.write(session_str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _CACHE[path] = (_file_stamp(path), session_str)
 
 def read_string_session(path:str)->str:
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read().strip()
+    cached = _CACHE.get(path)
+    if not _sqlite():
+        stamp = _file_stamp(path)
+        if cached and stamp is not None and cached[0] == stamp:
+            return cached[1]
+        sess = _read_file(path)
+        _CACHE[path] = (stamp, sess)
+        return sess
+    if cached and stored_session_stamp(path) == cached[0]:
+        return cached[1]
+    row = get_stored_session(path)
+    if row is None:
+        sess = _read_file(path)  # not imported yet
+        write_string_session(path, sess)
+        return sess
+    _CACHE[path] = (row[1], row[0])
+    return row[0]
+
+def delete_session(path:str):
+    """Forget an account's session: cache, store row and file."""
+    _CACHE.pop(path, None)
+    if _sqlite():
+        delete_stored_session(path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def preload_sessions() -> int:
+    """Startup: load every account's session into the cache (sqlite: import the files not stored yet)."""
+    paths = list_session_paths()
+    if _sqlite():
+        stored = {p for p, _s, _u in list_stored_sessions()}
+        missing = []
+        for p in paths:
+            if p not in stored:
+                try:
+                    missing.append((p, _read_file(p)))
+                except OSError:
+                    pass
+        if missing:
+            put_stored_sessions(missing)
+        for p, sess, stamp in list_stored_sessions():
+            _CACHE[p] = (stamp, sess)
+        return len(paths)
+    for p in paths:
+        try:
+            read_string_session(p)
+        except OSError:
+            pass
+    return len(paths)
+
+def snapshot_sessions() -> dict[str, str]:
+    """{path: session string} of every known account, for backups (no directory walk)."""
+    if _sqlite():
+        return {p: sess for p, sess, _u in list_stored_sessions()}
+    out = {}
+    for p in list_session_paths():
+        try:
+            out[p] = read_string_session(p)
+        except OSError:
+            pass
+    return out
@@ -1,12 +1,13 @@
+import html
 from functools import wraps
 from datetime import datetime, timedelta
-from aiogram import Router, F, Bot
-from aiogram.client.bot import DefaultBotProperties
+from aiogram import Router, F
 from aiogram.enums import ParseMode
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from ..core.config import ENV
 from ..core.db import db
+from .outbound import build_bot, outbound_priority, PRIO_BROADCAST, outbound_stats
 from .keyboards import admin_main_kb, admin_access_kb, ban_manage_kb, stats_quick_actions_kb
 from ..features.metrics import global_totals
 from ..core.timeutil import format_local_dt, format_duration
@@ -16,7 +17,10 @@ from ..core.repo import (
     add_admin, remove_admin, user_by_username, set_ban, unban, set_premium_months, premium_until
 )
 from .middleware import set_downtime, downtime_active, downtime_reason, downtime_started_utc
-from ..features.campaigns import RUNNING_TASKS
+from ..features.campaigns import running_campaigns
+from ..features.send_plan import invalidate_send_plan
+from ..features.auto_schedule import opening_load
+from ..features.target_health import health_report
 
 rt_admin = Router()
 ADMIN_BROADCAST_MODE = {}
@@ -40,18 +44,19 @@ def clear_admin_states():
     ADMIN_BROADCAST_MODE.clear()
 
 async def broadcast_all_main(text: str) -> tuple[int,int]:
-    main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
     con = db(); cur = con.cursor()
     cur.execute("SELECT user_id FROM users")
     ids = [r[0] for r in cur.fetchall()]
     con.close()
     sent = 0; fail = 0
-    for uid in ids:
-        try:
-            await main_bot.send_message(uid, text, disable_web_page_preview=True, parse_mode=ParseMode.HTML)
-            sent += 1
-        except Exception:
-            fail += 1
+    with outbound_priority(PRIO_BROADCAST):
+        for uid in ids:
+            try:
+                await main_bot.send_message(uid, text, disable_web_page_preview=True, parse_mode=ParseMode.HTML)
+                sent += 1
+            except Exception:
+                fail += 1
     return sent, fail
 
 @rt_admin.message(CommandStart())
@@ -72,7 +77,7 @@ async def admin_stats(m: Message):
     active_users = cur.execute("SELECT COUNT(DISTINCT user_id) FROM sessions WHERE is_active=1").fetchone()[0]
     con.close()
 
-    ads_running = sum(1 for t in RUNNING_TASKS.values() if t and not t.cancelled() and not t.done())
+    ads_running = len(running_campaigns())
     inactive_users = max(0, total_users - active_users)
     sys_online = "Online" if not downtime_active() else "Offline"
 
@@ -302,6 +307,138 @@ async def milestone_check_prompt(m: Message):
     clear_admin_states()
     await m.answer("Send <code>UserId</code> to view milestone status & total paid.")
 
+@rt_admin.message(F.text == "🕒 Auto Mode Load")
+@owner_only
+async def auto_mode_load(m: Message):
+    clear_admin_states()
+    # one entry per running campaign, so a user with 3 accounts weighs 3
+    uids = [uid for uid, _sid in running_campaigns()]
+    load = opening_load(uids)
+    if not load:
+        return await m.answer("No running campaign uses Auto Mode.")
+    lines = [f"{label}: <b>{n}</b> campaign(s) open" for label, n in load[:15]]
+    await m.answer(
+        "🕒 <b>Auto Mode openings</b> (30-min buckets, busiest first)\n"
+        + "\n".join(lines)
+        + f"\n\nOpenings are staggered over {ENV.AUTO_OPEN_STAGGER_SEC}s per campaign."
+    )
+
+@rt_admin.message(F.text == "📮 Bot Send Queue")
+@owner_only
+async def bot_send_queue(m: Message):
+    clear_admin_states()
+    stats = outbound_stats()
+    if not stats:
+        return await m.answer("No outbound queue yet.")
+    lines = []
+    for name, st in stats.items():
+        d, w = st["depth"], st["wait"]
+        lines.append(
+            f"<b>{name}</b> — sent {st['sent']} | 429s {st['retry_after']}"
+            + (f" | paused {st['paused_s']:.0f}s" if st["paused_s"] else "")
+        )
+        for cls in ("interactive", "logs", "broadcast"):
+            lines.append(f"  {cls}: queued {d[cls]} | wait avg {w[cls]['avg_s']:.2f}s max {w[cls]['max_s']:.2f}s")
+    await m.answer("📮 <b>Outbound Bot API queues</b>\n" + "\n".join(lines))
+
+@rt_admin.message(F.text == "🩺 Target Health")
+@owner_only
+async def target_health_report(m: Message):
+    clear_admin_states()
+    rows = health_report()
+    if not rows:
+        return await m.answer("No campaign has run since the last restart.")
+    total_skip = 0
+    total_s = 0.0
+    lines = []
+    for sid, quarantined, skipped, reclaimed_s in rows:
+        total_skip += skipped
+        total_s += reclaimed_s
+        if not quarantined and not skipped:
+            continue
+        by_reason = ", ".join(f"{r} {n}" for r, n in sorted(quarantined.items())) or "none"
+        lines.append(f"• session {sid}: quarantined {sum(quarantined.values())} ({by_reason}) | skipped {skipped} | saved {reclaimed_s / 60:.0f}m")
+    await m.answer(
+        "🩺 <b>Target health</b>\n"
+        f"Skipped sends: <b>{total_skip}</b> | cycle time reclaimed: <b>{total_s / 3600:.1f}h</b>\n\n"
+        + ("\n".join(lines[:40]) or "No quarantined targets.")
+    )
+
+@rt_admin.message(F.text == "⚖️ Fair Share")
+@owner_only
+async def fair_share_report(m: Message):
+    clear_admin_states()
+    from ..features.scheduler import SCHEDULER
+    st = SCHEDULER.stats()
+    tiers = st["tiers"]
+    if not tiers:
+        return await m.answer("No campaign step has run in this process yet.")
+    lines = [
+        f"• {tier} (weight {t['weight']:g}): lag avg {t['lag_avg_s']:.2f}s p95 {t['lag_p95_s']:.2f}s | {t['steps_per_min']:.1f} steps/min"
+        for tier, t in sorted(tiers.items())
+    ]
+    await m.answer(
+        "⚖️ <b>Scheduler fair share</b> (this process)\n"
+        f"Workers busy {st['running']}/{st['workers']} | ready queue {st['ready']} | oldest overdue {st['oldest_overdue_s']:.1f}s\n\n"
+        + "\n".join(lines)
+    )
+
+@rt_admin.message(F.text == "🐢 Account Pacing")
+@owner_only
+async def account_pacing_report(m: Message):
+    clear_admin_states()
+    from ..core.repo import list_session_pacing
+    rows = list_session_pacing()
+    if not rows:
+        return await m.answer("No account has a learned pace yet.")
+    lines = [
+        f"• {phone or f'session {sid}'}: <b>{delay:.0f}s</b> between targets | ✅ {ok} | floods {floods}"
+        + (f" (last {last[:16].replace('T', ' ')} UTC)" if last else "")
+        for sid, phone, delay, ok, floods, last, _upd in rows[:40]
+    ]
+    await m.answer("🐢 <b>Learned pacing per account</b> (slowest first)\n" + "\n".join(lines))
+
+@rt_admin.message(F.text == "🚦 MTProto Egress")
+@owner_only
+async def mtproto_egress_report(m: Message):
+    clear_admin_states()
+    from ..telethon.governor import egress_stats
+    lines = [
+        f"• {name}: {st['in_flight']}/{st['limit']} in flight, {st['waiting']} queued | "
+        f"wait avg {st['wait_avg_s'] * 1000:.0f} ms, p95 {st['wait_p95_s'] * 1000:.0f} ms, "
+        f"max {st['wait_max_s'] * 1000:.0f} ms | {st['total']} total, {st['timeouts']} timeouts"
+        for name, st in egress_stats().items()
+    ]
+    await m.answer("🚦 <b>MTProto egress</b> (this process)\n" + "\n".join(lines))
+
+@rt_admin.message(F.text == "🧵 Campaign Workers")
+@owner_only
+async def campaign_workers_report(m: Message):
+    clear_admin_states()
+    from ..features.workers import worker_count, worker_report
+    from ..features.leases import leases_enabled
+    from ..core.repo import live_leases
+    n = worker_count()
+    if not n:
+        from ..features import supervisor
+        states = supervisor.state_counts()
+        text = (f"Campaign workers are off: {len(running_campaigns())} campaign(s) run in the bot process.\n"
+                + " | ".join(f"{st}: {c}" for st, c in sorted(states.items())))
+        failures = [f"• {r.key[0]}/{r.key[1]} {r.state}, restarts {r.restarts}: {html.escape(r.last_error or '')[:120]}"
+                    for r in supervisor.troubled()]
+        if failures:
+            text += "\n\n<b>Recent failures</b>\n" + "\n".join(failures)
+    else:
+        lines = [f"• worker {shard}: pid {pid} | {'up' if alive else '⚠️ no heartbeat'} | {count} campaign(s)"
+                 for shard, pid, alive, count in worker_report()]
+        text = f"🧵 <b>Campaign workers</b> ({n} configured)\n" + ("\n".join(lines) or "No worker has reported yet.")
+    if leases_enabled():
+        owners = {}
+        for owner in live_leases().values():
+            owners[owner] = owners.get(owner, 0) + 1
+        text += "\n\n<b>Campaign leases</b>\n" + ("\n".join(f"• {o}: {c}" for o, c in sorted(owners.items())) or "none")
+    await m.answer(text)
+
 @rt_admin.message()
 @owner_only
 async def admin_free_text(m: Message):
@@ -346,7 +483,7 @@ async def admin_free_text(m: Message):
                 until_iso = (datetime.utcnow() + timedelta(days=days)).isoformat()
             set_ban(uid, reason, btype, until_iso)
             try:
-                main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+                main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
                 ban_date = format_local_dt(datetime.utcnow().isoformat())
                 await main_bot.send_message(
                     uid,
@@ -382,6 +519,7 @@ async def admin_free_text(m: Message):
             uid_s, months_s, price_s = [p.strip() for p in txt.split("|")]
             uid = int(uid_s); months = int(months_s); price = float(price_s)
             set_premium_months(uid, months, price)
+            invalidate_send_plan(uid)
             valid_till = format_local_dt(premium_until(uid))
             fname = get_user_field(uid, "first_name", "there") or "there"
             price_str = int(price)
@@ -397,7 +535,7 @@ async def admin_free_text(m: Message):
                 f"<b>Valid till:</b> <b>{valid_till}</b>"
             )
             try:
-                main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+                main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
                 await main_bot.send_message(uid, receipt)
             except Exception:
                 pass
@@ -437,7 +575,7 @@ async def admin_free_text(m: Message):
                 f"Removed on: {dt}"
             )
             try:
-                main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+                main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
                 await main_bot.send_message(uid, msg)
             except Exception:
                 pass
@@ -494,7 +632,7 @@ async def admin_free_text(m: Message):
         name = get_user_field(uid, "first_name", "User") or "User"
         confirmation = payment_confirmation_text(name, label, amount, mode, txn)
         try:
-            main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+            main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
             await main_bot.send_message(uid, confirmation)
         except Exception:
             pass
@@ -19,6 +19,8 @@ def kb_ads_manager_menu() -> InlineKeyboardMarkup:
         InlineKeyboardButton(text="🔴 Stop All CAMP RUN", callback_data="ads_stop_all")
     )
     kb.row(InlineKeyboardButton(text="🕒 CAMP RUN Auto Mode", callback_data="pubads_auto"))
+    kb.row(InlineKeyboardButton(text="⏱️ Per-group interval", callback_data="pgi_menu"))
+    kb.row(InlineKeyboardButton(text="🧾 Live log detail ON/OFF", callback_data="livelog_detail"))
     kb.row(InlineKeyboardButton(text="❓ How to Use CAMP RUN", url="https://t.me/CamprunsAdminss_bot?start=help"))
     kb.row(InlineKeyboardButton(text="🔙 Back", callback_data="back_main"))
     return kb.as_markup()
@@ -68,6 +70,10 @@ def admin_main_kb() -> ReplyKeyboardMarkup:
             [KeyboardButton(text="5) Total Transcations"), KeyboardButton(text="6) Downtime")],
             [KeyboardButton(text="7) Remove Subscription"), KeyboardButton(text="📣 Broadcast")],
             [KeyboardButton(text="💸 Give Payment to User"), KeyboardButton(text="🔎 Users Milestone Check")],
+            [KeyboardButton(text="🕒 Auto Mode Load"), KeyboardButton(text="📮 Bot Send Queue")],
+            [KeyboardButton(text="🩺 Target Health"), KeyboardButton(text="🧵 Campaign Workers")],
+            [KeyboardButton(text="⚖️ Fair Share"), KeyboardButton(text="🐢 Account Pacing")],
+            [KeyboardButton(text="🚦 MTProto Egress")],
         ],
         resize_keyboard=True
     )
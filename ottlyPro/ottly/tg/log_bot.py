@@ -1,7 +1,8 @@
 from aiogram import Router
 from aiogram.filters import CommandStart
 from aiogram.types import Message
-from ..core.repo import ensure_user, upsert_live_log_sub
+from ..core.repo import ensure_user
+from .logging_svc import set_live_log_chat
 
 rt_log = Router()
 
@@ -12,7 +13,7 @@ async def log_start(m: Message):
     We store their chat_id keyed by user_id and then only their logs go here.
     """
     ensure_user(m.from_user.id, m.from_user.first_name, m.from_user.username)
-    upsert_live_log_sub(m.from_user.id, m.chat.id)
+    set_live_log_chat(m.from_user.id, m.chat.id)
     await m.answer(
         "📈 CAMP RUN live logging enabled for your campaigns.\n\n"
         "You will receive detailed logs for each ad sent while your campaigns are running.\n"
@@ -23,5 +24,5 @@ async def log_start(m: Message):
 async def log_any(m: Message):
     # Any message also refreshes the mapping (handy if user loses history)
     ensure_user(m.from_user.id, m.from_user.first_name, m.from_user.username)
-    upsert_live_log_sub(m.from_user.id, m.chat.id)
+    set_live_log_chat(m.from_user.id, m.chat.id)
     await m.answer("✅ Log channel linked. You'll see CAMP RUN live logs for your own campaigns here.")
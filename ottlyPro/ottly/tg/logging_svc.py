@@ -1,7 +1,17 @@
-from ..core.timeutil import ts_log
-from ..core.repo import get_live_log_chat
+import asyncio
+import html
+from collections import deque
+from ..core.config import ENV
+from ..core.timeutil import ts_log, now_local
+from ..core.repo import get_live_log_chat, upsert_live_log_sub, get_cfg, set_cfg
 from ..features.reporter import append_admin_event_row
 from aiogram import Bot
+from .outbound import outbound_priority, set_task_priority, PRIO_LOGS
+
+# user_id -> live-log chat id (None = not subscribed); filled lazily, updated by set_live_log_chat()
+_LIVE_CHATS: dict[int, int | None] = {}
+# user_id -> wants one live-log message per send (config "live_log_detail:{uid}")
+_LIVE_DETAIL: dict[int, bool] = {}
 
 def display_name(ent) -> str:
     name = getattr(ent, "title", None)
@@ -28,13 +38,42 @@ def tme_group_link(group_ent, msg_id:int) -> str:
         gid = gid.lstrip("-")
     return f"https://t.me/c/{gid}/{msg_id}"
 
+def live_log_chat(user_id: int):
+    if user_id not in _LIVE_CHATS:
+        try:
+            _LIVE_CHATS[user_id] = get_live_log_chat(user_id)
+        except Exception:
+            return None
+    return _LIVE_CHATS[user_id]
+
+def set_live_log_chat(user_id: int, chat_id: int):
+    upsert_live_log_sub(user_id, chat_id)
+    _LIVE_CHATS[user_id] = chat_id
+    from ..features.workers import notify_user_changed
+    notify_user_changed(user_id)
+
+def live_log_detail(user_id: int) -> bool:
+    if user_id not in _LIVE_DETAIL:
+        try:
+            _LIVE_DETAIL[user_id] = bool(get_cfg(f"live_log_detail:{user_id}", False))
+        except Exception:
+            return False
+    return _LIVE_DETAIL[user_id]
+
+def set_live_log_detail(user_id: int, on: bool):
+    set_cfg(f"live_log_detail:{user_id}", bool(on))
+    _LIVE_DETAIL[user_id] = bool(on)
+    from ..features.workers import notify_user_changed
+    notify_user_changed(user_id)
+
 async def send_live_log(log_bot: Bot, user_id: int, text: str):
     if not log_bot:
         return
-    chat_id = get_live_log_chat(user_id)
+    chat_id = live_log_chat(user_id)
     if chat_id:
         try:
-            await log_bot.send_message(chat_id, text, disable_web_page_preview=True)
+            with outbound_priority(PRIO_LOGS):
+                await log_bot.send_message(chat_id, text, disable_web_page_preview=True)
         except Exception:
             pass
 
@@ -53,3 +92,117 @@ def fmt_group_log(status:str, username:str, group_name:str, group_id:int, group_
         f'🏷️ <b>Status:</b> {status}\n'
         f'🤖 <i>Powered by @CamprunsMains_bot</i>'
     )
+
+
+# --- Live-log digest: one status message per campaign, edited in place ---
+
+class LiveDigest:
+    """Aggregated live-log state of one (user, session) campaign."""
+
+    def __init__(self, log_bot: Bot, user_id: int, session_id: int):
+        self.log_bot = log_bot
+        self.user_id = user_id
+        self.session_id = session_id
+        self.account = "—"
+        self.cycle = 0
+        self.done = 0
+        self.total = 0
+        self.cycle_ok = 0
+        self.cycle_fail = 0
+        self.ok = 0
+        self.fail = 0
+        self.errors = deque(maxlen=ENV.LIVE_DIGEST_ERRORS)
+        self.message_id = None
+        self.dirty = False
+        self.closed = False
+        self.updated = None
+
+    def record(self, idx: int, total: int, ok: bool, target: str, reason: str, *, account: str = None):
+        if idx == 1 or idx <= self.done:
+            self.cycle += 1
+            self.cycle_ok = self.cycle_fail = 0
+        self.done, self.total = idx, total
+        if account:
+            self.account = account
+        if ok:
+            self.ok += 1
+            self.cycle_ok += 1
+        else:
+            self.fail += 1
+            self.cycle_fail += 1
+            self.errors.append(f"{now_local().strftime('%H:%M')} {target}: {reason}")
+        self.updated = now_local()
+        self.dirty = True
+
+    def render(self) -> str:
+        state = "⏹ Stopped" if self.closed else "▶️ Running"
+        lines = [
+            f"📈 <b>Live status</b> — account {html.escape(self.account)} | {state}",
+            f"🔁 Cycle {self.cycle}: <b>{self.done}/{self.total}</b> "
+            f"(✅ {self.cycle_ok} | ❌ {self.cycle_fail})",
+            f"📊 Total: ✅ <b>{self.ok}</b> | ❌ <b>{self.fail}</b>",
+        ]
+        if self.errors:
+            lines.append("")
+            lines.append("<b>Last errors:</b>")
+            lines.extend(f"• {html.escape(e)}" for e in self.errors)
+        if self.updated:
+            lines.append("")
+            lines.append(f"🕒 Updated {self.updated.strftime('%d/%m/%Y %H:%M:%S %Z')}")
+        return "\n".join(lines)
+
+    async def flush(self):
+        if not self.dirty or not self.log_bot:
+            return
+        self.dirty = False
+        chat_id = live_log_chat(self.user_id)
+        if not chat_id:
+            return
+        text = self.render()
+        if self.message_id:
+            try:
+                await self.log_bot.edit_message_text(text, chat_id=chat_id, message_id=self.message_id, disable_web_page_preview=True)
+                return
+            except Exception as e:
+                if "not modified" in str(e):
+                    return
+                # message deleted or too old to edit: post a fresh one
+        try:
+            msg = await self.log_bot.send_message(chat_id, text, disable_web_page_preview=True)
+            self.message_id = msg.message_id
+        except Exception:
+            self.dirty = True
+
+
+DIGESTS: dict[tuple[int, int], LiveDigest] = {}
+_DIGEST_TASK = {"task": None}
+
+def live_digest(log_bot: Bot, user_id: int, session_id: int) -> LiveDigest:
+    key = (user_id, session_id)
+    d = DIGESTS.get(key)
+    if d is None or d.closed:
+        d = LiveDigest(log_bot, user_id, session_id)
+        DIGESTS[key] = d
+    task = _DIGEST_TASK["task"]
+    if task is None or task.done():
+        _DIGEST_TASK["task"] = asyncio.create_task(_digest_loop())
+    return d
+
+def close_live_digest(user_id: int, session_id: int):
+    """Mark the campaign's digest as stopped; the loop flushes it one last time and drops it."""
+    d = DIGESTS.get((user_id, session_id))
+    if d is not None:
+        d.closed = True
+        d.dirty = True
+
+async def _digest_loop():
+    set_task_priority(PRIO_LOGS)
+    while True:
+        await asyncio.sleep(ENV.LIVE_DIGEST_EVERY_SEC)
+        for key, d in list(DIGESTS.items()):
+            try:
+                await d.flush()
+            except Exception:
+                pass
+            if d.closed and not d.dirty and DIGESTS.get(key) is d:
+                DIGESTS.pop(key, None)
@@ -1,8 +1,6 @@
 import re
 import asyncio
-from aiogram import Router, F, Bot
-from aiogram.client.bot import DefaultBotProperties
-from aiogram.enums import ParseMode
+from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from telethon.sessions import StringSession
@@ -12,11 +10,13 @@ from ..core.config import ENV
 from ..core.repo import (
     ensure_user,
     list_sessions,
-    upsert_live_log_sub,
     add_session,
     get_session_path,
     premium_active,
 )
+from ..telethon.governor import GovernedClient, INTERACTIVE
+from .logging_svc import set_live_log_chat
+from .outbound import build_bot
 from .keyboards import otp_keyboard, main_menu_kb  # we will not auto-open Ads Manager from main bot
 # (User will tap the inline button that opens ?start=ads so Ads Manager opens exactly once.)
 
@@ -39,7 +39,7 @@ def login_menu_text_kb():
 @rt_login.message(CommandStart())
 async def login_start(m: Message):
     ensure_user(m.from_user.id, m.from_user.first_name, m.from_user.username)
-    upsert_live_log_sub(m.from_user.id, m.chat.id)
+    set_live_log_chat(m.from_user.id, m.chat.id)
     text, kb = login_menu_text_kb()
     await m.answer(text, reply_markup=kb, disable_web_page_preview=True)
 
@@ -106,10 +106,9 @@ async def login_terminate(cq: CallbackQuery):
 @rt_login.callback_query(F.data.startswith("term:"))
 async def do_terminate(cq: CallbackQuery):
     uid = cq.from_user.id
-    from ..features.campaigns import RUNNING_TASKS
+    from ..features.campaigns import stop_campaign_for
     sid = int(cq.data.split(":")[1])
-    t = RUNNING_TASKS.pop((uid, sid), None)
-    if t and not t.cancelled(): t.cancel()
+    stop_campaign_for(uid, sid)
 
     path = get_session_path(sid)
     if path:
@@ -120,8 +119,8 @@ async def do_terminate(cq: CallbackQuery):
             except Exception: pass
             await client.disconnect()
         except Exception: pass
-        import os
-        try: os.remove(path)
+        from ..telethon.sessions import delete_session
+        try: delete_session(path)
         except Exception: pass
 
     from ..core.db import db
@@ -164,7 +163,7 @@ async def login_catch_phone(m: Message):
     phone = m.text.strip()
     st["phone"] = phone
 
-    client = TelegramClient(StringSession(), st["api_id"], st["api_hash"])
+    client = GovernedClient(StringSession(), st["api_id"], st["api_hash"], egress=INTERACTIVE)
     await client.connect()
     try:
         await client.send_code_request(phone)
@@ -306,7 +305,7 @@ async def finalize_login(uid:int, chat_id:int, st:dict, login_bot):
 
     # 1) Send MAIN BOT "Main menu:" once to ensure the persistent Reply Keyboard is visible
     try:
-        main_bot = Bot(ENV.MAIN_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+        main_bot = build_bot(ENV.MAIN_BOT_TOKEN, "main")
         await main_bot.send_message(uid, "Main menu:", reply_markup=main_menu_kb())
     except Exception:
         pass
@@ -1,15 +1,19 @@
 import re
+from datetime import datetime
 from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from ..core.config import ENV
-from ..core.repo import ensure_user, get_user_field, set_user_field, list_sessions, premium_active, premium_until, get_live_log_chat, upsert_live_log_sub
+from ..core.repo import ensure_user, get_user_field, set_user_field, list_sessions, premium_active, premium_until, get_live_log_chat
 from ..core.timeutil import format_local_dt
 from .keyboards import kb_welcome_gating, kb_ads_manager_menu, kb_setup_intervals, main_menu_kb, public_ads_controls_kb
-from ..features.campaigns import count_all_groups_in_session, insert_campaign, build_groups_markup, start_campaign_for, stop_campaign_for, RUNNING_TASKS, create_env_ad_post_and_link
+from ..features.campaigns import count_all_groups_in_session, insert_campaign, build_groups_markup, start_campaign_for, stop_campaign_for, stop_user_campaigns, is_campaign_running, create_env_ad_post_and_link, campaign_next_run, wake_user_campaigns, start_balanced_campaigns
 from ..features.metrics import user_totals_text
+from ..features.send_plan import invalidate_send_plan
+from ..features.auto_schedule import auto_schedule_for, set_auto_mode, parse_windows_text
 from ..telethon.forwards import parse_post_link
 from ..telethon.client import client_from_session_file
+from .logging_svc import set_live_log_chat, live_log_detail, set_live_log_detail
 
 rt_main = Router()
 
@@ -17,64 +21,11 @@ _AUX = {"log_bot": None}
 
 AUTO_MODE_EXPECTING: set[int] = set()
 
-TIME_RANGE_RE = re.compile(r"^\s*\d{1,2}(:\d{2})?\s*(am|pm)\s*-\s*\d{1,2}(:\d{2})?\s*(am|pm)\s*$", re.IGNORECASE)
 
-
-def _mins_to_12h(mins: int) -> str:
-    mins = mins % (24 * 60)
-    h = mins // 60
-    m = mins % 60
-    suffix = "am" if h < 12 else "pm"
-    h12 = h % 12
-    if h12 == 0:
-        h12 = 12
-    return f"{h12}:{m:02d} {suffix}"
-
-
-def _parse_time_range_to_minutes(text: str):
-    txt = (text or "").strip().lower()
-    txt = txt.replace("–", "-")
-    if "-" not in txt:
-        return None
-    left, right = [part.strip() for part in txt.split("-", 1)]
-
-    def _one(side: str):
-        s = side
-        ampm = None
-        if s.endswith("am"):
-            ampm = "am"
-            s = s[:-2].strip()
-        elif s.endswith("pm"):
-            ampm = "pm"
-            s = s[:-2].strip()
-        if ":" in s:
-            hh_str, mm_str = s.split(":", 1)
-        else:
-            hh_str, mm_str = s, "0"
-        try:
-            hh = int(hh_str)
-            mm = int(mm_str)
-        except ValueError:
-            return None
-        if mm < 0 or mm > 59:
-            return None
-        if ampm:
-            if hh < 1 or hh > 12:
-                return None
-            if ampm == "am":
-                hh = 0 if hh == 12 else hh
-            else:
-                hh = 12 if hh == 12 else hh + 12
-        else:
-            if hh < 0 or hh > 23:
-                return None
-        return hh * 60 + mm
-
-    start = _one(left)
-    end = _one(right)
-    if start is None or end is None:
-        return None
-    return start, end
+def _drop_pending_input(uid: int):
+    """The user moved on to another menu or flow: stop waiting for a time window or a per-group interval."""
+    AUTO_MODE_EXPECTING.discard(uid)
+    PGI_STATE.pop(uid, None)
 
 def _premium_mode_blocked(uid: int) -> bool:
     from ..core.repo import get_cfg, premium_active
@@ -130,7 +81,7 @@ async def main_start(m: Message):
     try:
         bot_username = (await m.bot.get_me()).username
         if bot_username and bot_username.lower() == (ENV.LOG_BOT_USERNAME or "").lower():
-            upsert_live_log_sub(m.from_user.id, m.chat.id)
+            set_live_log_chat(m.from_user.id, m.chat.id)
     except Exception:
         pass
 
@@ -169,6 +120,7 @@ async def on_agree_terms(cq: CallbackQuery, bot):
 
 @rt_main.message(F.text == "👤Account")
 async def account_menu(m: Message):
+    _drop_pending_input(m.from_user.id)
     if await _maybe_premium_mode_gate_msg(m):
         return
     uid = m.from_user.id
@@ -205,8 +157,7 @@ async def acc_delete_yes(cq: CallbackQuery):
     from ..core.db import db
     uid = cq.from_user.id
     sid = int(cq.data.split(":")[1])
-    t = RUNNING_TASKS.pop((uid, sid), None)
-    if t and not t.cancelled(): t.cancel()
+    stop_campaign_for(uid, sid)
 
     path = get_session_path(sid)
     if path:
@@ -216,8 +167,8 @@ async def acc_delete_yes(cq: CallbackQuery):
             except Exception: pass
             await client.disconnect()
         except Exception: pass
-        import os
-        try: os.remove(path)
+        from ..telethon.sessions import delete_session
+        try: delete_session(path)
         except Exception: pass
     con = db()
     cur = con.cursor()
@@ -270,6 +221,7 @@ async def prem_ok_main(cq: CallbackQuery):
 
 @rt_main.message(F.text == "📣Ads Manager")
 async def ads_manager(m: Message):
+    _drop_pending_input(m.from_user.id)
     if await _maybe_premium_mode_gate_msg(m):
         return
     await m.answer("🛠️ All ads set up here:", reply_markup=kb_ads_manager_menu())
@@ -304,6 +256,7 @@ async def setup_pick(cq: CallbackQuery):
     uid = cq.from_user.id
     sid = int(cq.data.split(":")[1])
     SETUP_STATE[uid] = {"session_id": sid, "step":"ask_link", "links":[]}
+    _drop_pending_input(uid)
     upsell = ""
     if not premium_active(uid):
         upsell = "\n\n💎 Multiple post link — <b>Premium</b> feature. Upgrade to add multiple posts."
@@ -550,6 +503,8 @@ async def ads_start(cq: CallbackQuery):
     for sid, phone, *_ in sessions:
         kb.row(InlineKeyboardButton(text=phone, callback_data=f"startpick:{sid}"))
     kb.row(InlineKeyboardButton(text="👥 Start for All", callback_data="start_all"))
+    if len(sessions) > 1:
+        kb.row(InlineKeyboardButton(text="⚖️ Start Balanced (split groups)", callback_data="start_balanced"))
     kb.row(InlineKeyboardButton(text="🔙 Back", callback_data="back_ads"))
     try:
         await cq.message.edit_text("Select the account to start:", reply_markup=kb.as_markup())
@@ -561,17 +516,21 @@ async def ads_start(cq: CallbackQuery):
 async def start_pick(cq: CallbackQuery):
     uid = cq.from_user.id
     sid = int(cq.data.split(":")[1])
-    running = (uid, sid) in RUNNING_TASKS and RUNNING_TASKS[(uid,sid)] and not RUNNING_TASKS[(uid,sid)].cancelled() and not RUNNING_TASKS[(uid,sid)].done()
+    running = is_campaign_running(uid, sid)
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
     kb.button(text="📈 Live Status", url=f"https://t.me/{ENV.LOG_BOT_USERNAME}")
     if running: kb.button(text="🔴 Stop", callback_data=f"stop_one:{sid}")
     else: kb.button(text="▶️ Start", callback_data=f"go_one:{sid}")
     kb.row(InlineKeyboardButton(text="🔙 Back", callback_data="back_ads"))
+    text = "Account selected. Choose an action:"
+    next_run = campaign_next_run(uid, sid) if running else None
+    if next_run:
+        text += f"\n⏭️ Next send: {next_run.strftime('%I:%M:%S %p')}"
     try:
-        await cq.message.edit_text("Account selected. Choose an action:", reply_markup=kb.as_markup())
+        await cq.message.edit_text(text, reply_markup=kb.as_markup())
     except:
-        await cq.message.answer("Account selected. Choose an action:", reply_markup=kb.as_markup())
+        await cq.message.answer(text, reply_markup=kb.as_markup())
         try: await cq.message.delete()
         except: pass
     await cq.answer()
@@ -625,7 +584,7 @@ async def start_all(cq: CallbackQuery):
     uid = cq.from_user.id
     started = 0
     for sid, *_ in list_sessions(uid):
-        if (uid, sid) in RUNNING_TASKS and RUNNING_TASKS[(uid,sid)] and not RUNNING_TASKS[(uid,sid)].cancelled() and not RUNNING_TASKS[(uid,sid)].done(): 
+        if is_campaign_running(uid, sid):
             continue
         try:
             await start_campaign_for(cq.bot, None, _AUX["log_bot"], ENV.OWNER_ID, uid, sid, kb_welcome_gating())
@@ -643,15 +602,40 @@ async def start_all(cq: CallbackQuery):
         await cq.message.answer(f"Started {started} account(s).", reply_markup=kb.as_markup())
     await cq.answer()
 
+@rt_main.callback_query(F.data == "start_balanced")
+async def start_balanced(cq: CallbackQuery):
+    uid = cq.from_user.id
+    try:
+        plan = await start_balanced_campaigns(cq.bot, _AUX["log_bot"], ENV.OWNER_ID, uid)
+    except Exception:
+        plan = None
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    kb = InlineKeyboardBuilder()
+    kb.button(text="📈 Live Status", url=f"https://t.me/{ENV.LOG_BOT_USERNAME}")
+    kb.button(text="🔴 Stop All", callback_data="ads_stop_all")
+    kb.row(InlineKeyboardButton(text="🔙 Back", callback_data="back_ads"))
+    if not plan:
+        text = "❌ Nothing to start. Set up a campaign first."
+    elif plan is True:
+        text = "⚖️ Balanced campaign is starting on all your accounts…"
+    else:
+        phones = {sid: phone for sid, phone, *_ in list_sessions(uid)}
+        lines = [f"• {phones.get(sid, sid)}: <b>{n}</b> group(s)" for sid, n in plan.loads().items()]
+        text = (
+            f"⚖️ Balanced campaign started on {len(lines)} account(s).\n"
+            f"Groups: <b>{plan.total_groups}</b> (duplicates removed: {plan.duplicates_removed})\n"
+            + "\n".join(lines)
+        )
+    try:
+        await cq.message.edit_text(text, reply_markup=kb.as_markup())
+    except:
+        await cq.message.answer(text, reply_markup=kb.as_markup())
+    await cq.answer()
+
 @rt_main.callback_query(F.data == "ads_stop_all")
 async def stop_all(cq: CallbackQuery):
     uid = cq.from_user.id
-    count = 0
-    for (u,s), t in list(RUNNING_TASKS.items()):
-        if u == uid and t and not t.cancelled():
-            t.cancel()
-            RUNNING_TASKS.pop((u,s), None)
-            count += 1
+    count = stop_user_campaigns(uid)
 
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb = InlineKeyboardBuilder()
@@ -831,7 +815,7 @@ async def ads_total_sent(m: Message):
     )
     uid = m.from_user.id
     sessions = list_sessions(uid)
-    running_any = any(((uid, sid) in RUNNING_TASKS and RUNNING_TASKS[(uid,sid)] and not RUNNING_TASKS[(uid,sid)].cancelled() and not RUNNING_TASKS[(uid,sid)].done()) for sid, *_ in sessions)
+    running_any = any(is_campaign_running(uid, sid) for sid, *_ in sessions)
     await m.answer(text, reply_markup=public_ads_controls_kb(starting=running_any))
 
 @rt_main.callback_query(F.data == "pubads_start")
@@ -867,7 +851,7 @@ async def pubads_stop(cq: CallbackQuery):
     sessions = list_sessions(uid)
     count = 0
     for sid, *_ in sessions:
-        if (uid, sid) in RUNNING_TASKS:
+        if is_campaign_running(uid, sid):
             stop_campaign_for(uid, sid)
             count += 1
     await cq.message.edit_reply_markup(reply_markup=public_ads_controls_kb(starting=False))
@@ -898,19 +882,19 @@ async def pubads_auto(cq: CallbackQuery):
             reply_markup=kb.as_markup()
         )
         return await cq.answer()
-    from ..core.repo import get_cfg, set_cfg
-    cfg = get_cfg(f"auto_mode:{uid}", None)
-    enabled = isinstance(cfg, dict) and cfg.get("enabled")
-    if enabled:
-        try:
-            start_min = int(cfg.get("start", 0))
-            end_min = int(cfg.get("end", 0))
-            window_str = f"{_mins_to_12h(start_min)} - {_mins_to_12h(end_min)}"
-        except Exception:
-            window_str = "not set"
+    sched = auto_schedule_for(uid)
+    if sched:
+        nxt = sched.next_open()
+        if nxt is None:
+            when = "never (no valid window)"
+        elif sched.is_open():
+            when = "open now"
+        else:
+            when = datetime.fromtimestamp(nxt, sched.tz).strftime("%a %d %b | %I:%M %p")
         status = (
             "🕒 Auto Mode is currently <b>ON</b>.\n"
-            f"Current daily window: <b>{window_str}</b>\n\n"
+            f"Run windows ({sched.tz.zone}):\n<b>{sched.describe()}</b>\n"
+            f"Next opening: <b>{when}</b>\n\n"
         )
     else:
         status = (
@@ -920,7 +904,7 @@ async def pubads_auto(cq: CallbackQuery):
     text = (
         status +
         "Use the buttons below to turn Auto Mode ON or OFF.\n\n"
-        "Tap <b>ON</b> to set a daily time window or <b>OFF</b> to disable Auto Mode."
+        "Tap <b>ON</b> to set your time windows or <b>OFF</b> to disable Auto Mode."
     )
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     kb2 = InlineKeyboardBuilder()
@@ -932,10 +916,15 @@ async def pubads_auto(cq: CallbackQuery):
 @rt_main.callback_query(F.data == "auto_on")
 async def cb_auto_on(cq: CallbackQuery):
     uid = cq.from_user.id
+    _drop_pending_input(uid)
     AUTO_MODE_EXPECTING.add(uid)
     await cq.message.answer(
         "Send the daily time window in this format:\n"
         "<code>3:30 am - 2:00 pm</code>\n\n"
+        "Several windows, one per line, optionally limited to weekdays and with a timezone:\n"
+        "<code>mon-fri 9:00 am - 5:00 pm\n"
+        "sat,sun 11 am - 2 pm\n"
+        "tz Europe/London</code>\n\n"
         "Or send <b>off</b> to disable Auto Mode and run ads full-time."
     )
     await cq.answer()
@@ -944,8 +933,8 @@ async def cb_auto_on(cq: CallbackQuery):
 @rt_main.callback_query(F.data == "auto_off")
 async def cb_auto_off(cq: CallbackQuery):
     uid = cq.from_user.id
-    from ..core.repo import set_cfg
-    set_cfg(f"auto_mode:{uid}", {"enabled": False})
+    set_auto_mode(uid, {"enabled": False})
+    wake_user_campaigns(uid)
     AUTO_MODE_EXPECTING.discard(uid)
     await cq.message.answer(
         "🕒 Auto Mode is now <b>OFF</b>.\n"
@@ -955,6 +944,7 @@ async def cb_auto_off(cq: CallbackQuery):
 
 @rt_main.callback_query(F.data == "back_ads")
 async def back_ads(cq: CallbackQuery):
+    _drop_pending_input(cq.from_user.id)
     from .keyboards import kb_ads_manager_menu
     try:
         await cq.message.edit_text("Ads manager:", reply_markup=kb_ads_manager_menu())
@@ -999,9 +989,11 @@ async def set_tag_mode(cq: CallbackQuery):
             return
         st["with_tag"] = True
         set_cfg(f"campaign_tag_mode:{uid}", "with")
+        invalidate_send_plan(uid)
     else:
         st["with_tag"] = False
         set_cfg(f"campaign_tag_mode:{uid}", "hide")
+        invalidate_send_plan(uid)
     st["step"] = "ask_topics"
     SETUP_STATE[uid] = st
     from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -1022,6 +1014,7 @@ async def topics_skip(cq: CallbackQuery):
     from ..core.repo import set_cfg, premium_active
     st["topic_links"] = []
     set_cfg(f"campaign_topic_links:{uid}", [])
+    invalidate_send_plan(uid)
     if premium_active(uid):
         st["step"] = "ask_target_delay"
         SETUP_STATE[uid] = st
@@ -1039,37 +1032,29 @@ async def topics_skip(cq: CallbackQuery):
     await cq.message.answer("Now set the interval:", reply_markup=kb_setup_intervals())
     await cq.answer()
 
-@rt_main.message(F.text.regexp(TIME_RANGE_RE))
+def _auto_window_awaiting(m: Message) -> bool:
+    """A time window sent after Auto ON; other text goes to the other handlers."""
+    return m.from_user.id in AUTO_MODE_EXPECTING and bool(parse_windows_text(m.text or ""))
+
+@rt_main.message(F.text & F.func(_auto_window_awaiting))
 async def auto_mode_set_window(m: Message):
     uid = m.from_user.id
-    if uid not in AUTO_MODE_EXPECTING:
-        return
-    rng = _parse_time_range_to_minutes(m.text or "")
-    if not rng:
-        await m.answer(
-            "Could not understand that time range.\n"
-            "Please use format like <code>3:30 am - 2:00 pm</code>."
-        )
-        return
-    start_min, end_min = rng
-    from ..core.repo import set_cfg
-    set_cfg(f"auto_mode:{uid}", {"enabled": True, "start": start_min, "end": end_min})
+    parsed = parse_windows_text(m.text or "")
+    set_auto_mode(uid, {"enabled": True, "windows": parsed["windows"], "tz": parsed["tz"]})
     AUTO_MODE_EXPECTING.discard(uid)
-    if end_min > start_min:
-        mins = end_min - start_min
-    else:
-        mins = (24 * 60 - start_min) + end_min
+    wake_user_campaigns(uid)
+    sched = auto_schedule_for(uid)
+    mins = sum(e - s for s, e in sched.spans) if sched else 0
     hours = mins // 60
     rem = mins % 60
     if hours > 0:
         dur = f"{hours} hour {rem} minutes" if hours == 1 else f"{hours} hours {rem} minutes"
     else:
         dur = f"{rem} minutes"
-    window_str = f"{_mins_to_12h(start_min)} - {_mins_to_12h(end_min)}"
     await m.answer(
         "🕒 Auto Mode is now <b>ON</b>.\n"
-        f"Daily run window: <b>{window_str}</b>\n"
-        f"Approx. run time per day: <b>{dur}</b>."
+        f"Run windows ({sched.tz.zone if sched else ENV.TIMEZONE}):\n<b>{sched.describe() if sched else 'never'}</b>\n"
+        f"Approx. run time per week: <b>{dur}</b>."
     )
 
 
@@ -1078,14 +1063,128 @@ async def auto_mode_turn_off(m: Message):
     uid = m.from_user.id
     if uid not in AUTO_MODE_EXPECTING:
         return
-    from ..core.repo import set_cfg
-    set_cfg(f"auto_mode:{uid}", {"enabled": False})
+    set_auto_mode(uid, {"enabled": False})
+    wake_user_campaigns(uid)
     AUTO_MODE_EXPECTING.discard(uid)
     await m.answer(
         "🕒 Auto Mode is now <b>OFF</b>.\n"
         "Your ads will run all day according to your interval."
     )
 
+@rt_main.callback_query(F.data == "livelog_detail")
+async def livelog_detail_toggle(cq: CallbackQuery):
+    uid = cq.from_user.id
+    on = not live_log_detail(uid)
+    set_live_log_detail(uid, on)
+    if on:
+        msg = "🧾 Live log: one message per send is now ON (plus the status message)."
+    else:
+        msg = "🧾 Live log: per-send messages OFF. You'll get one status message per campaign, updated in place."
+    await cq.answer(msg, show_alert=True)
+
+# --- Per-group interval (premium) ---
+PGI_STATE: dict[int, dict] = {}
+
+def _parse_interval_seconds(text: str):
+    txt = (text or "").strip().lower()
+    m_val = re.match(r"^(\d+)\s*(s|sec|secs|second|seconds|m|min|mins|minute|minutes|h|hr|hrs|hour|hours)?$", txt)
+    if not m_val:
+        return None
+    n = int(m_val.group(1))
+    unit = (m_val.group(2) or "m")[0]
+    return n * {"s": 1, "m": 60, "h": 3600}[unit]
+
+@rt_main.callback_query(F.data == "pgi_menu")
+async def pgi_menu(cq: CallbackQuery):
+    uid = cq.from_user.id
+    AUTO_MODE_EXPECTING.discard(uid)
+    if not premium_active(uid):
+        return await cq.answer("💎 Per-group interval is Premium only.", show_alert=True)
+    sessions = list_sessions(uid)
+    if not sessions:
+        return await cq.answer("No accounts linked.", show_alert=True)
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    kb = InlineKeyboardBuilder()
+    for sid, phone, *_ in sessions:
+        kb.row(InlineKeyboardButton(text=phone, callback_data=f"pgi_acc:{sid}"))
+    kb.row(InlineKeyboardButton(text="🔙 Back", callback_data="back_ads"))
+    try:
+        await cq.message.edit_text("Select the account whose groups you want to time:", reply_markup=kb.as_markup())
+    except:
+        await cq.message.answer("Select the account whose groups you want to time:", reply_markup=kb.as_markup())
+    await cq.answer()
+
+async def _pgi_show(cq: CallbackQuery, st: dict):
+    from ..core.repo import get_group_intervals
+    from ..features.campaigns import build_group_intervals_markup
+    text, markup = await build_group_intervals_markup(st["session_path"], get_group_intervals(cq.from_user.id), page=st.get("page", 0))
+    try:
+        await cq.message.edit_text(text, reply_markup=markup)
+    except:
+        await cq.message.answer(text, reply_markup=markup)
+
+@rt_main.callback_query(F.data.startswith("pgi_acc:"))
+async def pgi_account(cq: CallbackQuery):
+    uid = cq.from_user.id
+    if not premium_active(uid):
+        return await cq.answer("💎 Per-group interval is Premium only.", show_alert=True)
+    from ..core.repo import get_session_path
+    sid = int(cq.data.split(":")[1])
+    session_path = get_session_path(sid)
+    if not session_path:
+        return await cq.answer("Session not found.", show_alert=True)
+    PGI_STATE[uid] = {"sid": sid, "session_path": session_path, "page": 0, "gid": None}
+    await _pgi_show(cq, PGI_STATE[uid])
+    await cq.answer()
+
+@rt_main.callback_query(F.data.startswith("pgi_page:"))
+async def pgi_page(cq: CallbackQuery):
+    st = PGI_STATE.get(cq.from_user.id)
+    if not st: return await cq.answer()
+    st["page"] = int(cq.data.split(":")[1])
+    await _pgi_show(cq, st)
+    await cq.answer()
+
+@rt_main.callback_query(F.data.startswith("pgi_grp:"))
+async def pgi_group(cq: CallbackQuery):
+    st = PGI_STATE.get(cq.from_user.id)
+    if not st: return await cq.answer()
+    st["gid"] = int(cq.data.split(":")[1])
+    await cq.message.answer(
+        "Send the interval for this group, e.g. <code>45s</code>, <code>30m</code>, <code>2h</code>.\n"
+        "Send <b>default</b> to use the campaign interval again."
+    )
+    await cq.answer()
+
+def _pgi_awaiting(m: Message) -> bool:
+    """A per-group interval (or "default") sent while a group is picked; other text goes to the other handlers."""
+    if (PGI_STATE.get(m.from_user.id) or {}).get("gid") is None:
+        return False
+    txt = (m.text or "").strip().lower()
+    return txt in ("default", "reset") or _parse_interval_seconds(txt) is not None
+
+@rt_main.message(F.text & F.func(_pgi_awaiting))
+async def pgi_set_interval(m: Message):
+    uid = m.from_user.id
+    st = PGI_STATE[uid]
+    if not premium_active(uid):
+        PGI_STATE.pop(uid, None)
+        return await m.answer("💎 Per-group interval is Premium only.")
+    from ..core.repo import set_group_interval
+    from ..features.campaigns import fmt_interval
+    txt = (m.text or "").strip().lower()
+    if txt in ("default", "reset"):
+        set_group_interval(uid, st["gid"], None)
+        st["gid"] = None
+        return await m.answer("✅ Group now uses the campaign interval.")
+    sec = _parse_interval_seconds(txt)
+    # same bounds as the custom campaign interval: 5 seconds up to 7 days
+    if sec is None or sec < 5 or sec > 60*60*24*7:
+        return await m.answer("Interval must be between 5 seconds and 7 days, like <code>45s</code>, <code>30m</code> or <code>2h</code>.")
+    set_group_interval(uid, st["gid"], sec)
+    st["gid"] = None
+    await m.answer(f"✅ Per-group interval saved: every <b>{fmt_interval(sec)}</b>.")
+
 @rt_main.message(F.text)
 async def handle_topics_step(m: Message):
     uid = m.from_user.id
@@ -1100,6 +1199,7 @@ async def handle_topics_step(m: Message):
         links = extract_topic_links(m.text or "")
         st["topic_links"] = links
         set_cfg(f"campaign_topic_links:{uid}", links)
+        invalidate_send_plan(uid)
         # if premium, next step is target-delay; else go to batch interval
         if premium_active(uid):
             st["step"] = "ask_target_delay"
@@ -1133,6 +1233,7 @@ async def handle_topics_step(m: Message):
             return
         st["target_delay"] = [lo, hi]
         set_cfg(f"campaign_target_delay:{uid}", [lo, hi])
+        invalidate_send_plan(uid)
         st["step"] = "ask_interval"
         SETUP_STATE[uid] = st
         await m.answer(
@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from aiogram import Bot
+from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramRetryAfter
+from ..core.config import ENV
+
+log = logging.getLogger("camprun.outbound")
+
+# Priority classes: lower goes first
+PRIO_INTERACTIVE = 0
+PRIO_LOGS = 1
+PRIO_BROADCAST = 2
+PRIO_NAMES = {PRIO_INTERACTIVE: "interactive", PRIO_LOGS: "logs", PRIO_BROADCAST: "broadcast"}
+
+# Only methods that post into a chat count against Telegram's send limits
+PACED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+MAX_RETRIES = 3
+
+_PRIORITY: contextvars.ContextVar[int] = contextvars.ContextVar("outbound_priority", default=PRIO_INTERACTIVE)
+
+
+@contextmanager
+def outbound_priority(prio: int):
+    """Bot sends made inside this block (same task) are queued with the given priority class."""
+    token = _PRIORITY.set(prio)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def set_task_priority(prio: int):
+    """Queue the rest of the current task's bot sends (e.g. a background job loop) with this priority."""
+    _PRIORITY.set(prio)
+
+
+class OutboundQueue:
+    """
+    Send slots for one bot token: global pacing (~30 msg/s), per-chat pacing (1 msg/s in private
+    chats, slower in groups) and a shared pause after a 429. Waiters are served by priority class,
+    skipping over chats that are still cooling down.
+    """
+
+    def __init__(self, name: str, rate: float = ENV.BOT_GLOBAL_RATE):
+        self.name = name
+        self.interval = 1.0 / max(0.1, rate)
+        self._heap: list = []  # (prio, seq, chat_id, future, enqueued_at)
+        self._seq = itertools.count()
+        self._chat_next: dict = {}
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._waits = {p: deque(maxlen=500) for p in PRIO_NAMES}
+        self.sent = 0
+        self.retry_after_hits = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    @staticmethod
+    def _chat_interval(chat_id) -> float:
+        if isinstance(chat_id, int) and chat_id > 0:
+            return ENV.BOT_CHAT_INTERVAL_SEC
+        return ENV.BOT_GROUP_INTERVAL_SEC
+
+    async def acquire(self, chat_id, prio: int = PRIO_INTERACTIVE):
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (prio, next(self._seq), chat_id, fut, time.monotonic()))
+        self._wake.set()
+        await fut
+
+    def retry_after(self, chat_id, seconds: float):
+        """Telegram answered 429: hold every send of this bot (and this chat) for the given time."""
+        self.retry_after_hits += 1
+        until = time.monotonic() + seconds
+        self._paused_until = max(self._paused_until, until)
+        self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0), until)
+        log.warning("%s: RetryAfter %ss (chat %s)", self.name, seconds, chat_id)
+
+    def _pick(self, now: float):
+        """(entry or None, seconds until some chat is ready)."""
+        soonest = None
+        for entry in sorted(self._heap):
+            fut, chat_id = entry[3], entry[2]
+            if fut.done():
+                return entry, None  # waiter went away: drop it
+            ready_at = self._chat_next.get(chat_id, 0)
+            if ready_at <= now:
+                return entry, None
+            soonest = ready_at if soonest is None else min(soonest, ready_at)
+        return None, (soonest - now) if soonest is not None else None
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            delay = None
+            if self._heap:
+                gate = max(self._paused_until, self._next_slot)
+                if gate > now:
+                    delay = gate - now
+                else:
+                    entry, delay = self._pick(now)
+                    if entry is not None:
+                        self._heap.remove(entry)
+                        heapq.heapify(self._heap)
+                        prio, _seq, chat_id, fut, enqueued = entry
+                        if not fut.done():
+                            self._chat_next[chat_id] = now + self._chat_interval(chat_id)
+                            self._next_slot = now + self.interval
+                            self._waits[prio].append(now - enqueued)
+                            self.sent += 1
+                            fut.set_result(None)
+                        if len(self._chat_next) > 10000:
+                            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+                        continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        depth = {name: 0 for name in PRIO_NAMES.values()}
+        for prio, *_ in self._heap:
+            depth[PRIO_NAMES[prio]] += 1
+        waits = {}
+        for prio, dq in self._waits.items():
+            vals = list(dq)
+            waits[PRIO_NAMES[prio]] = {
+                "avg_s": (sum(vals) / len(vals)) if vals else 0.0,
+                "max_s": max(vals) if vals else 0.0,
+            }
+        return {
+            "depth": depth,
+            "wait": waits,
+            "sent": self.sent,
+            "retry_after": self.retry_after_hits,
+            "paused_s": max(0.0, self._paused_until - time.monotonic()),
+        }
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """aiogram session middleware: every paced call waits for a slot and is retried after RetryAfter."""
+
+    def __init__(self, queue: OutboundQueue):
+        self.queue = queue
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not type(method).__name__.startswith(PACED_PREFIXES):
+            return await make_request(bot, method)
+        prio = _PRIORITY.get()
+        for attempt in range(MAX_RETRIES + 1):
+            await self.queue.acquire(chat_id, prio)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.queue.retry_after(chat_id, e.retry_after)
+                if attempt == MAX_RETRIES:
+                    raise
+
+
+# bot token -> queue (bots built for the same token share one)
+OUTBOUND: dict[str, OutboundQueue] = {}
+
+
+def _process_share() -> int:
+    """Processes sending with the same tokens: the bot process plus the campaign workers."""
+    from ..features.workers import worker_count
+    return worker_count() + 1
+
+
+def outbound_queue(token: str, name: str = "") -> OutboundQueue:
+    q = OUTBOUND.get(token)
+    if q is None:
+        # the per-token global rate is split evenly over the processes (per-chat pacing is not)
+        q = OutboundQueue(name or f"bot{len(OUTBOUND) + 1}", ENV.BOT_GLOBAL_RATE / _process_share())
+        OUTBOUND[token] = q
+    return q
+
+
+def build_bot(token: str, name: str = "") -> Bot:
+    """Bot with HTML parse mode whose sends go through the token's shared outbound queue."""
+    bot = Bot(token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    bot.session.middleware(OutboundMiddleware(outbound_queue(token, name)))
+    return bot
+
+
+def outbound_stats() -> dict:
+    return {q.name: q.stats() for q in OUTBOUND.values()}